@@ -0,0 +1,252 @@
+"""
+Native async (ASGI) variants of the note and dashboard endpoints.
+
+These are plain Django ``async def`` views mounted under ``/api/async/``.
+They authenticate with the same JWT access tokens, run the same queries as
+the DRF views (see ``api.dashboard``) and return the same JSON, but use the
+async ORM API so an ASGI server (``uvicorn backend.asgi:application``) does
+not tie up a worker thread per request. Django still executes the SQL in
+its thread-sensitive executor; writes that must share a transaction with
+the rollup signal handlers run as one ``sync_to_async`` call.
+
+They behave like their DRF counterparts beyond the JSON too. Notes carry
+the same ETag/Last-Modified validators (``api.conditional``), with 304s
+for conditional GETs and 412s for outdated ``If-Match`` writes. Dashboard
+responses go through the same versioned cache
+(``api.dashboard_cache.acached_response``).
+"""
+import json
+import math
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from rest_framework.exceptions import NotFound, Throttled
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from . import conditional, dashboard, throttling
+from .authentication import CachedJWTAuthentication
+from .dashboard_cache import acached_response
+from .fast_serializers import FastReadSerializer
+from .fields import TextPrefix
+from .models import AuthorNoteStats, Note
+from .pagination import KeysetPagination
+from .serializers import (
+    PREVIEW_LENGTH,
+    DailyNotesSerializer,
+    NoteSerializer,
+    NoteSummarySerializer,
+    NotesPerUserSerializer,
+    UserStatsSerializer,
+)
+
+
+def _error(status, detail):
+    return JsonResponse({"detail": detail}, status=status)
+
+
+async def authenticate(request):
+    """Return the active user for the request's Bearer token, or ``None``."""
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    return await authentication.aget_user(authentication.get_validated_token(raw_token))
+
+
+def async_api_view(methods, admin=False):
+    """
+    Authenticate and dispatch on ``methods`` like DRF's ``@api_view``,
+    with ``IsAuthenticated`` (or ``IsAdminUser`` when ``admin``) semantics.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                user = await authenticate(request)
+            except AuthenticationFailed as e:
+                detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+                return JsonResponse(detail, status=401)
+            if user is None:
+                return _error(401, "Authentication credentials were not provided.")
+            wait = await throttling.acheck(request, user)
+            if wait:
+                response = _error(429, Throttled(wait).detail)
+                response["Retry-After"] = str(math.ceil(wait))
+                return response
+            if admin and not user.is_staff:
+                return _error(403, "You do not have permission to perform this action.")
+            if request.method not in methods:
+                return _error(405, f'Method "{request.method}" not allowed.')
+            request.user = user
+            return await view(request, *args, **kwargs)
+        # Token authentication, as with DRF's APIView. Set directly because
+        # csrf_exempt() only learned to wrap coroutines in Django 5.0.
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _create_note(serializer, author):
+    # Keep the note and its rollup rows in one transaction.
+    with transaction.atomic():
+        return serializer.save(author=author)
+
+
+def _update_note(request, serializer):
+    # Check If-Match in the write's transaction, like ConditionalNoteMixin;
+    # None means the preconditions failed.
+    with transaction.atomic():
+        if conditional.preconditions_failed(request, request.user, serializer.instance.pk):
+            return None
+        note = serializer.save()
+        # The stamp was written with a queryset update; read it back for the ETag.
+        note.refresh_from_db(fields=["sync_version"])
+        return note
+
+
+def _delete_note(request, note):
+    with transaction.atomic():
+        if conditional.preconditions_failed(request, request.user, note.pk):
+            return False
+        note.delete()
+        return True
+
+
+def _precondition_failed():
+    return JsonResponse({"error": conditional.PRECONDITION_FAILED}, status=412)
+
+
+async def _list_notes(request):
+    version, modified_at = await conditional.anote_version(request.user)
+    etag = conditional.list_etag(request, request.user, version)
+    response = conditional.conditional_response(request, etag, modified_at) or await _note_page(request)
+    return conditional.set_validators(response, etag, modified_at)
+
+
+async def _note_page(request):
+    queryset = Note.objects.filter(author=request.user)
+    if request.GET.get("view") == "full":
+        fast = FastReadSerializer(NoteSerializer)
+    else:
+        fast = FastReadSerializer(NoteSummarySerializer)
+        queryset = queryset.annotate(preview=TextPrefix("content", PREVIEW_LENGTH))
+
+    paginator = KeysetPagination()
+    try:
+        page = await paginator.apaginate_queryset(fast.values(queryset, "created_at", "id"), request, "created_at", descending=True)
+    except NotFound as e:
+        return _error(404, str(e.detail))
+    return JsonResponse(paginator.get_paginated_data(fast.serialize(page)))
+
+
+@async_api_view(["GET", "POST"])
+async def note_list(request):
+    if request.method == "GET":
+        return await _list_notes(request)
+
+    data = _json_body(request)
+    if data is None:
+        return _error(400, "JSON object body required")
+    serializer = NoteSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    note = await sync_to_async(_create_note)(serializer, request.user)
+    return JsonResponse(NoteSerializer(note).data, status=201)
+
+
+@async_api_view(["GET", "PUT", "PATCH", "DELETE"])
+async def note_detail(request, pk):
+    try:
+        note = await Note.objects.aget(pk=pk, author=request.user)
+    except Note.DoesNotExist:
+        return _error(404, "No Note matches the given query.")
+
+    if request.method == "GET":
+        etag = conditional.detail_etag(request.user, note.sync_version, note.pk)
+        response = conditional.conditional_response(request, etag, note.updated_at) or JsonResponse(
+            NoteSerializer(note).data
+        )
+        return conditional.set_validators(response, etag, note.updated_at)
+    if request.method == "DELETE":
+        if not await sync_to_async(_delete_note)(request, note):
+            return _precondition_failed()
+        return HttpResponse(status=204)
+
+    data = _json_body(request)
+    if data is None:
+        return _error(400, "JSON object body required")
+    serializer = NoteSerializer(note, data=data, partial=request.method == "PATCH")
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    note = await sync_to_async(_update_note)(request, serializer)
+    if note is None:
+        return _precondition_failed()
+    return conditional.set_validators(
+        JsonResponse(NoteSerializer(note).data),
+        conditional.detail_etag(request.user, note.sync_version, note.pk),
+        note.updated_at,
+    )
+
+
+@async_api_view(["GET"], admin=True)
+@acached_response("async-dashboard-stats")
+async def dashboard_stats(request):
+    total_users = await User.objects.acount()
+    totals = await AuthorNoteStats.objects.aaggregate(**dashboard.total_notes_aggregate())
+    return JsonResponse({
+        "total_users": total_users,
+        "total_notes": totals["total"] or 0,
+    })
+
+
+@async_api_view(["GET"], admin=True)
+@acached_response("async-user-stats")
+async def user_stats(request):
+    try:
+        field, descending, prefix, limit = dashboard.parse_user_stats_params(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    fast = FastReadSerializer(UserStatsSerializer)
+
+    if limit is not None:
+        rows = [row async for row in dashboard.top_user_stats_rows(field, descending, prefix, limit)]
+        return JsonResponse(fast.serialize(rows), safe=False)
+
+    paginator = KeysetPagination()
+    try:
+        page = await paginator.apaginate_queryset(dashboard.user_stats_rows(field, prefix), request, field, descending=descending)
+    except NotFound as e:
+        return _error(404, str(e.detail))
+    return JsonResponse(paginator.get_paginated_data(fast.serialize(page)))
+
+
+@async_api_view(["GET"], admin=True)
+@acached_response("async-notes-per-day")
+async def notes_per_day(request):
+    try:
+        days = dashboard.parse_days(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    rows = [row async for row in dashboard.daily_notes(days)]
+    return JsonResponse(DailyNotesSerializer(rows, many=True).data, safe=False)
+
+
+@async_api_view(["GET"], admin=True)
+@acached_response("async-notes-per-user")
+async def notes_per_user(request):
+    rows = [row async for row in dashboard.notes_distribution()]
+    return JsonResponse(NotesPerUserSerializer(rows, many=True).data, safe=False)
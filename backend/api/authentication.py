@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import user_cache
+
+try:
+    from rest_framework_simplejwt.utils import get_md5_hash_password
+except ImportError:  # simplejwt < 5.5 has no token revocation on password change
+    get_md5_hash_password = None
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that resolves the token's user through
+    ``api.user_cache`` instead of querying ``auth_user`` on every request.
+    The same active-user and revocation checks are applied to cached users.
+    """
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def get_user(self, validated_token):
+        try:
+            user = user_cache.get_user(self.get_user_id(validated_token))
+        except get_user_model().DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        return self.check_user(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        try:
+            user = await user_cache.aget_user(self.get_user_id(validated_token))
+        except get_user_model().DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        return self.check_user(user, validated_token)
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if get_md5_hash_password is not None and getattr(api_settings, "CHECK_REVOKE_TOKEN", False):
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,116 @@
+"""
+Mixed create/update/delete operations on notes applied in one request.
+
+Every operation is validated up front against the caller's own notes. If
+any of them fails, nothing is written; otherwise all of them are applied in
+a single transaction with one bulk query per operation type.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from . import dashboard_cache, rollups, sync
+from .models import Note
+from .serializers import NoteSerializer
+
+MAX_OPERATIONS = 500
+OPERATIONS = ("create", "update", "delete")
+
+
+def _error(code, **detail):
+    return {"status": code, **detail}
+
+
+def run_batch(queryset, author, operations):
+    """
+    Validate and apply ``operations`` to the notes in ``queryset``.
+
+    ``queryset`` must already be scoped to ``author``: notes outside it are
+    reported as not found. Returns ``(applied, results)`` where ``results``
+    has one entry per operation, in request order. Updates are partial.
+    """
+    ids = [op.get("id") for op in operations if isinstance(op, dict) and op.get("op") in ("update", "delete")]
+    existing = queryset.in_bulk([pk for pk in ids if isinstance(pk, int)])
+
+    results = [None] * len(operations)
+    creates, updates, deletes = [], [], []
+    seen_ids = set()
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+            results[index] = _error(status.HTTP_400_BAD_REQUEST, error=f"'op' must be one of {', '.join(OPERATIONS)}")
+            continue
+        kind = operation["op"]
+        data = operation.get("data", {})
+
+        if kind == "create":
+            serializer = NoteSerializer(data=data)
+            if serializer.is_valid():
+                creates.append((index, serializer))
+            else:
+                results[index] = _error(status.HTTP_400_BAD_REQUEST, errors=serializer.errors)
+            continue
+
+        pk = operation.get("id")
+        note = existing.get(pk) if isinstance(pk, int) else None
+        if note is None:
+            results[index] = _error(status.HTTP_404_NOT_FOUND, error="Not found.")
+            continue
+        if pk in seen_ids:
+            results[index] = _error(status.HTTP_400_BAD_REQUEST, error=f"Note {pk} appears in more than one operation")
+            continue
+        seen_ids.add(pk)
+
+        if kind == "update":
+            serializer = NoteSerializer(note, data=data, partial=True)
+            if serializer.is_valid():
+                updates.append((index, serializer))
+            else:
+                results[index] = _error(status.HTTP_400_BAD_REQUEST, errors=serializer.errors)
+        else:
+            deletes.append((index, note))
+
+    if any(result is not None for result in results):
+        return False, [
+            result or _error(status.HTTP_424_FAILED_DEPENDENCY, error="Not applied because another operation failed")
+            for result in results
+        ]
+
+    with transaction.atomic():
+        if creates:
+            created = Note.objects.bulk_create([
+                Note(author=author, **serializer.validated_data) for _, serializer in creates
+            ])
+            # bulk_create bypasses the Note signals.
+            rollups.notes_added(created)
+            sync.stamp(author.pk, [note.pk for note in created])
+            for (index, _), note in zip(creates, created):
+                results[index] = {"status": status.HTTP_201_CREATED, "data": NoteSerializer(note).data}
+
+        if updates:
+            fields = set()
+            notes = []
+            now = timezone.now()
+            for _, serializer in updates:
+                if not serializer.validated_data:
+                    continue  # nothing to change: reported as stored
+                for field, value in serializer.validated_data.items():
+                    setattr(serializer.instance, field, value)
+                    fields.add(field)
+                # bulk_update doesn't apply auto_now.
+                serializer.instance.updated_at = now
+                notes.append(serializer.instance)
+            if notes:
+                Note.objects.bulk_update(notes, sorted(fields | {"updated_at"}))
+                rollups.notes_changed([author.pk])
+                sync.stamp(author.pk, [note.pk for note in notes])
+            for index, serializer in updates:
+                results[index] = {"status": status.HTTP_200_OK, "data": NoteSerializer(serializer.instance).data}
+
+        if deletes:
+            queryset.filter(pk__in=[note.pk for _, note in deletes]).delete()
+            for index, _ in deletes:
+                results[index] = {"status": status.HTTP_204_NO_CONTENT}
+
+        dashboard_cache.invalidate()
+
+    return True, results
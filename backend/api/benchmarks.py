@@ -0,0 +1,313 @@
+"""
+Endpoint benchmarks shared by the ``benchmark_api`` management command, the
+pytest-benchmark suite in ``benchmarks/`` and the query budget tests.
+
+``SCENARIOS`` describes one request per route (and per interesting method
+or query string). ``BenchmarkContext`` seeds a fixed data set and holds the
+users and tokens the requests run as. ``run_scenario`` times the requests
+through Django's test client and records latency percentiles, query count
+and, on Postgres, the number of table rows read.
+"""
+import statistics
+import time
+from itertools import count
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import dashboard_cache, sync, throttling
+from .models import AuthorNoteStats, Note
+
+SEED = 20240101
+NOTES_PER_USER = 100
+PASSWORD = "password123"
+# URL names that are not part of the API surface.
+EXCLUDED_NAMESPACES = ("admin", "rest_framework")
+# Registered by the router, but every method on it is disabled.
+EXCLUDED_ROUTES = ("user-detail",)
+
+_unique = count()
+
+
+class Scenario:
+    """
+    One benchmarked request.
+
+    ``args``, ``params`` and ``data`` may be callables taking the context.
+    ``prepare(context)``, when given, runs untimed before every request and
+    returns a dict that may override ``args`` and ``data`` (for requests
+    that consume what they touch, such as deletes and logouts). ``budget``
+    is the exact number of queries the request issues with a cold cache;
+    it must not grow with the amount of data.
+    """
+
+    def __init__(self, name, url_name, method="get", args=None, params=None, data=None,
+                 auth="user", prepare=None, expected_status=200, budget=0):
+        self.name = name
+        self.url_name = url_name
+        self.method = method
+        self.args = args
+        self.params = params or {}
+        self.data = data
+        self.auth = auth
+        self.prepare = prepare
+        self.expected_status = expected_status
+        self.budget = budget
+
+    def __repr__(self):
+        return f"<Scenario {self.name}>"
+
+    def build(self, context):
+        args = self.args(context) if callable(self.args) else self.args
+        data = self.data(context) if callable(self.data) else self.data
+        if self.prepare is not None:
+            overrides = self.prepare(context)
+            args = overrides.get("args", args)
+            data = overrides.get("data", data)
+        params = self.params(context) if callable(self.params) else self.params
+        url = reverse(self.url_name, args=args)
+        return url, params, data
+
+
+def _new_note(context):
+    note = Note.objects.create(title="Benchmark", content="Benchmark note", author=context.user)
+    return {"args": [note.pk]}
+
+
+def _new_refresh_token(context):
+    return {"data": {"refresh_token": str(RefreshToken.for_user(context.user))}}
+
+
+def _new_refresh(context):
+    return {"data": {"refresh": str(RefreshToken.for_user(context.user))}}
+
+
+def _new_registration(context):
+    username = f"bench-register-{time.time_ns()}-{next(_unique)}"
+    return {"data": {
+        "username": username, "email": f"{username}@example.com", "first_name": "Bench",
+        "last_name": "Mark", "password": PASSWORD, "confirm_password": PASSWORD,
+    }}
+
+
+def _batch(context):
+    notes = list(Note.objects.filter(author=context.user).order_by("id").values_list("id", flat=True)[:2])
+    return {"data": {"operations": [
+        {"op": "create", "data": {"title": "Batch", "content": "Created in a batch"}},
+        {"op": "update", "id": notes[0], "data": {"title": "Batch update"}},
+        {"op": "delete", "id": Note.objects.create(title="Doomed", content="x", author=context.user).pk},
+    ]}}
+
+
+def _note(context):
+    return [context.note_id]
+
+
+def _recent_changes(context):
+    # A token from just before the last ten writes of the user's notes.
+    version = AuthorNoteStats.objects.get(author=context.user).version
+    return {"since": sync.encode_token(max(version - 10, 0), None, int(time.time()))}
+
+
+NOTE_BODY = {"title": "Benchmark", "content": "Benchmark body"}
+
+SCENARIOS = [
+    Scenario("api-root", "api-root", budget=0),
+    Scenario("note-list", "note-list", budget=2),
+    Scenario("note-list-full", "note-list", params={"view": "full"}, budget=2),
+    Scenario("note-list-fields", "note-list", params={"fields": "id,title"}, budget=2),
+    Scenario("note-create", "note-list", method="post", data=NOTE_BODY, expected_status=201, budget=6),
+    Scenario("note-detail", "note-detail", args=_note, budget=1),
+    Scenario("note-update", "note-detail", method="put", args=_note, data=NOTE_BODY, budget=7),
+    Scenario("note-partial-update", "note-detail", method="patch", args=_note, data={"title": "Patched"},
+             budget=7),
+    Scenario("note-delete", "note-detail", method="delete", prepare=_new_note, expected_status=204, budget=7),
+    Scenario("note-search", "note-search", params={"q": "meeting"}, budget=1),
+    Scenario("note-batch", "note-batch", method="post", prepare=_batch, budget=15),
+    Scenario("note-export", "note-export", budget=1),
+    Scenario("note-changes", "note-changes", params={"page_size": 100}, budget=2),
+    Scenario("note-changes-since", "note-changes", params=_recent_changes, budget=3),
+    Scenario("dashboard-stats", "dashboard-stats", auth="admin", budget=2),
+    Scenario("user-stats", "user-stats", auth="admin", budget=1),
+    Scenario("user-stats-top", "user-stats", params={"limit": 100}, auth="admin", budget=1),
+    Scenario("notes-per-day", "notes-per-day", auth="admin", budget=1),
+    Scenario("notes-series", "notes-series", auth="admin", budget=1),
+    Scenario("notes-series-hourly", "notes-series", params={"granularity": "hour"}, auth="admin", budget=1),
+    Scenario("notes-per-user", "notes-per-user", auth="admin", budget=1),
+    Scenario("dashboard-snapshot", "dashboard-snapshot", auth="admin", budget=4),
+    Scenario("dashboard-cache-stats", "dashboard-cache-stats", auth="admin", budget=0),
+    Scenario("auth-cache-stats", "auth-cache-stats", auth="admin", budget=0),
+    Scenario("health", "health", auth=None, budget=1),
+    Scenario("metrics", "metrics", auth=None, budget=0),
+    Scenario("async-note-list", "async-note-list", budget=2),
+    Scenario("async-note-create", "async-note-list", method="post", data=NOTE_BODY, expected_status=201,
+             budget=6),
+    Scenario("async-note-detail", "async-note-detail", args=_note, budget=1),
+    Scenario("async-dashboard-stats", "async-dashboard-stats", auth="admin", budget=2),
+    Scenario("async-user-stats", "async-user-stats", auth="admin", budget=1),
+    Scenario("async-notes-per-day", "async-notes-per-day", auth="admin", budget=1),
+    Scenario("async-notes-per-user", "async-notes-per-user", auth="admin", budget=1),
+    Scenario("user-register", "user-list", method="post", auth=None, prepare=_new_registration,
+             expected_status=201, budget=6),
+    Scenario("user-logout", "user-logout", method="post", prepare=_new_refresh_token, budget=6),
+    Scenario("token-obtain", "get_token", method="post", auth=None,
+             data=lambda context: {"username": context.user.username, "password": PASSWORD}, budget=2),
+    Scenario("token-refresh", "refresh", method="post", auth=None, prepare=_new_refresh, budget=1),
+]
+
+
+def route_names():
+    """Names of every routed API URL in the project URLconf."""
+    names = set()
+
+    def walk(patterns, namespace=None):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.namespace not in EXCLUDED_NAMESPACES:
+                    walk(pattern.url_patterns, pattern.namespace)
+            elif isinstance(pattern, URLPattern) and pattern.name and namespace is None:
+                names.add(pattern.name)
+
+    walk(get_resolver().url_patterns)
+    return names
+
+
+def uncovered_routes(scenarios=SCENARIOS):
+    covered = {scenario.url_name for scenario in scenarios}
+    return sorted(route_names() - covered - set(EXCLUDED_ROUTES))
+
+
+class BenchmarkContext:
+    """
+    Seeds ``notes`` notes (``NOTES_PER_USER`` per user, so sizes grow
+    incrementally) and prepares the users, tokens and clients requests run
+    as.
+    """
+
+    def __init__(self, notes, workers=1, stdout=None):
+        users = max(1, notes // NOTES_PER_USER)
+        call_command(
+            "populate_db", users=users, notes_min=NOTES_PER_USER, notes_max=NOTES_PER_USER,
+            seed=SEED, workers=workers, batch_size=500, stdout=stdout,
+        )
+        self.notes = Note.objects.count()
+        first = Note.objects.filter(author__username__endswith=f".{SEED}-0").select_related("author").first()
+        self.user = first.author
+        self.note_id = first.pk
+        self.admin, _ = User.objects.get_or_create(username="bench-admin", defaults={"is_staff": True})
+        self.clients = {
+            None: Client(),
+            "user": self._client(self.user),
+            "admin": self._client(self.admin),
+        }
+
+    def _client(self, user):
+        return Client(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+
+    def request(self, scenario):
+        url, params, data = scenario.build(self)
+        client = self.clients[scenario.auth]
+        method = getattr(client, scenario.method)
+        if scenario.method == "get":
+            return lambda: method(url, params)
+        return lambda: method(url + _query(params), data or {}, content_type="application/json")
+
+
+def _query(params):
+    return "?" + urlencode(params) if params else ""
+
+
+def _consume(response):
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response
+
+
+class RowsRead:
+    """Table rows read during the block, from ``pg_stat_xact_user_tables``."""
+
+    SQL = "SELECT COALESCE(SUM(COALESCE(seq_tup_read, 0) + COALESCE(idx_tup_fetch, 0)), 0) FROM pg_stat_xact_user_tables"
+
+    def __init__(self):
+        self.value = None
+
+    def __enter__(self):
+        self.supported = connection.vendor == "postgresql"
+        if self.supported:
+            self.atomic = transaction.atomic()
+            self.atomic.__enter__()
+            self.before = self._read()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.supported:
+            if exc_info[0] is None:
+                self.value = self._read() - self.before
+            self.atomic.__exit__(*exc_info)
+
+    def _read(self):
+        with connection.cursor() as cursor:
+            cursor.execute(self.SQL)
+            return int(cursor.fetchone()[0])
+
+
+def percentile(values, pct):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def run_scenario(context, scenario, iterations=50, warmup=3, cold=False):
+    """
+    Time ``iterations`` requests for ``scenario`` and return a result dict.
+
+    With ``cold``, cached dashboard responses are invalidated before every
+    request so those endpoints are measured on their miss path.
+    """
+    timings = []
+    queries = rows = None
+    for i in range(warmup + iterations):
+        send = context.request(scenario)
+        if cold:
+            dashboard_cache.bump_generation()
+        with CaptureQueriesContext(connection) as captured, RowsRead() as read:
+            started = time.perf_counter()
+            response = _consume(send())
+            elapsed = time.perf_counter() - started
+        if response.status_code != scenario.expected_status:
+            raise AssertionError(
+                f"{scenario.name}: expected {scenario.expected_status}, got {response.status_code}"
+            )
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries = len(captured.captured_queries)
+            rows = read.value
+        # Every request comes from the same client; measure the endpoint, not its rate limit.
+        throttling.reset()
+    return {
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "queries": queries,
+        "rows_read": rows,
+        "status": scenario.expected_status,
+    }
+
+
+def compare(baseline, current):
+    """Yield ``(size, scenario, metric, before, after)`` for every changed metric."""
+    for size, results in current.get("sizes", {}).items():
+        before_results = baseline.get("sizes", {}).get(size, {})
+        for name, result in results.items():
+            before = before_results.get(name)
+            if before is None:
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "queries", "rows_read"):
+                if before.get(metric) != result.get(metric):
+                    yield size, name, metric, before.get(metric), result.get(metric)
@@ -0,0 +1,177 @@
+"""
+In-memory pre-check for simplejwt's refresh-token blacklist.
+
+simplejwt answers "is this refresh token blacklisted?" with a join between
+``BlacklistedToken`` and ``OutstandingToken`` on every refresh and logout.
+Here each process keeps the set of blacklisted JTIs in memory instead:
+
+* Each process builds it on its first check, not at startup, because
+  ``AppConfig.ready()`` must not query a database that may not be migrated
+  yet. It is fully rebuilt every ``REBUILD_INTERVAL`` seconds, which also
+  drops pruned tokens.
+* Tokens blacklisted by this process are added at once, and a shared
+  "blacklist generation" is bumped in the Django cache when their
+  transaction commits.
+* Any other process that sees a new generation, or that has not synced
+  for ``SYNC_INTERVAL`` seconds, reads the rows added since its last
+  sync. This is a primary-key range scan that normally returns nothing.
+  With a per-process cache such as the default ``LocMemCache``, other
+  processes never see the new generation. They keep accepting a revoked
+  token for up to ``SYNC_INTERVAL`` seconds, so run more than one worker
+  only with a shared cache backend.
+
+Rows are read by increasing id. Recent ids skipped by a sync may belong to
+transactions that had not committed yet, so they are re-read on later syncs
+until they show up or ``GAP_TIMEOUT`` passes.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+GENERATION_KEY = "token-blacklist:generation"
+
+_lock = threading.Lock()
+_state = {
+    "jtis": set(),
+    "last_id": 0,
+    "gaps": {},  # id -> monotonic time it was first skipped
+    "generation": None,
+    "synced_at": None,
+    "rebuilt_at": None,
+}
+
+
+def _setting(name, default):
+    return getattr(settings, "TOKEN_BLACKLIST_FILTER", {}).get(name, default)
+
+
+def _cache():
+    return caches[_setting("ALIAS", "default")]
+
+
+def _get_generation():
+    return _cache().get(GENERATION_KEY)
+
+
+def bump_generation():
+    cache = _cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns() // 1000, timeout=None)
+
+
+def _load(rows, now):
+    """Merge ``(id, jti)`` rows into the state, tracking skipped ids."""
+    state = _state
+    expected = state["last_id"] + 1
+    # Only ids just below a row can still be in flight; older holes are
+    # rolled-back or pruned rows.
+    window = _setting("GAP_WINDOW", 1000)
+    for row_id, jti in rows:
+        state["jtis"].add(jti)
+        state["gaps"].pop(row_id, None)
+        for missing in range(max(expected, row_id - window), row_id):
+            state["gaps"].setdefault(missing, now)
+        expected = max(expected, row_id + 1)
+    state["last_id"] = max(state["last_id"], expected - 1)
+    gap_timeout = _setting("GAP_TIMEOUT", 60)
+    state["gaps"] = {gap: seen for gap, seen in state["gaps"].items() if now - seen < gap_timeout}
+
+
+def rebuild():
+    """Reload every blacklisted JTI from the database."""
+    generation = _get_generation()
+    now = time.monotonic()
+    rows = list(BlacklistedToken.objects.order_by("id").values_list("id", "token__jti"))
+    with _lock:
+        _state.update(jtis=set(), last_id=0, gaps={})
+        _load(rows, now)
+        _state.update(generation=generation, synced_at=now, rebuilt_at=now)
+
+
+def _sync():
+    now = time.monotonic()
+    with _lock:
+        rebuilt_at = _state["rebuilt_at"]
+    if rebuilt_at is None or now - rebuilt_at >= _setting("REBUILD_INTERVAL", 3600):
+        rebuild()
+        return
+
+    generation = _get_generation()
+    with _lock:
+        fresh = (
+            generation == _state["generation"]
+            and now - _state["synced_at"] < _setting("SYNC_INTERVAL", 5)
+        )
+        if fresh:
+            return
+        last_id, gaps = _state["last_id"], list(_state["gaps"])
+
+    rows = BlacklistedToken.objects.filter(id__gt=last_id)
+    if gaps:
+        rows = rows | BlacklistedToken.objects.filter(id__in=gaps)
+    rows = list(rows.order_by("id").values_list("id", "token__jti"))
+    with _lock:
+        _load(rows, now)
+        _state.update(generation=generation, synced_at=now)
+
+
+def is_blacklisted(jti):
+    _sync()
+    with _lock:
+        return jti in _state["jtis"]
+
+
+def added(jti):
+    """Record a newly blacklisted JTI and tell other processes on commit."""
+    # Added right away: if the write rolls back, this process rejects a
+    # still-valid token until the next rebuild, which fails closed.
+    with _lock:
+        _state["jtis"].add(jti)
+    transaction.on_commit(bump_generation)
+
+
+def get_stats():
+    with _lock:
+        return {
+            "size": len(_state["jtis"]),
+            "last_id": _state["last_id"],
+            "pending_gaps": len(_state["gaps"]),
+        }
+
+
+def prune_expired(batch_size=1000, pause=0.0):
+    """
+    Delete expired outstanding tokens and their blacklist rows in chunks.
+
+    ``expires_at`` is not indexed, so chunks are found by walking the
+    primary key: the table is read once overall, and each chunk is its own
+    short transaction instead of one long table-wide DELETE. Returns
+    ``(outstanding, blacklisted)`` deletion counts.
+
+    Pruned JTIs stay in each process's filter until its next rebuild, which
+    is harmless: expired tokens are rejected before the blacklist check.
+    """
+    now = timezone.now()
+    last_id = 0
+    outstanding = blacklisted = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(id__gt=last_id, expires_at__lte=now)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return outstanding, blacklisted
+        with transaction.atomic():
+            blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
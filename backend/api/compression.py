@@ -0,0 +1,200 @@
+"""
+Negotiated response compression.
+
+``CompressionMiddleware`` compresses responses with the best encoding the
+client accepts (by ``Accept-Encoding`` q-values, then the order of
+``RESPONSE_COMPRESSION["ENCODINGS"]``). gzip is always available. Brotli
+("br") needs the ``brotli`` package and zstd the ``zstandard`` package;
+encodings whose package is missing are never offered. Bodies shorter than
+``MIN_SIZE`` bytes, already encoded responses and content types that don't
+compress (images, archives) are left alone. Streaming responses, sync or
+async, are compressed chunk by chunk as they are sent.
+
+A view can let repeated responses skip recompression by setting
+``response.compression_cache = (cache, key, timeout)``. ``key`` must
+change whenever the body does. The compressed body is then stored in
+``cache`` under ``key`` plus the encoding and content type, and reused
+while it is there. ``api.dashboard_cache`` does this for its cached
+entries.
+"""
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: enables "br"
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: enables "zstd"
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+    "image/svg+xml",
+)
+ALIASES = {"x-gzip": "gzip"}
+
+
+def _setting(name, default):
+    return getattr(settings, "RESPONSE_COMPRESSION", {}).get(name, default)
+
+
+def _level(encoding):
+    return _setting("LEVELS", {}).get(encoding, {"gzip": 6, "br": 4, "zstd": 3}[encoding])
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def compressor(encoding):
+    """A new compressor for ``encoding`` with ``compress(data)`` and ``flush()``."""
+    if encoding == "gzip":
+        return zlib.compressobj(_level("gzip"), zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    if encoding == "br":
+        return _Brotli(_level("br"))
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=_level("zstd")).compressobj()
+    raise ValueError(f"Unsupported encoding: {encoding!r}")
+
+
+def compress(data, encoding):
+    compressobj = compressor(encoding)
+    return compressobj.compress(data) + compressobj.flush()
+
+
+def available_encodings():
+    """Configured encodings whose codec is installed, most preferred first."""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [encoding for encoding in _setting("ENCODINGS", ("zstd", "br", "gzip")) if installed.get(encoding)]
+
+
+def negotiate(accept_encoding, encodings=None):
+    """The encoding to use for an ``Accept-Encoding`` header, or ``None`` for identity."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[ALIASES.get(name, name)] = weight
+    best, best_weight = None, 0.0
+    for encoding in available_encodings() if encodings is None else encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def _compressible(response):
+    if response.has_header("Content-Encoding") or response.status_code in (204, 206, 304):
+        return False
+    content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _stream(chunks, encoding):
+    compressobj = compressor(encoding)
+    for chunk in chunks:
+        data = compressobj.compress(chunk)
+        if data:
+            yield data
+    yield compressobj.flush()
+
+
+async def _astream(chunks, encoding):
+    compressobj = compressor(encoding)
+    async for chunk in chunks:
+        data = compressobj.compress(chunk)
+        if data:
+            yield data
+    yield compressobj.flush()
+
+
+def _cached_compress(response, encoding):
+    cached = getattr(response, "compression_cache", None)
+    if cached is None:
+        return compress(response.content, encoding)
+    cache, key, timeout = cached
+    key = f"{key}:{encoding}:{response.get('Content-Type', '').replace(' ', '')}"
+    body = cache.get(key)
+    if body is None:
+        body = compress(response.content, encoding)
+        cache.set(key, body, timeout=timeout)
+    return body
+
+
+def compress_response(request, response):
+    """Compress ``response`` in place for ``request`` if worthwhile; return it."""
+    if not _compressible(response):
+        return response
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        if response.is_async:
+            response.streaming_content = _astream(response.streaming_content, encoding)
+        else:
+            response.streaming_content = _stream(response.streaming_content, encoding)
+        del response["Content-Length"]
+    else:
+        if len(response.content) < _setting("MIN_SIZE", 1024):
+            return response
+        body = _cached_compress(response, encoding)
+        if len(body) >= len(response.content):
+            return response
+        response.content = body
+        response["Content-Length"] = str(len(body))
+
+    # The body bytes differ per encoding, so a strong validator becomes weak.
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = "W/" + etag
+    response["Content-Encoding"] = encoding
+    return response
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
@@ -0,0 +1,142 @@
+"""
+HTTP validators (ETag / Last-Modified) for the notes API.
+
+List validators are derived from the author's ``AuthorNoteStats`` version,
+which changes on every write to their notes, so a conditional list request
+costs one primary-key lookup and never touches the serializer. Detail
+validators come from the note itself: its ``sync_version`` is restamped on
+every write to it (see ``api.sync``), so writes to sibling notes leave its
+ETag alone and ``If-Match`` only fails when this note changed.
+
+The functions serve both ``ConditionalNoteMixin`` (the DRF viewset) and the
+native async views in ``api.async_views``, which send the same validators.
+"""
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.crypto import salted_hmac
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import AuthorNoteStats, Note
+
+
+PRECONDITION_FAILED = "Note has been modified since it was fetched"
+
+
+def note_version(user):
+    """``(version, modified_at)`` of ``user``'s notes; ``(0, None)`` before their first note."""
+    row = AuthorNoteStats.objects.filter(author=user).values_list("version", "modified_at").first()
+    return row or (0, None)
+
+
+async def anote_version(user):
+    row = await AuthorNoteStats.objects.filter(author=user).values_list("version", "modified_at").afirst()
+    return row or (0, None)
+
+
+def make_etag(user, version, *parts):
+    key = ":".join(str(part) for part in (user.pk, version, *parts))
+    return quote_etag(salted_hmac("api.conditional", key).hexdigest()[:32])
+
+
+def list_etag(request, user, version):
+    return make_etag(user, version, "list", request.META.get("QUERY_STRING", ""))
+
+
+def detail_etag(user, version, pk):
+    """ETag of note ``pk`` at its ``sync_version`` ``version``."""
+    return make_etag(user, version, "detail", pk)
+
+
+def detail_version(user, pk):
+    """``(sync_version, updated_at)`` of ``user``'s note ``pk``; ``None`` if they have no such note."""
+    return Note.objects.filter(pk=pk, author=user).values_list("sync_version", "updated_at").first()
+
+
+def set_validators(response, etag, modified_at):
+    response["ETag"] = etag
+    if modified_at is not None:
+        response["Last-Modified"] = http_date(modified_at.timestamp())
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ("Authorization",))
+    return response
+
+
+def conditional_response(request, etag, modified_at):
+    """The 304/412 response ``request``'s validators call for, or ``None`` to proceed."""
+    last_modified = int(modified_at.timestamp()) if modified_at else None
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def preconditions_failed(request, user, pk):
+    """
+    Whether ``If-Match``/``If-Unmodified-Since`` rule out a write to note
+    ``pk``. When they pass, the note's row is claimed so a concurrent
+    writer holding the same ETag fails; call this inside the write's
+    transaction. A missing note passes, and the write answers 404.
+    """
+    meta = request.META
+    if "HTTP_IF_MATCH" not in meta and "HTTP_IF_UNMODIFIED_SINCE" not in meta:
+        return False
+    if "HTTP_IF_MATCH" in meta:
+        # Compressed responses carry the weak form of the ETag (see
+        # api.compression). It names the same note version, so it matches.
+        meta["HTTP_IF_MATCH"] = meta["HTTP_IF_MATCH"].replace('W/"', '"')
+    row = detail_version(user, pk)
+    if row is None:
+        return False
+    version, modified_at = row
+    passed = conditional_response(request, detail_etag(user, version, pk), modified_at) is None
+    if passed:
+        # Lock the row while it still holds the matched version. A writer
+        # that read the same version waits here, then matches no row once
+        # this write has restamped it.
+        passed = Note.objects.filter(pk=pk, sync_version=version).update(sync_version=version) == 1
+    return not passed
+
+
+class ConditionalNoteMixin:
+    """
+    Adds conditional GET and ``If-Match`` writes to a note ``ModelViewSet``.
+
+    ``If-None-Match``/``If-Modified-Since`` on list and detail return 304
+    before the queryset is serialized. ``If-Match``/``If-Unmodified-Since``
+    on update and delete are checked and the note's row claimed atomically,
+    so a client holding an outdated ETag gets 412 instead of overwriting.
+    """
+
+    def note_pk(self):
+        return self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+
+    def list(self, request, *args, **kwargs):
+        version, modified_at = note_version(request.user)
+        etag = list_etag(request, request.user, version)
+        response = conditional_response(request._request, etag, modified_at) or super().list(request, *args, **kwargs)
+        return set_validators(response, etag, modified_at)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Look the note up first: a missing or foreign note is a 404, never a 304.
+        instance = self.get_object()
+        etag = detail_etag(request.user, instance.sync_version, instance.pk)
+        response = (
+            conditional_response(request._request, etag, instance.updated_at)
+            or Response(self.get_serializer(instance).data)
+        )
+        return set_validators(response, etag, instance.updated_at)
+
+    def write_with_preconditions(self, write, request, *args, **kwargs):
+        with transaction.atomic():
+            if preconditions_failed(request._request, request.user, self.note_pk()):
+                return Response({"error": PRECONDITION_FAILED}, status=status.HTTP_412_PRECONDITION_FAILED)
+            response = write(request, *args, **kwargs)
+        if 200 <= response.status_code < 300 and response.status_code != 204:
+            version, modified_at = detail_version(request.user, self.note_pk())
+            set_validators(response, detail_etag(request.user, version, self.note_pk()), modified_at)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        return self.write_with_preconditions(super().update, request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self.write_with_preconditions(super().destroy, request, *args, **kwargs)
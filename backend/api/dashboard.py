@@ -0,0 +1,151 @@
+"""
+Query builders for the admin dashboard endpoints.
+
+They return unevaluated querysets so the synchronous DRF views and the
+native async views in ``api.async_views`` run exactly the same SQL.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AuthorNoteStats, DailyNoteCount
+
+USER_STATS_SORTS = {
+    "notes": "note_count",
+    "last_active": "last_note_at",
+    "joined": "joined_at",
+}
+USER_STATS_MAX_LIMIT = 1000
+SNAPSHOT_PANELS = ("stats", "users", "notes_per_day", "notes_per_user")
+MAX_DAYS = 3660
+
+
+def total_notes_aggregate():
+    """Keyword arguments for ``AuthorNoteStats.objects.aggregate``."""
+    return {"total": Sum("note_count")}
+
+
+def daily_notes(days):
+    start_date = timezone.localdate() - timedelta(days=days)
+    return DailyNoteCount.objects.filter(
+        date__gte=start_date,
+        count__gt=0
+    ).values("date").annotate(
+        count=Sum("count")
+    ).order_by("date")
+
+
+def notes_distribution():
+    return AuthorNoteStats.objects.filter(
+        note_count__gt=0
+    ).values(
+        username=F("author__username"),
+        count=F("note_count")
+    ).order_by("-note_count")
+
+
+def parse_user_stats_params(params):
+    """
+    Validate user_stats query parameters.
+
+    Returns ``(field, descending, prefix, limit)``; ``limit`` is ``None``
+    unless a top-N listing was requested. Raises ``ValueError`` with a
+    client-facing message on bad input.
+    """
+    sort = params.get("sort", "-notes")
+    field = USER_STATS_SORTS.get(sort.lstrip("-"))
+    if field is None:
+        raise ValueError(f"sort must be one of {', '.join(USER_STATS_SORTS)}, optionally prefixed with '-'")
+    limit = _bounded_int(params, "limit", USER_STATS_MAX_LIMIT)
+    return field, sort.startswith("-"), params.get("username"), limit
+
+
+def parse_days(params):
+    """The ``days`` window of the daily series; raises ``ValueError`` when out of range."""
+    return _bounded_int(params, "days", MAX_DAYS, default=30)
+
+
+def _bounded_int(params, name, maximum, default=None):
+    if name not in params:
+        return default
+    try:
+        value = int(params[name])
+    except ValueError:
+        value = 0
+    if not 0 < value <= maximum:
+        raise ValueError(f"{name} must be between 1 and {maximum}")
+    return value
+
+
+def user_stats_rows(field, prefix=None):
+    """
+    Rows shaped for ``UserStatsSerializer``, served from ``AuthorNoteStats``
+    and its (sort key, author) indexes rather than an aggregate over notes.
+    """
+    stats = AuthorNoteStats.objects.all()
+    if field == "last_note_at":
+        # Users who never wrote a note have no last activity to sort by.
+        stats = stats.filter(last_note_at__isnull=False)
+    if prefix:
+        # A range instead of LIKE so the username index is usable on every backend.
+        stats = stats.filter(author__username__gte=prefix, author__username__lt=prefix + "\U0010ffff")
+    return stats.values(
+        field,
+        "author_id",
+        id=F("author_id"),
+        username=F("author__username"),
+        email=F("author__email"),
+        first_name=F("author__first_name"),
+        last_name=F("author__last_name"),
+        date_joined=F("joined_at"),
+        total_notes=F("note_count"),
+        last_note_date=F("last_note_at"),
+    )
+
+
+def top_user_stats_rows(field, descending, prefix, limit):
+    direction = "-" if descending else ""
+    return user_stats_rows(field, prefix).order_by(direction + field, direction + "author_id")[:limit]
+
+
+def parse_snapshot_params(params):
+    """
+    Validate snapshot query parameters.
+
+    Returns ``(panels, days, limit)``; ``panels`` defaults to all of
+    ``SNAPSHOT_PANELS``. Raises ``ValueError`` with a client-facing
+    message on bad input.
+    """
+    panels = SNAPSHOT_PANELS
+    if "panels" in params:
+        panels = tuple(dict.fromkeys(panel.strip() for panel in params["panels"].split(",") if panel.strip()))
+        if not panels or not set(panels) <= set(SNAPSHOT_PANELS):
+            raise ValueError(f"panels must be a comma-separated list of {', '.join(SNAPSHOT_PANELS)}")
+    days = parse_days(params)
+    limit = _bounded_int(params, "limit", USER_STATS_MAX_LIMIT, default=100)
+    return panels, days, limit
+
+
+def snapshot(panels, days, limit):
+    """
+    Evaluated data for the requested dashboard panels, one query per panel.
+
+    Each panel runs the query of its standalone endpoint: ``stats`` an
+    aggregate and ``users`` (the top ``limit`` users by notes) an index
+    scan on ``AuthorNoteStats``, so neither reads a row per user into
+    Python. Only ``notes_per_user`` lists every author with notes.
+    """
+    data = {}
+    if "stats" in panels:
+        data["stats"] = AuthorNoteStats.objects.aggregate(
+            total_users=Count("pk"), total_notes=Coalesce(Sum("note_count"), 0)
+        )
+    if "users" in panels:
+        data["users"] = list(top_user_stats_rows("note_count", True, None, limit))
+    if "notes_per_day" in panels:
+        data["notes_per_day"] = list(daily_notes(days))
+    if "notes_per_user" in panels:
+        data["notes_per_user"] = list(notes_distribution())
+    return data
@@ -0,0 +1,187 @@
+"""
+Versioned response cache for the admin dashboard endpoints.
+
+Entries are stored through Django's cache framework together with the
+"notes generation" they were computed at. Every Note/User write bumps the
+generation, which makes all existing entries stale at once without having
+to find or delete their keys.
+
+A stale or expired entry is recomputed by a single request holding a short
+lock; concurrent requests keep serving the stale payload meanwhile, so an
+expiry never turns into a stampede of identical aggregate queries.
+
+Responses built from an entry also carry a ``compression_cache`` key tied
+to that entry, so ``api.compression`` compresses each entry once per
+encoding rather than on every hit.
+"""
+import functools
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+GENERATION_KEY = "notes:generation"
+STATS_KEY_PREFIX = "dashboard-cache:stats:"
+OUTCOMES = ("hit", "stale", "miss")
+
+
+def _setting(name, default):
+    return getattr(settings, "DASHBOARD_CACHE", {}).get(name, default)
+
+
+def get_cache():
+    return caches[_setting("ALIAS", "default")]
+
+
+def get_generation():
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so a generation lost to eviction can never
+        # match one that cached entries were stored under.
+        cache.add(GENERATION_KEY, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        get_generation()
+
+
+def invalidate():
+    """Mark every cached dashboard entry stale after a Note/User write."""
+    # Bump now so this process stops serving old entries, and again after
+    # commit so entries computed from pre-commit data are discarded too.
+    bump_generation()
+    transaction.on_commit(bump_generation)
+
+
+def record(outcome):
+    cache = get_cache()
+    key = STATS_KEY_PREFIX + outcome
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_stats():
+    cache = get_cache()
+    counts = cache.get_many([STATS_KEY_PREFIX + outcome for outcome in OUTCOMES])
+    return {outcome: counts.get(STATS_KEY_PREFIX + outcome, 0) for outcome in OUTCOMES}
+
+
+def make_key(name, query_params):
+    params = sorted(query_params.lists())
+    digest = hashlib.sha1(repr(params).encode()).hexdigest()
+    return f"dashboard:{name}:{digest}"
+
+
+def _cached(response, key, entry):
+    """Let ``api.compression`` keep the compressed body for as long as the entry lives."""
+    response.compression_cache = (
+        get_cache(),
+        f"{key}:compressed:{entry['generation']}:{entry['expires']!r}",
+        _setting("TIMEOUT", 60) + _setting("STALE_TIMEOUT", 300),
+    )
+    return response
+
+
+def _lookup(key):
+    """
+    ``(outcome, entry, generation, locked)`` for ``key``. Unless the
+    outcome is "miss", ``entry`` is to be served as it is; on a miss the
+    caller recomputes it, and releases the lock afterwards if ``locked``.
+    """
+    cache = get_cache()
+    generation = get_generation()
+    entry = cache.get(key)
+    locked = False
+    if entry is not None:
+        if entry["generation"] == generation and entry["expires"] > time.time():
+            record("hit")
+            return "hit", entry, generation, False
+        if not cache.add(f"{key}:lock", 1, timeout=_setting("LOCK_TIMEOUT", 30)):
+            record("stale")
+            return "stale", entry, generation, False
+        locked = True
+    record("miss")
+    return "miss", entry, generation, locked
+
+
+def _store(key, generation, data):
+    timeout = _setting("TIMEOUT", 60)
+    entry = {"generation": generation, "expires": time.time() + timeout, "data": data}
+    get_cache().set(key, entry, timeout=timeout + _setting("STALE_TIMEOUT", 300))
+    return entry
+
+
+def _unlock(key):
+    get_cache().delete(f"{key}:lock")
+
+
+def cached_response(name):
+    """
+    Cache a DRF function view's successful responses under ``name``.
+
+    Apply it beneath ``@api_view``/``@permission_classes`` so that
+    authentication and permission checks still run on every request.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = make_key(name, request.query_params)
+            outcome, entry, generation, locked = _lookup(key)
+            if outcome != "miss":
+                return _cached(Response(entry["data"], headers={"X-Cache": outcome.upper()}), key, entry)
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    _cached(response, key, _store(key, generation, response.data))
+                response["X-Cache"] = "MISS"
+                return response
+            finally:
+                if locked:
+                    _unlock(key)
+        return wrapper
+    return decorator
+
+
+def acached_response(name):
+    """
+    ``cached_response`` for the native async views in ``api.async_views``.
+
+    Their responses are already-rendered JSON, so the body bytes are cached.
+    Apply it beneath ``@async_api_view``.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            key = make_key(name, request.GET)
+            outcome, entry, generation, locked = await sync_to_async(_lookup)(key)
+            if outcome != "miss":
+                response = HttpResponse(entry["data"], content_type="application/json")
+                response["X-Cache"] = outcome.upper()
+                return _cached(response, key, entry)
+            try:
+                response = await view(request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    _cached(response, key, await sync_to_async(_store)(key, generation, response.content))
+                response["X-Cache"] = "MISS"
+                return response
+            finally:
+                if locked:
+                    await sync_to_async(_unlock)(key)
+        return wrapper
+    return decorator
@@ -0,0 +1,30 @@
+"""
+Per-connection database setup.
+
+SQLite keeps most tuning pragmas per connection, so ``settings.SQLITE_PRAGMAS``
+is applied every time Django opens one. ``journal_mode=WAL`` is stored in
+the database file; setting it again is a no-op, and in-memory databases
+(the test database) keep their ``memory`` journal.
+
+The SQL functions that read ``CompressedTextField`` values (see
+``api.fields``) are registered here too.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .fields import decompress_text, text_prefix
+
+
+@receiver(connection_created, dispatch_uid="api.database.configure_sqlite")
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    connection.connection.create_function("note_text", 1, decompress_text, deterministic=True)
+    connection.connection.create_function("text_prefix", 2, text_prefix, deterministic=True)
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
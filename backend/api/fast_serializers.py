@@ -0,0 +1,116 @@
+"""
+Fast read path for ``ModelSerializer`` output.
+
+``FastReadSerializer`` compiles a serializer's readable fields once into
+``(name, source, converter)`` triples and then turns ``.values()`` rows into
+plain dicts, skipping the per-field ``get_attribute``/``to_representation``
+dispatch and model instantiation. Converters reproduce DRF's own output
+exactly; fields without a known fast converter fall back to the field's
+``to_representation``, so the rendered JSON is byte-identical either way.
+"""
+from rest_framework import fields as drf_fields
+from rest_framework import relations
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+
+def _identity(value):
+    return value
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        if text.endswith("+00:00"):
+            return text[:-6] + "Z"
+        return text
+    return convert
+
+
+def _converter(field):
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        # .values() already yields the related primary key.
+        return _identity
+    if type(field) is drf_fields.IntegerField:
+        return int
+    if type(field) is getattr(drf_fields, "BigIntegerField", None) and not getattr(
+        field, "coerce_to_string", getattr(api_settings, "COERCE_BIGINT_TO_STRING", False)
+    ):
+        return int
+    if type(field) is drf_fields.ReadOnlyField:
+        return _identity
+    if isinstance(field, drf_fields.CharField):
+        return str
+    if type(field) is drf_fields.FloatField:
+        return float
+    if type(field) is drf_fields.DateTimeField:
+        return _datetime_converter(field)
+    return field.to_representation
+
+
+class FastReadSerializer:
+    """
+    Serialize querysets for ``serializer`` through ``.values()``.
+
+    ``serializer`` is a serializer instance (so context such as sparse
+    fieldsets applies) or a serializer class. Only fields whose source is a
+    plain column or annotation name are supported.
+    """
+
+    def __init__(self, serializer):
+        if isinstance(serializer, type):
+            serializer = serializer()
+        self.fields = []
+        for field in serializer._readable_fields:
+            if "." in field.source or field.source == "*":
+                raise ValueError(f"Field {field.field_name!r} has no flat source")
+            self.fields.append((field.field_name, field.source, _converter(field)))
+        self.sources = [source for _, source, _ in self.fields]
+
+    def values(self, queryset, *extra):
+        """Return ``queryset.values()`` limited to the serializer's sources (plus ``extra``)."""
+        return queryset.values(*dict.fromkeys([*self.sources, *extra]))
+
+    def serialize(self, rows):
+        fields = self.fields
+        return [
+            {
+                name: None if (value := row[source]) is None else convert(value)
+                for name, source, convert in fields
+            }
+            for row in rows
+        ]
+
+    def data(self, queryset):
+        return self.serialize(self.values(queryset))
+
+
+class FastListMixin:
+    """
+    ``list()`` for a ``ModelViewSet`` that serializes ``.values()`` rows.
+
+    Pagination classes that accept dict rows (cursor pagination does) keep
+    working unchanged; the ordering columns are always selected for them.
+    """
+
+    def list(self, request, *args, **kwargs):
+        fast = FastReadSerializer(self.get_serializer())
+        ordering = getattr(self.paginator, "ordering", ())
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = [field.lstrip("-") for field in ordering]
+        queryset = fast.values(self.filter_queryset(self.get_queryset()), *ordering)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(queryset))
@@ -0,0 +1,127 @@
+"""
+Transparently compressed text for note bodies.
+
+On SQLite, ``CompressedTextField`` stores values of at least
+``NOTE_COMPRESSION["THRESHOLD"]`` UTF-8 bytes as a BLOB in the same TEXT
+column: one format marker byte followed by the zlib or zstd stream. The
+field only compresses when that makes the value smaller. Shorter values
+stay plain text, so existing rows and small notes read as before.
+
+SQL can't read the compressed rows directly. ``api.database`` registers
+``note_text(column)`` and ``text_prefix(column, length)`` SQL functions on
+every SQLite connection, and ``TextPrefix`` calls the latter for listing
+previews. The full-text search triggers and their view use ``note_text``,
+so any connection that writes notes must be opened by Django.
+
+Postgres already compresses large ``text`` values through TOAST (switched
+to lz4 by the migration), and its search index is an expression over the
+plain column. There the field stores text unchanged.
+"""
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models import Func, IntegerField, TextField, Value
+from django.db.models.functions import Substr
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for ALGORITHM "zstd"
+    zstandard = None
+
+ZLIB = 1
+ZSTD = 2
+CODECS = {"zlib": ZLIB, "zstd": ZSTD}
+
+
+def _setting(name, default):
+    return getattr(settings, "NOTE_COMPRESSION", {}).get(name, default)
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImproperlyConfigured("zstd note compression needs the 'zstandard' package")
+
+
+def compress_text(text):
+    """Return ``text`` as marker-prefixed compressed bytes, or unchanged if that isn't smaller."""
+    raw = text.encode("utf-8")
+    if len(raw) < _setting("THRESHOLD", 4096):
+        return text
+    algorithm = _setting("ALGORITHM", "zlib")
+    if algorithm not in CODECS:
+        raise ImproperlyConfigured(f"Unknown NOTE_COMPRESSION algorithm: {algorithm!r}")
+    if algorithm == "zstd":
+        _require_zstandard()
+        packed = bytes([ZSTD]) + zstandard.ZstdCompressor(level=_setting("LEVEL", 3)).compress(raw)
+    else:
+        packed = bytes([ZLIB]) + zlib.compress(raw, _setting("LEVEL", 6))
+    return packed if len(packed) < len(raw) else text
+
+
+def _inflate(data, max_length=-1):
+    marker, body = data[0], data[1:]
+    if marker == ZLIB:
+        if max_length < 0:
+            return zlib.decompress(body)
+        return zlib.decompressobj().decompress(body, max_length)
+    if marker == ZSTD:
+        _require_zstandard()
+        with zstandard.ZstdDecompressor().stream_reader(body) as reader:
+            return reader.read(max_length)
+    raise ValueError(f"Unknown compressed text format: {marker}")
+
+
+def decompress_text(value):
+    """Inverse of ``compress_text``; plain strings and ``None`` pass through."""
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, bytes):
+        return _inflate(value).decode("utf-8")
+    return value
+
+
+def text_prefix(value, length):
+    """The first ``length`` characters of a stored value, inflating no more than needed."""
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, bytes):
+        # A UTF-8 character is at most four bytes; a character cut at the
+        # end lies past ``length`` and is dropped by the slice.
+        value = _inflate(value, length * 4).decode("utf-8", "ignore")
+    return None if value is None else value[:length]
+
+
+class CompressedTextField(models.TextField):
+    description = "Text, compressed above a size threshold"
+
+    def from_db_value(self, value, expression, connection):
+        return decompress_text(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return decompress_text(value)
+        return super().to_python(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if isinstance(value, str) and connection.vendor == "sqlite":
+            return compress_text(value)
+        return value
+
+
+class TextPrefix(Func):
+    """``Substr(column, 1, length)`` for a ``CompressedTextField`` column."""
+
+    function = "text_prefix"
+    output_field = TextField()
+
+    def __init__(self, expression, length, **extra):
+        super().__init__(expression, Value(length, output_field=IntegerField()), **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        if connection.vendor != "sqlite":
+            expression, length = self.source_expressions
+            return compiler.compile(Substr(expression, Value(1), length))
+        return super().as_sql(compiler, connection, **extra_context)
@@ -0,0 +1,165 @@
+"""
+Password hashing in a bounded process pool.
+
+A PBKDF2 hash is deliberately slow: hundreds of milliseconds of CPU. Run
+in the request thread, a burst of logins or registrations can occupy
+every worker and core while cheap note reads wait behind them. Instead,
+hashes run in a pool of ``PASSWORD_HASHING["WORKERS"]`` processes, so at
+most that many cores hash at once. At most ``QUEUE`` more hashes may wait
+for a free process. Any request beyond that gets ``Overloaded`` (a 503
+with ``Retry-After``) at once instead of queueing.
+
+``PooledModelBackend`` uses the pool for logins, and ``UserSerializer``
+uses it for registrations. ``WORKERS`` 0 hashes in the request thread
+with no limit, as Django does by default.
+
+DRF views turn ``Overloaded`` into the 503 themselves. For other callers
+of ``authenticate()``, such as the admin login, ``OverloadedMiddleware``
+does it, where they would otherwise fail with a 500.
+"""
+import os
+import threading
+from concurrent import futures
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth import hashers
+from django.contrib.auth.backends import ModelBackend
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many logins and registrations in progress, try again shortly."
+    default_code = "overloaded"
+    # Sent as Retry-After by DRF's exception handler.
+    wait = 1
+
+
+def _setting(name, default):
+    return getattr(settings, "PASSWORD_HASHING", {}).get(name, default)
+
+
+def _init_worker():
+    # Forked workers inherit a configured Django; spawned ones start bare.
+    if not apps.ready:
+        django.setup()
+
+
+def _verify(password, encoded):
+    """``(valid, must_update)``, as ``django.contrib.auth.hashers.check_password`` decides them."""
+    valid = hashers.check_password(password, encoded)
+    if not valid:
+        return False, False
+    preferred = hashers.get_hasher("default")
+    hasher = hashers.identify_hasher(encoded)
+    return True, hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+_lock = threading.Lock()
+_pool = None  # (pid, executor, slots)
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        # A forked server process must not share its parent's pool.
+        if _pool is None or _pool[0] != os.getpid():
+            workers = _setting("WORKERS", 1)
+            _pool = (
+                os.getpid(),
+                futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker),
+                threading.BoundedSemaphore(workers + _setting("QUEUE", 8)),
+            )
+        return _pool[1], _pool[2]
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None and _pool[0] == os.getpid():
+            _pool[1].shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+@receiver(setting_changed)
+def _settings_changed(setting, **kwargs):
+    if setting == "PASSWORD_HASHING":
+        shutdown()
+
+
+def _run(function, *args):
+    if _setting("WORKERS", 1) == 0:
+        return function(*args)
+    executor, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise Overloaded()
+    try:
+        future = executor.submit(function, *args)
+    except BrokenProcessPool:
+        slots.release()
+        shutdown()
+        raise Overloaded()
+    # The slot stays taken until the hash finishes, even if we stop waiting.
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=_setting("TIMEOUT", 30))
+    except futures.TimeoutError:
+        raise Overloaded()
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time.
+        shutdown()
+        raise Overloaded()
+
+
+def make_password(password):
+    return _run(hashers.make_password, password)
+
+
+def verify_password(password, encoded):
+    """Return ``(valid, must_update)`` for ``password`` against the stored ``encoded`` hash."""
+    return _run(_verify, password, encoded)
+
+
+class PooledModelBackend(ModelBackend):
+    """``ModelBackend`` with the password check done in the hashing pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so that unknown usernames take as long as known ones.
+            make_password(password)
+            return None
+        valid, must_update = verify_password(password, user.password)
+        if not valid:
+            return None
+        if must_update:
+            # Upgrade the stored hash, as User.check_password does.
+            user.password = make_password(password)
+            user.save(update_fields=["password"])
+        return user if self.user_can_authenticate(user) else None
+
+
+class OverloadedMiddleware(MiddlewareMixin):
+    """Answer ``Overloaded`` raised outside DRF views like DRF does: 503 with Retry-After."""
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, Overloaded):
+            return None
+        response = JsonResponse({"detail": str(exception.detail)}, status=exception.status_code)
+        response["Retry-After"] = str(exception.wait)
+        return response
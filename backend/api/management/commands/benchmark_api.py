@@ -0,0 +1,160 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from api import benchmarks
+from datetime import datetime, timezone
+import django
+import json
+import platform
+import subprocess
+import sys
+
+SIZE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    multiplier = SIZE_SUFFIXES.get(text[-1:], 1)
+    digits = text[:-1] if text[-1:] in SIZE_SUFFIXES else text
+    if not digits.isdigit() or int(digits) == 0:
+        raise CommandError(f'Invalid size: {text!r}')
+    return int(digits) * multiplier
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks every API route through the test client on seeded data sets and '
+        'writes p50/p95/p99 latency, query counts and rows read as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10k',
+            help='Comma-separated note counts to seed and benchmark, e.g. 10k,100k,1m',
+        )
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario')
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            help='Only run this scenario; repeat for several',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Clear the cache before every request to measure the uncached path',
+        )
+        parser.add_argument('--output', help='Write the JSON results to this file')
+        parser.add_argument('--compare', help='Previous JSON results to diff against')
+        parser.add_argument('--workers', type=int, default=1, help='populate_db workers used for seeding')
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Keep the benchmark database (and its seeded data) for the next run',
+        )
+        parser.add_argument(
+            '--in-place',
+            action='store_true',
+            help='Seed and benchmark the configured database instead of a separate test database',
+        )
+
+    def handle(self, *args, **kwargs):
+        sizes = sorted(parse_size(size) for size in kwargs['sizes'].split(','))
+        scenarios = benchmarks.SCENARIOS
+        if kwargs['scenarios']:
+            known = {scenario.name: scenario for scenario in scenarios}
+            unknown = [name for name in kwargs['scenarios'] if name not in known]
+            if unknown:
+                raise CommandError(f'Unknown scenario(s): {", ".join(unknown)}')
+            scenarios = [known[name] for name in kwargs['scenarios']]
+        baseline = None
+        if kwargs['compare']:
+            with open(kwargs['compare']) as f:
+                baseline = json.load(f)
+
+        uncovered = benchmarks.uncovered_routes()
+        if uncovered:
+            self.stdout.write(self.style.WARNING(f'Routes without a scenario: {", ".join(uncovered)}'))
+
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:  # already set up, e.g. when called from a test
+            own_environment = False
+        old_name = None
+        try:
+            if not kwargs['in_place']:
+                if connection.vendor == 'sqlite' and kwargs['keepdb']:
+                    # The default SQLite test database lives in memory.
+                    connection.settings_dict['TEST']['NAME'] = str(settings.BASE_DIR / 'benchmark.sqlite3')
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=kwargs['keepdb'])
+            results = self.run(sizes, scenarios, kwargs)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=kwargs['keepdb'])
+            if own_environment:
+                teardown_test_environment()
+
+        if kwargs['output']:
+            with open(kwargs['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {kwargs["output"]}'))
+        if baseline is not None:
+            self.report_changes(baseline, results)
+
+    def run(self, sizes, scenarios, options):
+        results = {'meta': self.meta(options), 'sizes': {}}
+        for size in sizes:
+            self.stdout.write(f'Seeding {size} notes...')
+            context = benchmarks.BenchmarkContext(size, workers=options['workers'], stdout=self.stdout)
+            self.stdout.write(
+                f'{"scenario":<24} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"queries":>8} {"rows":>10}'
+            )
+            size_results = results['sizes'][str(size)] = {}
+            for scenario in scenarios:
+                result = benchmarks.run_scenario(
+                    context, scenario, iterations=options['iterations'],
+                    warmup=options['warmup'], cold=options['cold'],
+                )
+                size_results[scenario.name] = result
+                rows = '-' if result['rows_read'] is None else result['rows_read']
+                self.stdout.write(
+                    f'{scenario.name:<24} {result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} '
+                    f'{result["p99_ms"]:>9.2f} {result["queries"]:>8} {rows:>10}'
+                )
+        return results
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'commit': commit,
+            'vendor': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': options['iterations'],
+            'cold': options['cold'],
+            'argv': sys.argv[1:],
+        }
+
+    def report_changes(self, baseline, results):
+        changes = list(benchmarks.compare(baseline, results))
+        if not changes:
+            self.stdout.write('No differences from the baseline')
+            return
+        self.stdout.write(f'{"size":>8} {"scenario":<24} {"metric":<10} {"before":>10} {"after":>10} {"change":>8}')
+        for size, name, metric, before, after in changes:
+            if metric.endswith('_ms') and before:
+                change = f'{(after - before) / before:+.0%}'
+            else:
+                change = ''
+            self.stdout.write(f'{size:>8} {name:<24} {metric:<10} {before!s:>10} {after!s:>10} {change:>8}')
@@ -0,0 +1,152 @@
+from contextlib import contextmanager
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from api import fields
+from api.fields import TextPrefix
+from api.models import Note, NoteTombstone
+from api.seeding import generate_chunk, utc_now
+from api.views import PREVIEW_LENGTH
+import tempfile
+import time
+
+# Sizes of the large documents, made by joining seeded notes.
+DOCUMENT_SIZES = (8 * 1024, 64 * 1024, 512 * 1024)
+NO_COMPRESSION = {'THRESHOLD': float('inf')}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures note body compression: stored size and codec time per note for the '
+        'seeded dataset and large documents, then storage and read time in a throwaway database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Seeded users to generate notes for')
+        parser.add_argument('--documents', type=int, default=20, help='Large documents of each size')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **kwargs):
+        if kwargs['users'] < 1 or kwargs['documents'] < 1:
+            raise CommandError('--users and --documents must be positive')
+        seeded = [content for _, _, content, _ in generate_chunk(
+            kwargs['seed'], 0, 0, kwargs['users'], 5, 15, utc_now()
+        )[1]]
+        corpus = '\n\n'.join(seeded)
+        datasets = [('seeded notes', seeded)] + [
+            (f'{size // 1024} KiB docs', [
+                (corpus[offset:] + corpus)[:size]
+                for offset in range(0, kwargs['documents'] * 997, 997)
+            ])
+            for size in DOCUMENT_SIZES
+        ]
+        codecs = [('zlib', level) for level in (1, 6, 9)]
+        if fields.zstandard is not None:
+            codecs += [('zstd', level) for level in (3, 19)]
+
+        self.stdout.write(
+            f'{"dataset":<16} {"codec":<8} {"notes":>6} {"raw KiB":>10} {"stored KiB":>10} '
+            f'{"ratio":>6} {"comp us":>9} {"decomp us":>9} {"prefix us":>9}'
+        )
+        for name, bodies in datasets:
+            for algorithm, level in codecs:
+                result = self.codec(bodies, algorithm, level)
+                self.stdout.write(
+                    f'{name:<16} {f"{algorithm}-{level}":<8} {len(bodies):>6} '
+                    f'{result["raw"] / 1024:>10,.0f} {result["stored"] / 1024:>10,.0f} '
+                    f'{result["raw"] / result["stored"]:>6.2f} {result["compress_us"]:>9.1f} '
+                    f'{result["decompress_us"]:>9.1f} {result["prefix_us"]:>9.1f}'
+                )
+
+        if connection.vendor != 'sqlite':
+            self.stdout.write('Skipping the database comparison: only SQLite stores compressed bodies')
+            return
+        self.stdout.write(
+            f'\n{"dataset":<16} {"mode":<6} {"db KiB":>10} {"insert ms":>10} '
+            f'{"read ms":>9} {"preview ms":>10}'
+        )
+        with self.database():
+            author = User.objects.create(username='bench-compression', password='!')
+            for name, bodies in datasets:
+                for mode, compression in (('plain', NO_COMPRESSION), ('zlib', {})):
+                    with override_settings(NOTE_COMPRESSION=compression):
+                        result = self.database_run(author, bodies)
+                    self.stdout.write(
+                        f'{name:<16} {mode:<6} {result["size"] / 1024:>10,.0f} '
+                        f'{result["insert_ms"]:>10.1f} {result["read_ms"]:>9.1f} {result["preview_ms"]:>10.1f}'
+                    )
+
+    def codec(self, bodies, algorithm, level):
+        with override_settings(NOTE_COMPRESSION={'ALGORITHM': algorithm, 'LEVEL': level}):
+            started = time.perf_counter()
+            stored = [fields.compress_text(body) for body in bodies]
+            compressed = time.perf_counter() - started
+        started = time.perf_counter()
+        for value in stored:
+            fields.decompress_text(value)
+        decompressed = time.perf_counter() - started
+        started = time.perf_counter()
+        for value in stored:
+            fields.text_prefix(value, PREVIEW_LENGTH)
+        prefixed = time.perf_counter() - started
+        count = len(bodies)
+        return {
+            'raw': sum(len(body.encode()) for body in bodies),
+            'stored': sum(len(value if isinstance(value, bytes) else value.encode()) for value in stored),
+            'compress_us': compressed / count * 1e6,
+            'decompress_us': decompressed / count * 1e6,
+            'prefix_us': prefixed / count * 1e6,
+        }
+
+    @contextmanager
+    def database(self):
+        """A throwaway file database, so that its size can be measured."""
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:  # already set up, e.g. when called from a test
+            own_environment = False
+        with tempfile.TemporaryDirectory() as tmp:
+            connection.settings_dict['TEST']['NAME'] = f'{tmp}/benchmark_compression.sqlite3'
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                yield
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                if own_environment:
+                    teardown_test_environment()
+
+    def database_run(self, author, bodies):
+        started = time.perf_counter()
+        with transaction.atomic():
+            for i, body in enumerate(bodies):
+                # One by one, as the API writes them, so the FTS triggers run per note.
+                Note.objects.create(title=f'Document {i}', content=body, author=author)
+        inserted = time.perf_counter() - started
+
+        notes = Note.objects.filter(author=author).order_by('id')
+        started = time.perf_counter()
+        list(notes.values_list('content', flat=True))
+        read = time.perf_counter() - started
+        started = time.perf_counter()
+        list(notes.values_list(TextPrefix('content', PREVIEW_LENGTH), flat=True))
+        previewed = time.perf_counter() - started
+
+        with connection.cursor() as cursor:
+            # Merge away the index entries of the previous run's deleted notes.
+            cursor.execute("INSERT INTO api_note_fts(api_note_fts) VALUES ('optimize')")
+            cursor.execute('VACUUM')
+            cursor.execute(
+                'SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()'
+            )
+            size = cursor.fetchone()[0]
+        with transaction.atomic():
+            notes.delete()
+            NoteTombstone.objects.all().delete()
+        return {
+            'size': size,
+            'insert_ms': inserted * 1000,
+            'read_ms': read * 1000,
+            'preview_ms': previewed * 1000,
+        }
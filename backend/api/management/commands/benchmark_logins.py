@@ -0,0 +1,163 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from api import benchmarks, hashing
+from api.models import Note
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+PASSWORD = 'storm-password-123'
+MODES = ('idle', 'inline', 'pool')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures note-read latency while other clients log in and register: without them '
+        '("idle"), with passwords hashed in the request threads ("inline") and in the bounded '
+        'hashing pool ("pool")'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--storm', type=int, default=8, help='Concurrent login/registration clients')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per mode')
+        parser.add_argument(
+            '--register-share', type=float, default=0.25,
+            help='Fraction of storm requests that register instead of logging in',
+        )
+        parser.add_argument('--notes', type=int, default=200, help='Notes the reader lists')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['storm'] < 1 or kwargs['duration'] <= 0 or kwargs['notes'] < 1:
+            raise CommandError('--storm, --duration and --notes must be positive')
+        if not 0 <= kwargs['register_share'] <= 1:
+            raise CommandError('--register-share must be between 0 and 1')
+
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:  # already set up, e.g. when called from a test
+            own_environment = False
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == 'sqlite':
+                # Threads need a shared file; the default test database is
+                # private to each in-memory connection.
+                connection.settings_dict['TEST']['NAME'] = f'{tmp}/benchmark_logins.sqlite3'
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            # Django logs every shed request as a 5xx error.
+            request_logger = logging.getLogger('django.request')
+            level = request_logger.level
+            request_logger.setLevel(logging.CRITICAL)
+            try:
+                reader, usernames = self.seed(kwargs['storm'], kwargs['notes'])
+                pool = settings.PASSWORD_HASHING
+                self.stdout.write(
+                    f'{os.cpu_count()} CPUs, {kwargs["storm"]} storm clients, '
+                    f'pool of {pool["WORKERS"]} workers + {pool["QUEUE"]} queued\n'
+                    f'{"mode":<7} {"read p50 ms":>12} {"p95 ms":>9} {"p99 ms":>9} '
+                    f'{"reads/s":>8} {"auth ok/s":>10} {"auth p50 ms":>12} {"503/s":>7} {"errors":>7}'
+                )
+                for mode in MODES:
+                    hashing_settings = {**pool, 'WORKERS': 0} if mode == 'inline' else pool
+                    with override_settings(
+                        THROTTLE={**settings.THROTTLE, 'ENABLED': False}, PASSWORD_HASHING=hashing_settings,
+                    ):
+                        hashing.make_password(PASSWORD)  # start the pool's processes
+                        result = self.run(mode, reader, usernames, kwargs)
+                    self.stdout.write(
+                        f'{mode:<7} {result["read_p50_ms"]:>12.2f} {result["read_p95_ms"]:>9.2f} '
+                        f'{result["read_p99_ms"]:>9.2f} {result["reads_per_s"]:>8,.0f} '
+                        f'{result["auth_per_s"]:>10.1f} {result["auth_p50_ms"]:>12.0f} '
+                        f'{result["shed_per_s"]:>7.1f} {result["errors"]:>7}'
+                    )
+            finally:
+                request_logger.setLevel(level)
+                hashing.shutdown()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                if own_environment:
+                    teardown_test_environment()
+
+    def seed(self, storm, notes):
+        # One real hash shared by every storm user keeps seeding fast.
+        encoded = make_password(PASSWORD)
+        usernames = [f'bench-login-{i}' for i in range(storm * 4)]
+        User.objects.bulk_create(User(username=username, password=encoded) for username in usernames)
+        reader = User.objects.create(username='bench-reader', password='!')
+        Note.objects.bulk_create(
+            Note(title=f'Note {i}', content='Benchmark read', author=reader) for i in range(notes)
+        )
+        return reader, usernames
+
+    def run(self, mode, reader, usernames, kwargs):
+        stop = threading.Event()
+        lock = threading.Lock()
+        auth_latencies, statuses = [], []
+        read_latencies = []
+
+        def storm(index):
+            client = Client()
+            rng = random.Random(index)
+            own_latencies, own_statuses = [], []
+            sequence = 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                if rng.random() < kwargs['register_share']:
+                    sequence += 1
+                    username = f'bench-{mode}-{index}-{sequence}'
+                    response = client.post(reverse('user-list'), {
+                        'username': username, 'email': f'{username}@example.com',
+                        'password': PASSWORD, 'confirm_password': PASSWORD,
+                    })
+                else:
+                    response = client.post(reverse('get_token'), {
+                        'username': rng.choice(usernames), 'password': PASSWORD,
+                    })
+                if response.status_code in (200, 201):
+                    own_latencies.append((time.perf_counter() - started) * 1000)
+                own_statuses.append(response.status_code)
+            connections.close_all()
+            with lock:
+                auth_latencies.extend(own_latencies)
+                statuses.extend(own_statuses)
+
+        def read():
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(reader).access_token}')
+            url = reverse('note-list')
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.status_code == 200:
+                    read_latencies.append((time.perf_counter() - started) * 1000)
+            connections.close_all()
+
+        clients = 0 if mode == 'idle' else kwargs['storm']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients + 1) as pool:
+            running = [pool.submit(read)] + [pool.submit(storm, i) for i in range(clients)]
+            time.sleep(kwargs['duration'])
+            stop.set()
+            for future in running:
+                future.result()
+        elapsed = time.perf_counter() - started
+        read_latencies.sort()
+        auth_latencies.sort()
+        return {
+            'read_p50_ms': benchmarks.percentile(read_latencies, 50) if read_latencies else 0.0,
+            'read_p95_ms': benchmarks.percentile(read_latencies, 95) if read_latencies else 0.0,
+            'read_p99_ms': benchmarks.percentile(read_latencies, 99) if read_latencies else 0.0,
+            'reads_per_s': len(read_latencies) / elapsed,
+            'auth_per_s': len(auth_latencies) / elapsed,
+            'auth_p50_ms': benchmarks.percentile(auth_latencies, 50) if auth_latencies else 0.0,
+            'shed_per_s': statuses.count(503) / elapsed,
+            'errors': sum(1 for code in statuses if code not in (200, 201, 503)),
+        }
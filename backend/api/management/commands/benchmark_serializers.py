@@ -0,0 +1,84 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from api.fast_serializers import FastReadSerializer
+from api.models import Note
+from api.serializers import NoteSerializer, UserStatsSerializer
+from datetime import timedelta
+import time
+
+
+class Command(BaseCommand):
+    help = 'Compares ModelSerializer against the fast .values() read path'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000,100000',
+            help='Comma-separated row counts to benchmark',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per path; the best time is reported',
+        )
+
+    def handle(self, *args, **kwargs):
+        try:
+            sizes = [int(size) for size in kwargs['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        self.stdout.write(f'{"rows":>8} {"serializer":<20} {"drf (s)":>9} {"fast (s)":>9} {"speedup":>8}')
+        for size in sizes:
+            # Seed inside a transaction that is always rolled back.
+            with transaction.atomic():
+                author = self.seed(size)
+                self.compare(size, 'NoteSerializer', NoteSerializer,
+                             Note.objects.filter(author=author).order_by('-created_at', '-id'),
+                             kwargs['repeat'])
+                users = User.objects.filter(username__startswith='bench-').annotate(
+                    total_notes=Count('notes'),
+                    last_note_date=Max('notes__created_at')
+                ).order_by('-total_notes')
+                self.compare(size, 'UserStatsSerializer', UserStatsSerializer, users, kwargs['repeat'])
+                transaction.set_rollback(True)
+
+    def seed(self, size):
+        now = timezone.now()
+        users = User.objects.bulk_create([
+            User(username=f'bench-{i}', email=f'bench-{i}@example.com', first_name='Bench', last_name=str(i))
+            for i in range(size)
+        ], batch_size=2000)
+        notes = Note.objects.bulk_create([
+            Note(title=f'Note {i}', content='Lorem ipsum dolor sit amet. ' * 8, author=users[0])
+            for i in range(size)
+        ], batch_size=2000)
+        # auto_now_add overrides created_at on insert; bulk_update doesn't.
+        for i, note in enumerate(notes):
+            note.created_at = now - timedelta(minutes=i)
+        Note.objects.bulk_update(notes, ['created_at'], batch_size=2000)
+        return users[0]
+
+    def compare(self, size, name, serializer_class, queryset, repeat):
+        renderer = JSONRenderer()
+        drf_time, drf_data = self.best_of(repeat, lambda: serializer_class(queryset.all(), many=True).data)
+        fast_time, fast_data = self.best_of(repeat, lambda: FastReadSerializer(serializer_class).data(queryset.all()))
+        if renderer.render(drf_data) != renderer.render(fast_data):
+            raise CommandError(f'{name}: fast path output differs from ModelSerializer at {size} rows')
+        self.stdout.write(
+            f'{size:>8} {name:<20} {drf_time:>9.3f} {fast_time:>9.3f} {drf_time / fast_time:>7.1f}x'
+        )
+
+    def best_of(self, repeat, run):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import resolve, reverse
+from api import benchmarks, throttling
+from io import StringIO
+import time
+
+# Limits no benchmark loop can exhaust, so every check takes the allowed path.
+UNLIMITED = {'USER': {'RATE': 1e9, 'BURST': 1e9}, 'ROUTE': {'RATE': 1e9, 'BURST': 1e9}}
+# Limits every check after the first is rejected by.
+EXHAUSTED = {'USER': {'RATE': 1e-9, 'BURST': 1}, 'ROUTE': {'RATE': 1e-9, 'BURST': 1}}
+SCENARIOS = ('note-list', 'note-detail', 'dashboard-stats')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the cost of the request throttle: a single check against each store, '
+        'and API latency with throttling on and off'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=200_000, help='Throttle checks per case')
+        parser.add_argument('--iterations', type=int, default=200, help='Timed API requests per scenario')
+        parser.add_argument('--notes', type=int, default=1000, help='Notes to seed for the API requests')
+
+    def handle(self, *args, **kwargs):
+        if min(kwargs['checks'], kwargs['iterations'], kwargs['notes']) < 1:
+            raise CommandError('--checks, --iterations and --notes must be positive')
+        self.stdout.write(f'{"check":<28} {"ns/check":>10}')
+        for name, overrides in (
+            ('disabled', {'ENABLED': False}),
+            ('memory, allowed', UNLIMITED),
+            ('memory, rejected', EXHAUSTED),
+            ('cache (default), allowed', {**UNLIMITED, 'CACHE_ALIAS': 'default'}),
+        ):
+            with override_settings(THROTTLE={**settings.THROTTLE, **overrides}):
+                ns = self.time_checks(kwargs['checks'])
+            self.stdout.write(f'{name:<28} {ns:>10,.0f}')
+
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:  # already set up, e.g. when called from a test
+            own_environment = False
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            context = benchmarks.BenchmarkContext(kwargs['notes'], stdout=StringIO())
+            scenarios = {scenario.name: scenario for scenario in benchmarks.SCENARIOS}
+            self.stdout.write(f'\n{"scenario":<18} {"off p50 ms":>11} {"on p50 ms":>10} {"overhead":>9}')
+            for name in SCENARIOS:
+                p50 = {}
+                for mode, overrides in (('off', {'ENABLED': False}), ('on', UNLIMITED)):
+                    with override_settings(THROTTLE={**settings.THROTTLE, **overrides}):
+                        p50[mode] = benchmarks.run_scenario(
+                            context, scenarios[name], iterations=kwargs['iterations'], warmup=10
+                        )['p50_ms']
+                self.stdout.write(
+                    f'{name:<18} {p50["off"]:>11.3f} {p50["on"]:>10.3f} '
+                    f'{(p50["on"] - p50["off"]) / p50["off"]:>9.1%}'
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if own_environment:
+                teardown_test_environment()
+        throttling.reset()
+
+    def time_checks(self, count):
+        request = RequestFactory().get(reverse('note-list'))
+        request.resolver_match = resolve(request.path)
+        user = User(pk=1, username='bench')
+        throttling.reset()
+        check = throttling.check
+        started = time.perf_counter()
+        for _ in range(count):
+            check(request, user)
+        elapsed = time.perf_counter() - started
+        throttling.reset()
+        return elapsed / count * 1e9
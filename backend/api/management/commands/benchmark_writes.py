@@ -0,0 +1,130 @@
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection, connections, transaction
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from api import benchmarks
+from api.models import Note
+import tempfile
+import threading
+import time
+
+# SQLite's and Django's defaults, i.e. the database layer before tuning.
+UNTUNED_SQLITE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+MODES = ('untuned', 'tuned')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures concurrent note-creation throughput with the default database settings '
+        '("untuned") and the configured ones ("tuned") on a throwaway database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers')
+        parser.add_argument('--writes', type=int, default=200, help='Notes each writer creates')
+        parser.add_argument('--mode', choices=MODES + ('both',), default='both')
+
+    def handle(self, *args, **kwargs):
+        threads, writes = kwargs['threads'], kwargs['writes']
+        if threads < 1 or writes < 1:
+            raise CommandError('--threads and --writes must be positive')
+        modes = MODES if kwargs['mode'] == 'both' else (kwargs['mode'],)
+
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:  # already set up, e.g. when called from a test
+            own_environment = False
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == 'sqlite':
+                # Writers need a shared file; the default test database is
+                # private to each in-memory connection.
+                connection.settings_dict['TEST']['NAME'] = f'{tmp}/benchmark_writes.sqlite3'
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                authors = self.create_authors(threads)
+                self.stdout.write(
+                    f'{connection.vendor}: {threads} threads x {writes} writes\n'
+                    f'{"mode":<8} {"writes/s":>10} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"errors":>7}'
+                )
+                for mode in modes:
+                    with self.database_mode(mode):
+                        result = self.run(authors, writes)
+                    self.stdout.write(
+                        f'{mode:<8} {result["writes_per_s"]:>10,.0f} {result["p50_ms"]:>9.2f} '
+                        f'{result["p95_ms"]:>9.2f} {result["p99_ms"]:>9.2f} {result["errors"]:>7}'
+                    )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                if own_environment:
+                    teardown_test_environment()
+
+    def create_authors(self, count):
+        return [User.objects.create(username=f'bench-writer-{i}', password='!') for i in range(count)]
+
+    @contextmanager
+    def database_mode(self, mode):
+        """
+        Apply ``mode`` to connections opened inside the block. Worker threads
+        build their connections from ``connections.settings``, so it is
+        patched in place and restored afterwards.
+        """
+        alias_settings = connections.settings[connection.alias]
+        saved = deepcopy({key: alias_settings[key] for key in ('OPTIONS', 'CONN_MAX_AGE')})
+        pragmas = settings.SQLITE_PRAGMAS
+        if mode == 'untuned':
+            alias_settings['OPTIONS'] = {
+                key: value for key, value in alias_settings['OPTIONS'].items()
+                if key not in ('timeout', 'transaction_mode')
+            }
+            alias_settings['CONN_MAX_AGE'] = 0
+            pragmas = UNTUNED_SQLITE_PRAGMAS
+        connection.close()
+        try:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                yield
+        finally:
+            alias_settings.update(saved)
+            connection.close()
+
+    def run(self, authors, writes):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def writer(author):
+            own_latencies, own_errors = [], 0
+            for i in range(writes):
+                # Every write behaves like a request: the connection is
+                # released or kept according to CONN_MAX_AGE around it.
+                close_old_connections()
+                started = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        Note.objects.create(title=f'Write {i}', content='Benchmark write', author=author)
+                except DatabaseError:
+                    own_errors += 1
+                else:
+                    own_latencies.append((time.perf_counter() - started) * 1000)
+                close_old_connections()
+            connections.close_all()
+            with lock:
+                latencies.extend(own_latencies)
+                errors.append(own_errors)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(authors)) as pool:
+            list(pool.map(writer, authors))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'writes_per_s': len(latencies) / elapsed,
+            'p50_ms': benchmarks.percentile(latencies, 50) if latencies else 0.0,
+            'p95_ms': benchmarks.percentile(latencies, 95) if latencies else 0.0,
+            'p99_ms': benchmarks.percentile(latencies, 99) if latencies else 0.0,
+            'errors': sum(errors),
+        }
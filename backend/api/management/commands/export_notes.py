@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.export import DEFAULT_CHUNK_SIZE, FORMATS, export_notes, filter_created, parse_bound
+from api.models import Note
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Streams notes to a file (or stdout) as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File to write to, or - for stdout',
+        )
+        parser.add_argument(
+            '--format',
+            dest='fmt',
+            choices=sorted(FORMATS),
+            default='ndjson',
+            help='Export format',
+        )
+        parser.add_argument(
+            '--author',
+            help='Only export notes by this username',
+        )
+        parser.add_argument(
+            '--created-after',
+            help='Only export notes created at or after this ISO date/datetime',
+        )
+        parser.add_argument(
+            '--created-before',
+            help='Only export notes created before this ISO date/datetime',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Gzip the output',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Rows fetched from the database per round-trip',
+        )
+
+    def handle(self, *args, **kwargs):
+        try:
+            created_after = parse_bound(kwargs['created_after'])
+            created_before = parse_bound(kwargs['created_before'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        queryset = Note.objects.all()
+        if kwargs['author']:
+            queryset = queryset.filter(author__username=kwargs['author'])
+        queryset = filter_created(queryset, created_after, created_before)
+
+        chunks = export_notes(
+            queryset,
+            kwargs['fmt'],
+            compress=kwargs['gzip'],
+            chunk_size=kwargs['chunk_size'],
+        )
+        if kwargs['output'] == '-':
+            self.write_chunks(chunks, sys.stdout.buffer)
+        else:
+            with open(kwargs['output'], 'wb') as output:
+                written = self.write_chunks(chunks, output)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written} bytes to {kwargs["output"]}'))
+
+    def write_chunks(self, chunks, output):
+        written = 0
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+        return written
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin
+from urllib.request import Request, urlopen
+import json
+import statistics
+import time
+
+DEFAULT_PATHS = [
+    '/api/notes/',
+    '/api/async/notes/',
+    '/api/dashboard/users/?limit=100',
+    '/api/async/dashboard/users/?limit=100',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Fires concurrent GET requests at a running server and reports throughput '
+        'and latency, e.g. to compare `gunicorn backend.wsgi` with '
+        '`uvicorn backend.asgi:application`. Start the server with THROTTLE_ENABLED=false, '
+        'or throttled (429) requests count as errors'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to test')
+        parser.add_argument('--username', required=True, help='User to obtain a JWT for (staff for dashboard paths)')
+        parser.add_argument('--password', required=True)
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Path to request; repeat for several (default: sync and async notes and user stats)',
+        )
+        parser.add_argument('--requests', type=int, default=500, help='Requests per path')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['requests'] < 1 or kwargs['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+        base_url = kwargs['base_url']
+        token = self.obtain_token(base_url, kwargs['username'], kwargs['password'])
+
+        self.stdout.write(f'{"path":<45} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+        for path in kwargs['paths'] or DEFAULT_PATHS:
+            url = urljoin(base_url, path)
+            with ThreadPoolExecutor(max_workers=kwargs['concurrency']) as pool:
+                started = time.perf_counter()
+                results = list(pool.map(lambda _: self.timed_get(url, token), range(kwargs['requests'])))
+                elapsed = time.perf_counter() - started
+            latencies = sorted(latency for latency, ok in results if ok)
+            errors = len(results) - len(latencies)
+            if not latencies:
+                self.stdout.write(self.style.ERROR(f'{path:<45} every request failed'))
+                continue
+            self.stdout.write(
+                f'{path:<45} {len(results) / elapsed:>8.1f} {self.percentile(latencies, 50):>8.1f} '
+                f'{self.percentile(latencies, 95):>8.1f} {self.percentile(latencies, 99):>8.1f} {errors:>7}'
+            )
+        self.stdout.write(self.style.SUCCESS('Load test finished'))
+
+    def obtain_token(self, base_url, username, password):
+        request = Request(
+            urljoin(base_url, '/api/token/'),
+            data=json.dumps({'username': username, 'password': password}).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urlopen(request) as response:
+                return json.load(response)['access']
+        except (HTTPError, URLError) as e:
+            raise CommandError(f'Could not obtain a token from {base_url}: {e}')
+
+    def timed_get(self, url, token):
+        request = Request(url, headers={'Authorization': f'Bearer {token}'})
+        started = time.perf_counter()
+        try:
+            with urlopen(request) as response:
+                response.read()
+                ok = response.status == 200
+        except (HTTPError, URLError, OSError):
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    def percentile(self, values, pct):
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
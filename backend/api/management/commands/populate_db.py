@@ -1,12 +1,28 @@
-from django.core.management.base import BaseCommand
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import connection, transaction
+from api import dashboard_cache
 from api.models import Note
-from faker import Faker
-from django.utils import timezone
-from django.db import transaction
+from api.seeding import generate_chunk, parse_index, utc_now
+import csv
+import io
+import os
 import random
-from datetime import timedelta
-from django.db.models import Count
+import time
+
+# Faster, less durable settings for the length of the load; the previous
+# values are restored afterwards.
+SQLITE_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144',  # 256 MiB
+}
+
 
 class Command(BaseCommand):
     help = 'Populates the database with dummy data'
@@ -17,169 +33,190 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing data before populating',
         )
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--notes-min', type=int, default=10, help='Fewest notes per user')
+        parser.add_argument('--notes-max', type=int, default=50, help='Most notes per user')
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed; re-run with the same seed and batch size to resume an interrupted load',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processes generating rows (1 generates in-process)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Users per chunk; each chunk and its notes are committed together',
+        )
+        parser.add_argument(
+            '--password',
+            default='password123',
+            help='Password shared by every generated user',
+        )
 
     def handle(self, *args, **kwargs):
-        fake = Faker()
-        
-        # Configuration - Updated for 1000 users
-        NEW_USERS = 1000
-        BATCH_SIZE = 100  # Increased batch size for better performance
-        MIN_NOTES = 10
-        MAX_NOTES = 50
-        
+        users, batch_size, workers = kwargs['users'], kwargs['batch_size'], kwargs['workers']
+        notes_min, notes_max = kwargs['notes_min'], kwargs['notes_max']
+        if users < 0 or batch_size < 1 or workers < 1:
+            raise CommandError('--users must be >= 0; --batch-size and --workers must be positive')
+        if not 0 <= notes_min <= notes_max:
+            raise CommandError('--notes-min must be between 0 and --notes-max')
+        seed = kwargs['seed'] if kwargs['seed'] is not None else random.randrange(1_000_000)
+
         if kwargs['fresh']:
             self.stdout.write('Clearing existing data...')
-            with transaction.atomic():
-                Note.objects.all().delete()
-                User.objects.filter(is_superuser=False).delete()
-        
-        existing_users = User.objects.count()
-        self.stdout.write(f'Current user count: {existing_users}')
-        self.stdout.write(f'Adding {NEW_USERS} new users...')
-        
-        # Track existing usernames to avoid duplicates
-        existing_usernames = set(User.objects.values_list('username', flat=True))
-        
+            self.clear()
+
+        chunks = [
+            (chunk, start, min(batch_size, users - start))
+            for chunk, start in enumerate(range(0, users, batch_size))
+        ]
+        done = self.loaded_chunks(seed, batch_size)
+        pending = [c for c in chunks if c[0] not in done]
+        self.stdout.write(
+            f'Seed {seed}: loading {len(pending)} of {len(chunks)} chunks of {batch_size} users '
+            f'with {workers} worker(s) (resume with --seed {seed} --batch-size {batch_size})'
+        )
+
+        # PBKDF2 is deliberately slow; every generated user shares one hash.
+        password = make_password(kwargs['password'])
+        now = utc_now()
+        started = time.monotonic()
+        totals = {'users': 0, 'notes': 0}
+
+        args = [(seed, chunk, start, count, notes_min, notes_max, now) for chunk, start, count in pending]
+        with ExitStack() as stack:
+            if workers > 1 and len(args) > 1:
+                pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+                results = self.generate_in_pool(pool, args, ahead=workers * 2)
+            else:
+                results = ((arg[1], generate_chunk(*arg)) for arg in args)
+            stack.enter_context(self.load_settings())
+
+            for chunk, (user_rows, note_rows) in results:
+                self.load_chunk(user_rows, note_rows, password)
+                totals['users'] += len(user_rows)
+                totals['notes'] += len(note_rows)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Chunk {chunk + 1}/{len(chunks)}: {totals["users"]} users, {totals["notes"]} notes '
+                    f'({(totals["users"] + totals["notes"]) / elapsed:,.0f} rows/s)'
+                )
+
+        # The bulk loader skips the Note signals, so refresh the dashboard rollups
+        call_command('rebuild_note_rollups', stdout=self.stdout)
+        dashboard_cache.invalidate()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Database population complete!\n'
+            f'Created {totals["users"]} users and {totals["notes"]} notes in {elapsed:.1f}s\n'
+            f'Total users: {User.objects.count()}\n'
+            f'Total notes: {Note.objects.count()}'
+        ))
+
+    def generate_in_pool(self, pool, args, ahead):
+        """Yield ``(chunk, rows)`` in order, keeping at most ``ahead`` chunks buffered."""
+        in_flight = deque()
+        for arg in args:
+            in_flight.append((arg[1], pool.submit(generate_chunk, *arg)))
+            if len(in_flight) >= ahead:
+                chunk, future = in_flight.popleft()
+                yield chunk, future.result()
+        while in_flight:
+            chunk, future = in_flight.popleft()
+            yield chunk, future.result()
+
+    def clear(self):
+        with transaction.atomic():
+            # A single DELETE instead of fetching every note to fire its
+            # signals; the rollups are rebuilt at the end anyway.
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(Note._meta.db_table)}')
+            User.objects.filter(is_superuser=False).delete()
+
+    def loaded_chunks(self, seed, batch_size):
+        # Chunks are committed atomically, so one user from a chunk means
+        # the whole chunk is in.
+        usernames = User.objects.filter(username__contains=f'.{seed}-').values_list('username', flat=True)
+        indexes = (parse_index(username, seed) for username in usernames.iterator())
+        return {index // batch_size for index in indexes if index is not None}
+
+    def load_chunk(self, user_rows, note_rows, password):
+        with transaction.atomic():
+            created = User.objects.bulk_create([
+                User(username=username, email=email, first_name=first_name, last_name=last_name,
+                     is_active=True, date_joined=date_joined, password=password)
+                for username, email, first_name, last_name, date_joined in user_rows
+            ])
+            if created and created[0].pk is None:
+                ids = dict(User.objects.filter(username__in=[u.username for u in created]).values_list('username', 'id'))
+                author_ids = [ids[u.username] for u in created]
+            else:
+                author_ids = [u.pk for u in created]
+            self.load_notes([
+                (title, content, created_at, author_ids[position])
+                for position, title, content, created_at in note_rows
+            ])
+
+    def load_notes(self, rows):
+        if not rows:
+            return
+        quote = connection.ops.quote_name
+        table = quote(Note._meta.db_table)
+        # Loaded notes were last updated when they were created and predate
+        # any sync version.
+        names = ('title', 'content', 'created_at', 'updated_at', 'sync_version', 'author')
+        columns = ', '.join(quote(Note._meta.get_field(name).column) for name in names)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for title, content, created_at, author_id in rows:
+                    timestamp = created_at.isoformat()
+                    writer.writerow((title, content, timestamp, timestamp, 0, author_id))
+                buffer.seek(0)
+                sql = f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)'
+                raw = cursor.cursor
+                if hasattr(raw, 'copy_expert'):  # psycopg2
+                    raw.copy_expert(sql, buffer)
+                else:  # psycopg 3
+                    with raw.copy(sql) as copy:
+                        copy.write(buffer.getvalue())
+            else:
+                # Prepared through the fields so large bodies are compressed.
+                created_at = Note._meta.get_field('created_at')
+                content_field = Note._meta.get_field('content')
+                rows = [
+                    (title, content_field.get_db_prep_save(content, connection), timestamp, timestamp, 0, author_id)
+                    for title, content, value, author_id in rows
+                    for timestamp in (created_at.get_db_prep_save(value, connection),)
+                ]
+                cursor.executemany(
+                    f'INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s, %s, %s)',
+                    rows,
+                )
+
+    @contextmanager
+    def load_settings(self):
+        # SQLite refuses to change synchronous inside a transaction.
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            yield
+            return
+        previous = {}
+        with connection.cursor() as cursor:
+            for pragma, value in SQLITE_LOAD_PRAGMAS.items():
+                cursor.execute(f'PRAGMA {pragma}')
+                previous[pragma] = cursor.fetchone()[0]
+                cursor.execute(f'PRAGMA {pragma} = {value}')
         try:
-            with transaction.atomic():
-                total_notes_created = 0
-                
-                # Create users in batches
-                for i in range(0, NEW_USERS, BATCH_SIZE):
-                    user_batch = []
-                    batch_size = min(BATCH_SIZE, NEW_USERS - i)
-                    
-                    self.stdout.write(f'Processing batch {i//BATCH_SIZE + 1} of {NEW_USERS//BATCH_SIZE + 1}...')
-                    
-                    for _ in range(batch_size):
-                        while True:
-                            first_name = fake.first_name()
-                            last_name = fake.last_name()
-                            username = f"{first_name.lower()}{last_name.lower()}{random.randint(1, 99999)}"
-                            if username not in existing_usernames:
-                                existing_usernames.add(username)
-                                break
-                        
-                        email = f"{username}@{fake.free_email_domain()}"
-                        
-                        # Generate a random join date within the last 2 years
-                        join_date = fake.date_time_between(
-                            start_date='-2y',
-                            end_date='now',
-                            tzinfo=timezone.get_current_timezone()
-                        )
-                        
-                        user = User(
-                            username=username[:150],
-                            email=email,
-                            first_name=first_name,
-                            last_name=last_name,
-                            is_active=True,
-                            date_joined=join_date
-                        )
-                        user.set_password('password123')
-                        user_batch.append(user)
-                    
-                    # Bulk create users
-                    created_users = User.objects.bulk_create(user_batch)
-                    self.stdout.write(f'Created {len(created_users)} users')
-                    
-                    # Create notes for the batch of users
-                    notes_batch = []
-                    batch_notes_count = 0
-                    
-                    for user in created_users:
-                        # Random number of notes for each user
-                        num_notes = random.randint(MIN_NOTES, MAX_NOTES)
-                        batch_notes_count += num_notes
-                        
-                        for _ in range(num_notes):
-                            # Generate note timestamp between user join date and now
-                            created_at = fake.date_time_between(
-                                start_date=user.date_joined,
-                                end_date='now',
-                                tzinfo=timezone.get_current_timezone()
-                            )
-                            
-                            # Randomly choose note type and content
-                            note_type = random.choice(['paragraph', 'todo', 'meeting', 'idea'])
-                            
-                            if note_type == 'paragraph':
-                                content = fake.paragraph(nb_sentences=random.randint(3, 8))
-                                title = fake.sentence(nb_words=random.randint(4, 8))[:-1]
-                            elif note_type == 'todo':
-                                todos = [fake.sentence() for _ in range(random.randint(3, 7))]
-                                content = "\n".join(f"- {todo}" for todo in todos)
-                                title = "To-Do List: " + fake.words(nb=random.randint(2, 4))[0].title()
-                            elif note_type == 'meeting':
-                                attendees = [fake.name() for _ in range(random.randint(2, 5))]
-                                content = f"Meeting Date: {fake.future_date().strftime('%Y-%m-%d')}\n"
-                                content += f"Attendees: {', '.join(attendees)}\n\n"
-                                content += fake.paragraph(nb_sentences=random.randint(2, 4))
-                                title = f"Meeting Notes: {fake.company()}"
-                            else:  # idea
-                                content = f"💡 {fake.paragraph(nb_sentences=1)}\n\n"
-                                content += fake.paragraph(nb_sentences=random.randint(2, 4))
-                                title = "Idea: " + fake.catch_phrase()
-                            
-                            note = Note(
-                                title=title[:100],
-                                content=content,
-                                created_at=created_at,
-                                author=user
-                            )
-                            notes_batch.append(note)
-                            
-                            # Bulk create notes in smaller chunks to manage memory
-                            if len(notes_batch) >= 2000:
-                                Note.objects.bulk_create(notes_batch)
-                                total_notes_created += len(notes_batch)
-                                self.stdout.write(f'Created {len(notes_batch)} notes (Total: {total_notes_created})')
-                                notes_batch = []
-                    
-                    # Create any remaining notes
-                    if notes_batch:
-                        Note.objects.bulk_create(notes_batch)
-                        total_notes_created += len(notes_batch)
-                        self.stdout.write(f'Created {len(notes_batch)} notes (Total: {total_notes_created})')
-                    
-                    self.stdout.write(f'Batch complete. Created {batch_notes_count} notes for {batch_size} users')
-                
-                # After creating all users and notes, verify the data
-                self.stdout.write('Verifying note distribution...')
-                user_note_counts = User.objects.filter(
-                    date_joined__gte=timezone.now() - timedelta(hours=1)
-                ).annotate(
-                    note_count=Count('notes')
-                ).values('username', 'note_count')
-
-                users_without_notes = [u for u in user_note_counts if u['note_count'] < MIN_NOTES]
-                users_with_excess_notes = [u for u in user_note_counts if u['note_count'] > MAX_NOTES]
-
-                if users_without_notes:
-                    self.stdout.write(self.style.WARNING(
-                        f'Found {len(users_without_notes)} users with fewer than {MIN_NOTES} notes'
-                    ))
-                if users_with_excess_notes:
-                    self.stdout.write(self.style.WARNING(
-                        f'Found {len(users_with_excess_notes)} users with more than {MAX_NOTES} notes'
-                    ))
-
-                final_user_count = User.objects.count()
-                final_note_count = Note.objects.count()
-                avg_notes = Note.objects.filter(
-                    author__date_joined__gte=timezone.now() - timedelta(hours=1)
-                ).count() / NEW_USERS
-
-                self.stdout.write(self.style.SUCCESS(
-                    f'Database population complete!\n'
-                    f'Total users: {final_user_count}\n'
-                    f'Total notes: {final_note_count}\n'
-                    f'Average notes per new user: {avg_notes:.1f}\n'
-                    f'Note range per user: {MIN_NOTES}-{MAX_NOTES}\n'
-                    f'Estimated total notes created: {total_notes_created}'
-                ))
-                
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'An error occurred: {str(e)}'))
-            raise e 
\ No newline at end of file
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                for pragma, value in previous.items():
+                    cursor.execute(f'PRAGMA {pragma} = {value}')
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from api import blacklist
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes expired outstanding and blacklisted refresh tokens in small '
+        'batches; safe to run from cron while the site is live'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tokens deleted per transaction',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between batches',
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        started = time.monotonic()
+        outstanding, blacklisted = blacklist.prune_expired(
+            batch_size=kwargs['batch_size'],
+            pause=kwargs['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {outstanding} expired outstanding and {blacklisted} blacklisted tokens '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
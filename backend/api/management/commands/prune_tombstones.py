@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api import sync
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes note tombstones older than NOTE_SYNC["TOMBSTONE_RETENTION"]; '
+        'sync tokens that could still need them have already expired'
+    )
+
+    def handle(self, *args, **kwargs):
+        deleted = sync.prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} note tombstones'))
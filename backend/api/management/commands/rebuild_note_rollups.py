@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from api import rollups
+from api.models import AuthorNoteStats, DailyNoteCount
+import time
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the dashboard rollup tables from the notes table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows inserted per query',
+        )
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+        self.stdout.write('Rebuilding note rollups...')
+        rollups.rebuild(batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {DailyNoteCount.objects.count()} daily rows and '
+            f'{AuthorNoteStats.objects.count()} author rows '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
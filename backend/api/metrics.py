@@ -0,0 +1,241 @@
+"""
+Per-endpoint request metrics, exposed in the Prometheus text format.
+
+``MetricsMiddleware`` records each request's latency, response size and
+SQL query count and time. These are keyed by the resolved URL name and the
+HTTP method, so label cardinality is bounded by the URLconf. Requests that
+match no route are recorded as ``unmatched``, and methods outside
+``METHODS`` (clients can send any token) as ``other``.
+
+Queries are counted by an execute wrapper that is installed once on every
+database connection when it is created. The wrapper adds to the stats of
+the request running in the current context. A ``connection.execute_wrapper()``
+block opened by the middleware would only see the calling thread's
+connection and would miss the queries async views run in ``sync_to_async``
+threads. When no request is being measured (management commands,
+migrations), the wrapper only performs a context variable lookup.
+
+The counters live in process memory, like a Prometheus client library
+without multiprocess mode. Each worker reports its own requests, so scrape
+every worker or ``sum`` across instances.
+"""
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED = "unmatched"
+OTHER_METHOD = "other"
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current = ContextVar("request_metrics", default=None)
+_lock = threading.Lock()
+_endpoints = {}  # (view, method) -> _Endpoint
+
+
+def _setting(name, default):
+    return getattr(settings, "METRICS", {}).get(name, default)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def snapshot(self):
+        return list(self.counts), self.sum
+
+
+class _Endpoint:
+    __slots__ = ("statuses", "latency", "queries", "db_seconds", "size")
+
+    def __init__(self):
+        self.statuses = {}
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.db_seconds = _Histogram(LATENCY_BUCKETS)
+        self.size = _Histogram(SIZE_BUCKETS)
+
+
+class _RequestStats:
+    __slots__ = ("started", "queries", "db_seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_seconds += time.perf_counter() - started
+        stats.queries += 1
+
+
+def install(connection, **kwargs):
+    # Inserted first, so the pop() in connection.execute_wrapper() still
+    # removes the wrapper it added when a connection opens inside its block.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+connection_created.connect(install, dispatch_uid="api.metrics.install")
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else UNMATCHED
+
+
+def _record(request, response, stats):
+    elapsed = time.perf_counter() - stats.started
+    # Streamed bodies are produced after the view returns and are not
+    # counted; every other response's body is already rendered here.
+    size = None if response.streaming else len(response.content)
+    method = request.method if request.method in METHODS else OTHER_METHOD
+    key = (_view_name(request), method)
+    with _lock:
+        endpoint = _endpoints.get(key)
+        if endpoint is None:
+            endpoint = _endpoints[key] = _Endpoint()
+        status = response.status_code
+        endpoint.statuses[status] = endpoint.statuses.get(status, 0) + 1
+        endpoint.latency.observe(elapsed)
+        endpoint.queries.observe(stats.queries)
+        endpoint.db_seconds.observe(stats.db_seconds)
+        if size is not None:
+            endpoint.size.observe(size)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = _RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        _record(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = _RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        _record(request, response, stats)
+        return response
+
+
+def authorized(request):
+    """Whether ``request`` may read the metrics, given ``METRICS["TOKEN"]``."""
+    token = _setting("TOKEN", None)
+    if not token:
+        return True
+    supplied = request.headers.get("Authorization", "").encode()
+    return hmac.compare_digest(supplied, f"Bearer {token}".encode())
+
+
+def reset():
+    with _lock:
+        _endpoints.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _histogram_lines(name, buckets, counts, total, labels):
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        yield f"{name}_bucket{_labels(**labels, le=_number(float(bound)))} {cumulative}"
+    cumulative += counts[-1]
+    yield f"{name}_bucket{_labels(**labels, le='+Inf')} {cumulative}"
+    yield f"{name}_sum{_labels(**labels)} {_number(total)}"
+    yield f"{name}_count{_labels(**labels)} {cumulative}"
+
+
+HISTOGRAMS = (
+    ("http_request_duration_seconds", "latency", "Time spent handling the request in Django."),
+    ("http_request_db_queries", "queries", "SQL queries executed per request."),
+    ("http_request_db_duration_seconds", "db_seconds", "Time spent executing SQL per request."),
+    ("http_response_size_bytes", "size", "Size of non-streaming response bodies."),
+)
+
+
+def render():
+    """Return every recorded metric in the Prometheus text exposition format."""
+    with _lock:
+        snapshot = {
+            key: (
+                dict(endpoint.statuses),
+                {attr: (getattr(endpoint, attr).buckets, *getattr(endpoint, attr).snapshot())
+                 for _, attr, _ in HISTOGRAMS},
+            )
+            for key, endpoint in _endpoints.items()
+        }
+    keys = sorted(snapshot)
+
+    lines = [
+        "# HELP http_requests_total Requests handled, by URL name, method and status code.",
+        "# TYPE http_requests_total counter",
+    ]
+    for view, method in keys:
+        for status, count in sorted(snapshot[(view, method)][0].items()):
+            lines.append(f"http_requests_total{_labels(view=view, method=method, status=status)} {count}")
+    for name, attr, description in HISTOGRAMS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+        for view, method in keys:
+            buckets, counts, total = snapshot[(view, method)][1][attr]
+            if not any(counts):
+                continue
+            lines.extend(_histogram_lines(name, buckets, counts, total, {"view": view, "method": method}))
+    return "\n".join(lines) + "\n"
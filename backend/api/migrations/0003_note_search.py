@@ -0,0 +1,77 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE api_note_fts USING fts5(
+        title, content, content='api_note', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER api_note_fts_ai AFTER INSERT ON api_note BEGIN
+        INSERT INTO api_note_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER api_note_fts_ad AFTER DELETE ON api_note BEGIN
+        INSERT INTO api_note_fts(api_note_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER api_note_fts_au AFTER UPDATE ON api_note BEGIN
+        INSERT INTO api_note_fts(api_note_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO api_note_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    "INSERT INTO api_note_fts(api_note_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_note_fts_ai",
+    "DROP TRIGGER IF EXISTS api_note_fts_ad",
+    "DROP TRIGGER IF EXISTS api_note_fts_au",
+    "DROP TABLE IF EXISTS api_note_fts",
+]
+
+# The expression must match api.search.POSTGRES_VECTOR exactly for the
+# planner to use the index.
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX note_search_idx ON api_note
+    USING GIN (to_tsvector('english', title || ' ' || content))
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS note_search_idx",
+]
+
+
+def run_for_vendor(sqlite_statements, postgres_statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        statements = {
+            'sqlite': sqlite_statements,
+            'postgresql': postgres_statements,
+        }.get(vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_note_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(SQLITE_FORWARD, POSTGRES_FORWARD),
+            run_for_vendor(SQLITE_BACKWARD, POSTGRES_BACKWARD),
+        ),
+    ]
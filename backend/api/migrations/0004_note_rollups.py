@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    Note = apps.get_model('api', 'Note')
+    DailyNoteCount = apps.get_model('api', 'DailyNoteCount')
+    AuthorNoteStats = apps.get_model('api', 'AuthorNoteStats')
+
+    daily = Note.objects.annotate(date=TruncDate('created_at')).values('author_id', 'date').annotate(count=Count('id')).order_by()
+    DailyNoteCount.objects.bulk_create([DailyNoteCount(**row) for row in daily], batch_size=1000)
+
+    per_author = Note.objects.values('author_id').annotate(note_count=Count('id'), last_note_at=Max('created_at')).order_by()
+    AuthorNoteStats.objects.bulk_create([AuthorNoteStats(**row) for row in per_author], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_note_search'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorNoteStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='note_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('note_count', models.PositiveIntegerField(default=0)),
+                ('last_note_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-note_count'], name='author_stats_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyNoteCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_note_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='daily_note_count_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('author', 'date'), name='daily_note_count_author_date_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_note_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authornotestats',
+            name='modified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='authornotestats',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
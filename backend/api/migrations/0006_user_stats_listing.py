@@ -0,0 +1,54 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_user_rows(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    AuthorNoteStats = apps.get_model('api', 'AuthorNoteStats')
+
+    joined = User.objects.filter(pk=OuterRef('author_id')).values('date_joined')[:1]
+    AuthorNoteStats.objects.update(joined_at=Subquery(joined))
+
+    missing = User.objects.filter(note_stats__isnull=True).values_list('id', 'date_joined')
+    AuthorNoteStats.objects.bulk_create(
+        [AuthorNoteStats(author_id=pk, joined_at=date_joined) for pk, date_joined in missing.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_author_note_version'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authornotestats',
+            name='joined_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_user_rows, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='authornotestats',
+            name='joined_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='authornotestats',
+            name='author_stats_count_idx',
+        ),
+        migrations.AddIndex(
+            model_name='authornotestats',
+            index=models.Index(fields=['note_count', 'author'], name='author_stats_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='authornotestats',
+            index=models.Index(fields=['last_note_at', 'author'], name='author_stats_last_note_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='authornotestats',
+            index=models.Index(fields=['joined_at', 'author'], name='author_stats_joined_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+# Adding columns can make SQLite rebuild api_note, which drops its FTS
+# triggers. They are recreated afterwards, with the update trigger limited
+# to the indexed columns so that sync_version stamps don't re-index notes.
+SQLITE_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS api_note_fts_ai",
+    "DROP TRIGGER IF EXISTS api_note_fts_ad",
+    "DROP TRIGGER IF EXISTS api_note_fts_au",
+    """
+    CREATE TRIGGER api_note_fts_ai AFTER INSERT ON api_note BEGIN
+        INSERT INTO api_note_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER api_note_fts_ad AFTER DELETE ON api_note BEGIN
+        INSERT INTO api_note_fts(api_note_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER api_note_fts_au AFTER UPDATE OF title, content ON api_note BEGIN
+        INSERT INTO api_note_fts(api_note_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO api_note_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+
+def backfill_updated_at(apps, schema_editor):
+    Note = apps.get_model('api', 'Note')
+    Note.objects.update(updated_at=F('created_at'))
+
+
+def recreate_fts_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_user_stats_listing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note_id', models.BigIntegerField()),
+                ('sync_version', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='sync_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='updated_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='note',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(recreate_fts_triggers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['author', 'sync_version', 'id'], name='note_author_sync_idx'),
+        ),
+        migrations.AddField(
+            model_name='notetombstone',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='note_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notetombstone',
+            index=models.Index(fields=['author', 'sync_version', 'note_id'], name='tombstone_author_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notetombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ),
+    ]
@@ -0,0 +1,156 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:05
+
+import api.fields
+from django.db import DatabaseError, migrations, transaction
+
+BATCH_SIZE = 500
+
+DROP_FTS_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS api_note_fts_ai",
+    "DROP TRIGGER IF EXISTS api_note_fts_ad",
+    "DROP TRIGGER IF EXISTS api_note_fts_au",
+]
+
+# The search index reads note text through a view that decompresses it,
+# both when indexing and for snippet().
+SQLITE_FTS_FORWARD = DROP_FTS_TRIGGERS + [
+    "DROP TABLE IF EXISTS api_note_fts",
+    "DROP VIEW IF EXISTS api_note_text",
+    "CREATE VIEW api_note_text AS SELECT id, title, note_text(content) AS content FROM api_note",
+    """
+    CREATE VIRTUAL TABLE api_note_fts USING fts5(
+        title, content, content='api_note_text', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER api_note_fts_ai AFTER INSERT ON api_note BEGIN
+        INSERT INTO api_note_fts(rowid, title, content)
+        VALUES (new.id, new.title, note_text(new.content));
+    END
+    """,
+    """
+    CREATE TRIGGER api_note_fts_ad AFTER DELETE ON api_note BEGIN
+        INSERT INTO api_note_fts(api_note_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, note_text(old.content));
+    END
+    """,
+    """
+    CREATE TRIGGER api_note_fts_au AFTER UPDATE OF title, content ON api_note BEGIN
+        INSERT INTO api_note_fts(api_note_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, note_text(old.content));
+        INSERT INTO api_note_fts(rowid, title, content)
+        VALUES (new.id, new.title, note_text(new.content));
+    END
+    """,
+    "INSERT INTO api_note_fts(api_note_fts) VALUES ('rebuild')",
+]
+
+# As left by 0007_note_sync.
+SQLITE_FTS_BACKWARD = DROP_FTS_TRIGGERS + [
+    "DROP TABLE IF EXISTS api_note_fts",
+    "DROP VIEW IF EXISTS api_note_text",
+    """
+    CREATE VIRTUAL TABLE api_note_fts USING fts5(
+        title, content, content='api_note', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER api_note_fts_ai AFTER INSERT ON api_note BEGIN
+        INSERT INTO api_note_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER api_note_fts_ad AFTER DELETE ON api_note BEGIN
+        INSERT INTO api_note_fts(api_note_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER api_note_fts_au AFTER UPDATE OF title, content ON api_note BEGIN
+        INSERT INTO api_note_fts(api_note_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO api_note_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    "INSERT INTO api_note_fts(api_note_fts) VALUES ('rebuild')",
+]
+
+
+def _rewrite_content(schema_editor, select_condition, convert):
+    """Rewrite matching note bodies with ``convert``, one committed batch at a time."""
+    connection = schema_editor.connection
+    last_id = 0
+    while True:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT id, content FROM api_note WHERE id > %s AND {select_condition} "
+                    f"ORDER BY id LIMIT %s",
+                    [last_id, BATCH_SIZE],
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    return
+                updates = [(convert(content), pk) for pk, content in rows]
+                cursor.executemany("UPDATE api_note SET content = %s WHERE id = %s", updates)
+        last_id = rows[-1][0]
+
+
+def compress_content(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        # TOAST already compresses large values; lz4 (PostgreSQL 14+) is
+        # faster than the default pglz. It applies to values written from now on.
+        if connection.pg_version >= 140000:
+            try:
+                with transaction.atomic(using=connection.alias):
+                    schema_editor.execute("ALTER TABLE api_note ALTER COLUMN content SET COMPRESSION lz4")
+            except DatabaseError:
+                pass  # server built without lz4
+        return
+    if connection.vendor != 'sqlite':
+        return
+    # Unindexed while rows are rewritten; the index is rebuilt afterwards.
+    for statement in DROP_FTS_TRIGGERS:
+        schema_editor.execute(statement)
+    # Already compressed rows are blobs, so a rerun after an interruption
+    # carries on where it stopped.
+    _rewrite_content(schema_editor, "typeof(content) = 'text'", api.fields.compress_text)
+    for statement in SQLITE_FTS_FORWARD:
+        schema_editor.execute(statement)
+
+
+def decompress_content(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        if connection.pg_version >= 140000:
+            schema_editor.execute("ALTER TABLE api_note ALTER COLUMN content SET COMPRESSION DEFAULT")
+        return
+    if connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS_TRIGGERS:
+        schema_editor.execute(statement)
+    _rewrite_content(schema_editor, "typeof(content) = 'blob'", api.fields.decompress_text)
+    for statement in SQLITE_FTS_BACKWARD:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own, so a large table is never locked for
+    # the whole rewrite, and an interrupted run can simply be repeated.
+    atomic = False
+
+    dependencies = [
+        ('api', '0007_note_sync'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='content',
+            field=api.fields.CompressedTextField(),
+        ),
+        migrations.RunPython(compress_content, decompress_content),
+    ]
@@ -1,12 +1,101 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .fields import CompressedTextField
+
 
 class Note(models.Model):
     title = models.CharField(max_length=100)
-    content = models.TextField()
+    content = CompressedTextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notes")
+    # The author's ``AuthorNoteStats.version`` as of the note's last write;
+    # see ``api.sync``.
+    sync_version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Per-author listing (newest first) and per-author Max(created_at).
+            models.Index(fields=["author", "-created_at", "-id"], name="note_author_created_idx"),
+            # Date-range scans for the dashboard activity charts.
+            models.Index(fields=["created_at"], name="note_created_at_idx"),
+            # Delta sync: an author's notes changed after a sync version.
+            models.Index(fields=["author", "sync_version", "id"], name="note_author_sync_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class NoteTombstone(models.Model):
+    """
+    Marks a deleted note so delta sync can tell clients to drop it.
+
+    ``note_id`` is the deleted note's primary key, which is never reused.
+    Tombstones older than ``NOTE_SYNC["TOMBSTONE_RETENTION"]`` are pruned,
+    and sync tokens older than that are rejected.
+    """
+
+    note_id = models.BigIntegerField()
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="note_tombstones")
+    sync_version = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["author", "sync_version", "note_id"], name="tombstone_author_sync_idx"),
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.author_id}: {self.note_id}"
+
+
+class DailyNoteCount(models.Model):
+    """Number of notes an author created on a given (current-timezone) day."""
+
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_note_counts")
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["author", "date"], name="daily_note_count_author_date_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="daily_note_count_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.author_id} {self.date}: {self.count}"
+
+
+class AuthorNoteStats(models.Model):
+    """
+    Per-user note totals, kept in step with ``Note`` and ``User`` writes.
+
+    Every user has a row (created with the user), so user listings can be
+    driven from this table's indexes instead of aggregating ``Note``.
+    ``joined_at`` mirrors ``User.date_joined`` for the same reason.
+    ``version`` and ``modified_at`` change on every create, update or delete
+    of the author's notes and back the ETag/Last-Modified validators.
+    """
+
+    author = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="note_stats")
+    note_count = models.PositiveIntegerField(default=0)
+    last_note_at = models.DateTimeField(null=True, blank=True)
+    joined_at = models.DateTimeField()
+    version = models.PositiveBigIntegerField(default=0)
+    modified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # Each sort key is paired with the primary key for keyset pagination.
+        indexes = [
+            models.Index(fields=["note_count", "author"], name="author_stats_count_idx"),
+            models.Index(fields=["last_note_at", "author"], name="author_stats_last_note_idx"),
+            models.Index(fields=["joined_at", "author"], name="author_stats_joined_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.author_id}: {self.note_count}"
@@ -0,0 +1,242 @@
+import datetime
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class NoteCursorPagination(CursorPagination):
+    """
+    Keyset pagination for note listings.
+
+    Pages are addressed by an opaque cursor over ``(created_at, id)`` rather
+    than an OFFSET, so fetching a deep page costs the same as the first one
+    and no COUNT(*) is ever issued. Clients that still need the whole list in
+    one response can opt out with ``?paginate=false``.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = ("-created_at", "-id")
+    unpaginated_query_param = "paginate"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.unpaginated_query_param) == "false":
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class SearchPagination(BasePagination):
+    """
+    Page-number pagination for ranked search results.
+
+    Relevance ordering has no stable keyset, so pages are windows over the
+    ranked hits. One extra row is fetched to detect a following page, which
+    avoids counting every match.
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    page_query_param = "page"
+
+    def get_window(self, request):
+        """Return ``(limit, offset)`` for the requested page, plus one look-ahead row."""
+        self.request = request
+        self.page_size = _positive_int(
+            request.query_params.get(self.page_size_query_param),
+            self.page_size,
+            cutoff=self.max_page_size,
+        )
+        self.page = _positive_int(request.query_params.get(self.page_query_param), 1)
+        return self.page_size + 1, (self.page - 1) * self.page_size
+
+    def paginate_results(self, results):
+        self.has_next = len(results) > self.page_size
+        return results[:self.page_size]
+
+    def get_page_link(self, page):
+        url = self.request.build_absolute_uri()
+        if page == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, page)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_page_link(self.page + 1) if self.has_next else None,
+            "previous": self.get_page_link(self.page - 1) if self.page > 1 else None,
+            "results": data,
+        })
+
+
+class SyncPagination(BasePagination):
+    """
+    Page size and links for the delta sync endpoint.
+
+    The sync token is the cursor: ``api.sync`` returns a continuation token
+    while more changes remain, and the ``next`` link repeats the request
+    with it as ``since``.
+    """
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    token_query_param = "since"
+
+    def get_page_size(self, request):
+        self.request = request
+        return _positive_int(
+            request.query_params.get(self.page_size_query_param),
+            self.page_size,
+            cutoff=self.max_page_size,
+        )
+
+    def get_token(self, request):
+        return request.query_params.get(self.token_query_param) or None
+
+    def get_next_link(self, token):
+        return replace_query_param(self.request.build_absolute_uri(), self.token_query_param, token)
+
+
+def _positive_int(value, default, cutoff=None):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return default
+    if number <= 0:
+        return default
+    if cutoff:
+        return min(number, cutoff)
+    return number
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder cuts datetimes to milliseconds (ECMA-262), which
+    # would move the boundary of a keyset cursor. Keep every microsecond.
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over ``(sort column, primary key)``.
+
+    Unlike DRF's CursorPagination, which breaks ties on the sort column with
+    an offset, the cursor carries the primary key of the boundary row and
+    pages are selected with a row-value comparison. Paging through many
+    equal values therefore stays a single index seek, provided an index on
+    ``(column, pk)`` exists. The sort column must be non-null; rows may be
+    model instances or ``.values()`` dicts that include both columns.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, field, descending=False, view=None):
+        return self.finish_page(list(self.page_queryset(queryset, request, field, descending)))
+
+    async def apaginate_queryset(self, queryset, request, field, descending=False, view=None):
+        """Async variant of ``paginate_queryset`` for native async views."""
+        page = self.page_queryset(queryset, request, field, descending)
+        return self.finish_page([row async for row in page])
+
+    def page_queryset(self, queryset, request, field, descending):
+        """Return the (unevaluated) queryset for the requested page plus one look-ahead row."""
+        self.request = request
+        params = getattr(request, "query_params", request.GET)
+        self.page_size = _positive_int(
+            params.get(self.page_size_query_param),
+            self.page_size,
+            cutoff=self.max_page_size,
+        )
+        self.field = queryset.model._meta.get_field(field)
+        self.pk_field = queryset.model._meta.pk
+        self.descending = descending
+        cursor = self.decode_cursor(params)
+        self.cursor = cursor
+        self.backwards = bool(cursor and cursor["b"])
+
+        # Walking backwards flips the sort order; the page is reversed again
+        # in finish_page.
+        reverse = descending != self.backwards
+        if cursor is not None:
+            queryset = queryset.filter(self.row_comparison("<" if reverse else ">", cursor))
+        direction = "-" if reverse else ""
+        queryset = queryset.order_by(direction + self.field.attname, direction + self.pk_field.attname)
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, rows):
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.backwards:
+            rows.reverse()
+        self.rows = rows
+        return rows
+
+    def row_comparison(self, operator, cursor):
+        quote = connection.ops.quote_name
+        table = quote(self.field.model._meta.db_table)
+        value = self.field.get_db_prep_value(self.field.to_python(cursor["v"]), connection)
+        pk = self.pk_field.get_db_prep_value(self.pk_field.to_python(cursor["k"]), connection)
+        sql = (
+            f"({table}.{quote(self.field.column)}, {table}.{quote(self.pk_field.column)}) "
+            f"{operator} (%s, %s)"
+        )
+        return RawSQL(sql, [value, pk], output_field=BooleanField())
+
+    def decode_cursor(self, params):
+        encoded = params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(b64decode(encoded.encode("ascii"), altchars=b"-_"))
+            if not isinstance(cursor, dict) or set(cursor) != {"v", "k", "b"}:
+                raise ValueError
+            self.field.to_python(cursor["v"])
+            self.pk_field.to_python(cursor["k"])
+        except (TypeError, ValueError, ValidationError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, row, backwards):
+        def read(field):
+            return row[field.attname] if isinstance(row, dict) else getattr(row, field.attname)
+
+        payload = json.dumps(
+            {"v": read(self.field), "k": read(self.pk_field), "b": backwards},
+            cls=_CursorEncoder,
+        )
+        encoded = b64encode(payload.encode(), altchars=b"-_").decode("ascii")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        has_next = self.has_more if not self.backwards else self.cursor is not None
+        if not has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[-1], backwards=False)
+
+    def get_previous_link(self):
+        has_previous = self.has_more if self.backwards else self.cursor is not None
+        if not has_previous or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[0], backwards=True)
+
+    def get_paginated_data(self, data):
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
@@ -0,0 +1,146 @@
+"""
+Incrementally maintained aggregates over ``Note``.
+
+``DailyNoteCount`` and ``AuthorNoteStats`` let the admin dashboard read
+totals in O(days) or O(users) instead of scanning every note. They are
+updated from the ``Note`` signal handlers, inside the transaction of the
+write, and can be rebuilt from scratch with ``manage.py rebuild_note_rollups``.
+"""
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AuthorNoteStats, DailyNoteCount, Note
+
+
+def _note_date(note):
+    # Matches TruncDate('created_at'), which buckets in the current timezone.
+    return timezone.localdate(note.created_at)
+
+
+def _increment_or_create(model, lookup, update, defaults):
+    """Apply ``update`` to the row matching ``lookup``, creating it if absent."""
+    if model.objects.filter(**lookup).update(**update):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **defaults)
+    except IntegrityError:
+        # Another writer created the row first; apply our change to theirs.
+        model.objects.filter(**lookup).update(**update)
+
+
+def _joined_at(author_id):
+    return Subquery(User.objects.filter(pk=author_id).values("date_joined")[:1])
+
+
+def user_saved(user, created):
+    """Give every user a stats row and keep its ``joined_at`` current."""
+    if created:
+        AuthorNoteStats.objects.get_or_create(author=user, defaults={"joined_at": user.date_joined})
+    else:
+        AuthorNoteStats.objects.filter(author=user).exclude(joined_at=user.date_joined).update(
+            joined_at=user.date_joined
+        )
+
+
+def note_added(note):
+    notes_added([note])
+
+
+def notes_added(notes):
+    """Account for notes inserted without signals, e.g. through ``bulk_create``."""
+    per_day = Counter((note.author_id, _note_date(note)) for note in notes)
+    for (author_id, date), count in per_day.items():
+        _increment_or_create(
+            DailyNoteCount,
+            {"author_id": author_id, "date": date},
+            {"count": F("count") + count},
+            {"count": count},
+        )
+
+    now = timezone.now()
+    per_author = {}
+    for note in notes:
+        total, latest = per_author.get(note.author_id, (0, note.created_at))
+        per_author[note.author_id] = (total + 1, max(latest, note.created_at))
+    for author_id, (count, latest) in per_author.items():
+        _increment_or_create(
+            AuthorNoteStats,
+            {"author_id": author_id},
+            {
+                "note_count": F("note_count") + count,
+                "last_note_at": Case(
+                    When(Q(last_note_at__isnull=True) | Q(last_note_at__lt=latest),
+                         then=Value(latest)),
+                    default=F("last_note_at"),
+                ),
+                "version": F("version") + 1,
+                "modified_at": now,
+            },
+            {"note_count": count, "last_note_at": latest, "version": 1, "modified_at": now,
+             "joined_at": _joined_at(author_id)},
+        )
+
+
+def notes_changed(author_ids):
+    """Record that some of each author's notes were edited in place."""
+    now = timezone.now()
+    for author_id in set(author_ids):
+        _increment_or_create(
+            AuthorNoteStats,
+            {"author_id": author_id},
+            {"version": F("version") + 1, "modified_at": now},
+            {"version": 1, "modified_at": now, "joined_at": _joined_at(author_id)},
+        )
+
+
+def note_removed(note):
+    DailyNoteCount.objects.filter(
+        author_id=note.author_id, date=_note_date(note), count__gt=0
+    ).update(count=F("count") - 1)
+    latest = Note.objects.filter(author_id=OuterRef("author_id")).order_by("-created_at").values("created_at")[:1]
+    AuthorNoteStats.objects.filter(author_id=note.author_id, note_count__gt=0).update(
+        note_count=F("note_count") - 1,
+        last_note_at=Subquery(latest),
+        version=F("version") + 1,
+        modified_at=timezone.now(),
+    )
+
+
+def rebuild(batch_size=1000):
+    """Recompute every rollup row from the ``Note`` table."""
+    with transaction.atomic():
+        DailyNoteCount.objects.all().delete()
+        AuthorNoteStats.objects.all().delete()
+
+        daily = (
+            Note.objects.annotate(date=TruncDate("created_at"))
+            .values("author_id", "date")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        _bulk_create_chunked(DailyNoteCount, daily, batch_size)
+
+        # One row per user, notes or not. Rebuilt rows start a new version so
+        # no previously issued ETag matches.
+        per_author = (
+            User.objects.values(author_id=F("id"), joined_at=F("date_joined"))
+            .annotate(note_count=Count("notes"), last_note_at=Max("notes__created_at"))
+            .annotate(version=Value(time.time_ns() // 1000), modified_at=Value(timezone.now()))
+            .order_by()
+        )
+        _bulk_create_chunked(AuthorNoteStats, per_author, batch_size)
+
+
+def _bulk_create_chunked(model, rows, batch_size):
+    """Insert ``model`` rows built from a ``.values()`` queryset, one batch at a time."""
+    iterator = rows.iterator(chunk_size=batch_size)
+    while batch := list(islice(iterator, batch_size)):
+        model.objects.bulk_create([model(**row) for row in batch])
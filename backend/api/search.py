@@ -0,0 +1,69 @@
+import re
+
+from django.db import connection
+
+from .models import Note
+
+
+# Kept in step with the expression index created in 0003_note_search.
+POSTGRES_VECTOR = "to_tsvector('english', title || ' ' || content)"
+
+SNIPPET_WORDS = 24
+
+SQLITE_SEARCH = """
+    SELECT n.id, n.title, n.created_at, n.author_id,
+           snippet(api_note_fts, 1, '', '', '...', %s) AS snippet,
+           bm25(api_note_fts, 2.0, 1.0) AS rank
+    FROM api_note_fts
+    JOIN api_note n ON n.id = api_note_fts.rowid
+    WHERE api_note_fts MATCH %s AND n.author_id = %s
+    ORDER BY rank, n.id DESC
+    LIMIT %s OFFSET %s
+"""
+
+POSTGRES_SEARCH = f"""
+    SELECT n.id, n.title, n.created_at, n.author_id,
+           ts_headline('english', n.content, hits.query,
+                       'MaxWords={SNIPPET_WORDS}, MinWords=8, ShortWord=2') AS snippet,
+           hits.rank
+    FROM (
+        SELECT id, query, ts_rank({POSTGRES_VECTOR}, query) AS rank
+        FROM api_note, websearch_to_tsquery('english', %s) AS query
+        WHERE author_id = %s AND {POSTGRES_VECTOR} @@ query
+        ORDER BY rank DESC, id DESC
+        LIMIT %s OFFSET %s
+    ) AS hits
+    JOIN api_note n ON n.id = hits.id
+    ORDER BY hits.rank DESC, n.id DESC
+"""
+
+
+def build_match_expression(query):
+    """
+    Turn free text into an FTS5 MATCH expression that ANDs every word.
+
+    Each word is quoted so user input can never be parsed as FTS5 syntax.
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"' for word in words)
+
+
+def search_notes(author, query, limit, offset=0):
+    """
+    Return the author's notes matching ``query``, best match first.
+
+    Results are ``Note`` instances with ``content`` deferred and two extra
+    attributes: ``snippet`` (a short excerpt around the match) and ``rank``.
+    """
+    if connection.vendor == "sqlite":
+        match = build_match_expression(query)
+        if not match:
+            return []
+        params = [SNIPPET_WORDS, match, author.pk, limit, offset]
+        sql = SQLITE_SEARCH
+    elif connection.vendor == "postgresql":
+        params = [query, author.pk, limit, offset]
+        sql = POSTGRES_SEARCH
+    else:
+        raise NotImplementedError(f"Full-text search is not supported on {connection.vendor}")
+    return list(Note.objects.raw(sql, params))
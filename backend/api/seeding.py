@@ -0,0 +1,87 @@
+"""
+Row generation for ``populate_db``.
+
+Everything here is plain Python plus Faker, with no Django models, so
+chunks can be generated in worker processes. A chunk's users and notes are
+derived only from ``(seed, chunk index)``. Timestamps are offsets from the
+load time. This makes runs reproducible and lets an interrupted run resume
+by skipping the chunks it already loaded.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from faker import Faker
+
+NOTE_TYPES = ("paragraph", "todo", "meeting", "idea")
+JOIN_WINDOW = timedelta(days=730)
+
+
+def username_for(first_name, last_name, seed, index):
+    # The seed and index make names unique across runs and identify the
+    # chunk a user belongs to when resuming.
+    return f"{first_name.lower()}.{last_name.lower()}.{seed}-{index}"[-150:]
+
+
+def parse_index(username, seed):
+    """Return the user index encoded by ``username_for``, or ``None``."""
+    head, sep, index = username.rpartition(f".{seed}-")
+    if not sep or not index.isdigit():
+        return None
+    return int(index)
+
+
+def _note(fake, rng):
+    note_type = rng.choice(NOTE_TYPES)
+    if note_type == "paragraph":
+        content = fake.paragraph(nb_sentences=rng.randint(3, 8))
+        title = fake.sentence(nb_words=rng.randint(4, 8))[:-1]
+    elif note_type == "todo":
+        todos = [fake.sentence() for _ in range(rng.randint(3, 7))]
+        content = "\n".join(f"- {todo}" for todo in todos)
+        title = "To-Do List: " + fake.word().title()
+    elif note_type == "meeting":
+        attendees = [fake.name() for _ in range(rng.randint(2, 5))]
+        content = f"Meeting Date: {fake.future_date().strftime('%Y-%m-%d')}\n"
+        content += f"Attendees: {', '.join(attendees)}\n\n"
+        content += fake.paragraph(nb_sentences=rng.randint(2, 4))
+        title = f"Meeting Notes: {fake.company()}"
+    else:
+        content = f"💡 {fake.paragraph(nb_sentences=1)}\n\n"
+        content += fake.paragraph(nb_sentences=rng.randint(2, 4))
+        title = "Idea: " + fake.catch_phrase()
+    return title[:100], content
+
+
+def generate_chunk(seed, chunk, start, count, notes_min, notes_max, now):
+    """
+    Generate users ``start .. start + count - 1`` and their notes.
+
+    Returns ``(users, notes)``. ``users`` is a list of ``(username, email,
+    first_name, last_name, date_joined)`` tuples. ``notes`` is a list of
+    ``(user position in users, title, content, created_at)`` tuples.
+    """
+    chunk_seed = seed * 1_000_003 + chunk
+    fake = Faker()
+    fake.seed_instance(chunk_seed)
+    rng = random.Random(chunk_seed)
+
+    users = []
+    notes = []
+    window = JOIN_WINDOW.total_seconds()
+    for position, index in enumerate(range(start, start + count)):
+        first_name = fake.first_name()
+        last_name = fake.last_name()
+        username = username_for(first_name, last_name, seed, index)
+        date_joined = now - timedelta(seconds=rng.random() * window)
+        users.append((username, f"{username}@{fake.free_email_domain()}", first_name, last_name, date_joined))
+
+        active = (now - date_joined).total_seconds()
+        for _ in range(rng.randint(notes_min, notes_max)):
+            title, content = _note(fake, rng)
+            created_at = date_joined + timedelta(seconds=rng.random() * active)
+            notes.append((position, title, content, created_at))
+    return users, notes
+
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(microsecond=0)
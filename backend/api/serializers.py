@@ -1,8 +1,27 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from . import hashing
 from .models import Note
 from django.db.models import Count
 
+# Characters of ``content`` included in list previews.
+PREVIEW_LENGTH = 200
+
+
+class SparseFieldsetMixin:
+    """
+    Restrict the serializer to the field names in ``context["fields"]``.
+
+    Without that context entry every declared field is kept.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get("fields")
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,13 +35,33 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class NoteSerializer(serializers.ModelSerializer):
+class NoteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Note
-        fields = ["id", "title", "content", "created_at", "author"]
+        fields = ["id", "title", "content", "created_at", "updated_at", "author"]
         extra_kwargs = {"author": {"read_only": True}}
 
 
+class NoteSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    List representation of a note. ``preview`` is annotated by the queryset
+    (the first ``PREVIEW_LENGTH`` characters of ``content``, cut in SQL).
+    """
+    preview = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Note
+        fields = ["id", "title", "preview", "created_at"]
+
+
+class NoteSearchResultSerializer(serializers.ModelSerializer):
+    snippet = serializers.CharField()
+    rank = serializers.FloatField()
+
+    class Meta:
+        model = Note
+        fields = ["id", "title", "snippet", "created_at", "rank"]
+
 
 class UserSerializer(serializers.ModelSerializer):
     confirm_password = serializers.CharField(write_only=True)
@@ -43,7 +82,12 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('confirm_password')  # Remove confirm_password before creating user
-        user = User.objects.create_user(**validated_data)
+        # What create_user does, with the hash computed in the bounded pool.
+        password = hashing.make_password(validated_data.pop('password'))
+        user = User(**validated_data, password=password)
+        user.username = User.normalize_username(user.username)
+        user.email = User.objects.normalize_email(user.email)
+        user.save()
         return user
 
 
@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import blacklist, dashboard_cache, rollups, sync, user_cache
+from .models import Note
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Updates never move a note to another author or day, so they only
+    # bump the author's version.
+    if created:
+        rollups.note_added(instance)
+    else:
+        rollups.notes_changed([instance.author_id])
+    sync.stamp(instance.author_id, [instance.pk])
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, origin=None, **kwargs):
+    rollups.note_removed(instance)
+    # Notes deleted along with their author have nobody left to sync to.
+    if not (isinstance(origin, User) or getattr(origin, "model", None) is User):
+        sync.note_deleted(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        rollups.user_saved(instance, created)
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_dashboard_cache(sender, **kwargs):
+    dashboard_cache.invalidate()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    # Covers deactivation and password changes, which are plain saves.
+    user_cache.invalidate(instance)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        blacklist.added(instance.token.jti)
@@ -0,0 +1,145 @@
+"""
+Delta sync for notes.
+
+Every note carries a ``sync_version``: the author's ``AuthorNoteStats.version``
+right after the write that last touched it. Deleted notes leave a
+``NoteTombstone`` stamped the same way. The version is bumped by an UPDATE
+of the author's stats row inside the write's transaction, so the row lock
+orders an author's writes. When a reader sees version ``v`` committed,
+every write stamped with a version up to ``v`` has committed too. A sync
+therefore reads the author's current version first and returns the
+changes in ``(since, current]``. Unlike ``updated_at`` timestamps, this
+can't skip a write that committed after a later one.
+
+Sync tokens are opaque to clients. A token holds the version a client has
+seen up to, the note id inside that version when a page stopped part way
+through it, and the time that version was read. Tombstones are pruned after
+``TOMBSTONE_RETENTION``, so tokens are only accepted for the shorter
+``TOKEN_LIFETIME``. An older token could miss deletions, so the client
+gets an error and must start over with a full sync.
+"""
+import json
+import time
+from base64 import b64decode, b64encode
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AuthorNoteStats, Note, NoteTombstone
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(ValueError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, "NOTE_SYNC", {}).get(name, default)
+
+
+def _author_version(author_id):
+    return Coalesce(
+        Subquery(AuthorNoteStats.objects.filter(author_id=author_id).values("version")[:1]), 0
+    )
+
+
+def stamp(author_id, note_ids):
+    """Stamp notes with their author's version; call after the rollups bumped it."""
+    Note.objects.filter(pk__in=note_ids).update(sync_version=_author_version(author_id))
+
+
+def note_deleted(note):
+    NoteTombstone.objects.create(
+        note_id=note.pk, author_id=note.author_id, sync_version=_author_version(note.author_id)
+    )
+
+
+def prune_tombstones(older_than=None):
+    """Delete tombstones older than ``older_than`` (default: the retention). Returns the count."""
+    if older_than is None:
+        older_than = _setting("TOMBSTONE_RETENTION", timedelta(days=31))
+    return NoteTombstone.objects.filter(deleted_at__lt=timezone.now() - older_than).delete()[0]
+
+
+def encode_token(version, note_id, started):
+    payload = json.dumps({"v": version, "k": note_id, "t": started})
+    return b64encode(payload.encode(), altchars=b"-_").decode("ascii")
+
+
+def decode_token(token):
+    """Return ``(version, note_id, started)``; raise ``InvalidToken`` or ``ExpiredToken``."""
+    try:
+        payload = json.loads(b64decode(token.encode("ascii"), altchars=b"-_"))
+        version, note_id, started = payload["v"], payload["k"], payload["t"]
+        if not all(isinstance(value, int) for value in (version, started)) or not (
+            note_id is None or isinstance(note_id, int)
+        ):
+            raise ValueError
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise InvalidToken("Invalid sync token")
+    if time.time() - started > _setting("TOKEN_LIFETIME", timedelta(days=30)).total_seconds():
+        raise ExpiredToken("Sync token expired; sync again without 'since'")
+    return version, note_id, started
+
+
+def _after(version_field, id_field, version, note_id):
+    if note_id is None:
+        return Q(**{f"{version_field}__gt": version})
+    return Q(**{f"{version_field}__gt": version}) | Q(**{version_field: version, f"{id_field}__gt": note_id})
+
+
+def changes(author, token=None, limit=100, values=("id",)):
+    """
+    Return ``(notes, deleted_ids, next_token, has_more)`` for ``author``.
+
+    Without a token every note is returned and no deletions. ``notes`` are
+    ``.values()`` dicts of ``values`` plus ``sync_version``. Callers keep
+    requesting with ``next_token`` while ``has_more``; the last token is the
+    one to store for the next sync.
+    """
+    now = int(time.time())
+    if token is None:
+        version, note_id, started = None, None, now
+    else:
+        version, note_id, started = decode_token(token)
+    current = (
+        AuthorNoteStats.objects.filter(author=author).values_list("version", flat=True).first() or 0
+    )
+
+    notes = Note.objects.filter(author=author, sync_version__lte=current)
+    if version is not None:
+        notes = notes.filter(_after("sync_version", "id", version, note_id))
+    notes = list(notes.order_by("sync_version", "id").values(*values, "sync_version")[:limit + 1])
+    rows = [(note["sync_version"], note["id"], note) for note in notes]
+
+    if version is not None:
+        tombstones = NoteTombstone.objects.filter(author=author, sync_version__lte=current).filter(
+            _after("sync_version", "note_id", version, note_id)
+        )
+        rows.extend(
+            (row_version, row_id, None)
+            for row_version, row_id in tombstones.order_by("sync_version", "note_id").values_list(
+                "sync_version", "note_id"
+            )[:limit + 1]
+        )
+
+    rows.sort(key=lambda row: row[:2])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        # Tombstones past the last row may be as old as the token we started from.
+        next_token = encode_token(rows[-1][0], rows[-1][1], started)
+    else:
+        next_token = encode_token(max(current, version or 0), None, now)
+    return (
+        [note for _, _, note in rows if note is not None],
+        [row_id for _, row_id, note in rows if note is None],
+        next_token,
+        has_more,
+    )
@@ -3,8 +3,35 @@ from django.contrib.auth.models import User
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
-from .models import Note
+from .models import Note, AuthorNoteStats, DailyNoteCount, NoteTombstone
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.db import OperationalError, connection
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.core.cache import cache
+from django.test import override_settings
+from django.conf import settings
+from io import StringIO
+from datetime import date, datetime, timedelta
+import csv
+import re
+import gzip
+import json
+import os
+import tempfile
+import time
+import zoneinfo
+from django.http import QueryDict, StreamingHttpResponse
+from django.test import Client, RequestFactory
+from unittest import mock
+from .serializers import NoteSerializer, NoteSummarySerializer, UserStatsSerializer, PREVIEW_LENGTH
+from .fast_serializers import FastReadSerializer
+from django.db.models import Count, Max
+from rest_framework.renderers import JSONRenderer
+from . import benchmarks, blacklist, compression, dashboard_cache, fields, hashing, metrics, rollups, sync, throttling, timeseries, user_cache
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from django.test.utils import CaptureQueriesContext
 
 class AuthenticationTests(APITestCase):
     def setUp(self):
@@ -122,7 +149,7 @@ class NoteTests(APITestCase):
     def test_get_notes_list_success(self):
         response = self.client.get(self.notes_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_get_other_user_notes(self):
         # Create note for other user
@@ -132,7 +159,7 @@ class NoteTests(APITestCase):
             author=self.other_user
         )
         response = self.client.get(self.notes_url)
-        self.assertEqual(len(response.data), 1)  # Should only see own notes
+        self.assertEqual(len(response.data['results']), 1)  # Should only see own notes
 
     def test_update_note_success(self):
         data = {
@@ -211,3 +238,1870 @@ class UserLogoutTests(APITestCase):
         response = self.client.post(self.logout_url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+
+class NotePaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        Note.objects.bulk_create([
+            Note(title=f'Note {i}', content='Content', author=self.user)
+            for i in range(25)
+        ])
+        self.notes_url = reverse('note-list')
+
+    def test_list_is_paginated(self):
+        response = self.client.get(self.notes_url, {'page_size': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+        self.assertNotIn('count', response.data)
+
+    def test_cursor_walk_returns_every_note_once(self):
+        seen = []
+        url = f'{self.notes_url}?page_size=10'
+        while url:
+            response = self.client.get(url)
+            seen.extend(note['id'] for note in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_previous_cursor_returns_prior_page(self):
+        first = self.client.get(self.notes_url, {'page_size': 10})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [n['id'] for n in back.data['results']],
+            [n['id'] for n in first.data['results']],
+        )
+
+    def test_list_does_not_count_rows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.notes_url)
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+
+    def test_unpaginated_opt_in(self):
+        response = self.client.get(self.notes_url, {'paginate': 'false'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 25)
+
+class QueryPlanTests(APITestCase):
+    """
+    Runs EXPLAIN on every query each endpoint issues and fails when one of
+    them falls back to a table scan or sorts rows in a temp B-tree.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='admin',
+            password='testpass123',
+            is_staff=True
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        Note.objects.bulk_create([
+            Note(title=f'Note {i}', content='Content', author=self.user)
+            for i in range(20)
+        ])
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+            # Tiny test tables would otherwise always be sequentially scanned.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+
+    def is_full_scan(self, line):
+        if connection.vendor == 'sqlite':
+            return line.startswith('SCAN ') and ' INDEX ' not in line
+        return 'Seq Scan' in line
+
+    def is_row_sort(self, line):
+        if connection.vendor == 'sqlite':
+            return 'TEMP B-TREE FOR ORDER BY' in line
+        return line.strip().lstrip('-> ').startswith('Sort')
+
+    def assertIndexedPlans(self, url):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f'No plan checks for {connection.vendor}')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            plan = self.explain(sql)
+            for line in plan:
+                self.assertFalse(self.is_full_scan(line), f'Full scan in {url}:\n{sql}\n{plan}')
+                self.assertFalse(self.is_row_sort(line), f'Sort in {url}:\n{sql}\n{plan}')
+        return response
+
+    def test_notes_list_plan(self):
+        response = self.assertIndexedPlans(reverse('note-list') + '?page_size=5')
+        self.assertIndexedPlans(response.data['next'])
+
+    def test_async_notes_list_plan(self):
+        response = self.assertIndexedPlans(reverse('async-note-list') + '?page_size=5')
+        self.assertIndexedPlans(response.json()['next'])
+
+    def test_dashboard_stats_plan(self):
+        self.assertIndexedPlans(reverse('dashboard-stats'))
+
+    def test_user_stats_plan(self):
+        for sort in ('-notes', 'notes', '-last_active', 'joined'):
+            self.assertIndexedPlans(f"{reverse('user-stats')}?sort={sort}&page_size=1")
+        self.assertIndexedPlans(f"{reverse('user-stats')}?limit=5")
+        User.objects.create_user(username='second', password='testpass123')
+        response = self.assertIndexedPlans(f"{reverse('user-stats')}?page_size=1")
+        self.assertIndexedPlans(response.data['next'])
+
+    def test_notes_per_day_plan(self):
+        self.assertIndexedPlans(reverse('notes-per-day'))
+
+    def test_notes_per_user_plan(self):
+        self.assertIndexedPlans(reverse('notes-per-user'))
+
+    def test_notes_series_plan(self):
+        for params in ('', 'granularity=month', 'granularity=hour', 'tz=Asia/Tokyo', f'author={self.user.pk}'):
+            self.assertIndexedPlans(f"{reverse('notes-series')}?{params}")
+
+class NoteSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.search_url = reverse('note-search')
+        self.note = Note.objects.create(
+            title='Grocery list',
+            content='Buy apples, bananas and a large bag of coffee beans.',
+            author=self.user
+        )
+
+    def test_search_finds_matching_note(self):
+        response = self.client.get(self.search_url, {'q': 'coffee'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in response.data['results']], [self.note.id])
+        self.assertIn('coffee', response.data['results'][0]['snippet'])
+        self.assertNotIn('content', response.data['results'][0])
+
+    def test_search_requires_query(self):
+        response = self.client.get(self.search_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_is_scoped_to_author(self):
+        Note.objects.create(title='Coffee', content='Coffee tasting notes', author=self.other_user)
+        response = self.client.get(self.search_url, {'q': 'coffee'})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_search_ranks_title_matches_higher(self):
+        title_match = Note.objects.create(
+            title='Coffee roasting',
+            content='Notes on roasting beans.',
+            author=self.user
+        )
+        response = self.client.get(self.search_url, {'q': 'coffee'})
+        self.assertEqual(response.data['results'][0]['id'], title_match.id)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.note.content = 'Buy tea instead.'
+        self.note.save()
+        self.assertEqual(self.client.get(self.search_url, {'q': 'coffee'}).data['results'], [])
+        self.assertEqual(len(self.client.get(self.search_url, {'q': 'tea'}).data['results']), 1)
+        self.note.delete()
+        self.assertEqual(self.client.get(self.search_url, {'q': 'tea'}).data['results'], [])
+
+    def test_search_is_paginated(self):
+        Note.objects.bulk_create([
+            Note(title=f'Coffee {i}', content='More coffee', author=self.user)
+            for i in range(5)
+        ])
+        first = self.client.get(self.search_url, {'q': 'coffee', 'page_size': 4})
+        self.assertEqual(len(first.data['results']), 4)
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 2)
+        self.assertIsNone(second.data['next'])
+        self.assertIsNotNone(second.data['previous'])
+
+    def test_search_ignores_query_syntax(self):
+        response = self.client.get(self.search_url, {'q': '"coffee"* ^('})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+class NoteRollupTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='testpass123',
+            is_staff=True
+        )
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+    def create_notes(self, author, count):
+        return [
+            Note.objects.create(title=f'Note {i}', content='Content', author=author)
+            for i in range(count)
+        ]
+
+    def test_rollups_follow_creates_and_deletes(self):
+        notes = self.create_notes(self.user, 3)
+        stats = AuthorNoteStats.objects.get(author=self.user)
+        self.assertEqual(stats.note_count, 3)
+        self.assertEqual(stats.last_note_at, notes[-1].created_at)
+        daily = DailyNoteCount.objects.get(author=self.user)
+        self.assertEqual(daily.date, timezone.localdate(notes[0].created_at))
+        self.assertEqual(daily.count, 3)
+
+        notes[-1].delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.note_count, 2)
+        self.assertEqual(stats.last_note_at, notes[1].created_at)
+        self.assertEqual(DailyNoteCount.objects.get(author=self.user).count, 2)
+
+    def test_updates_do_not_change_rollups(self):
+        note = self.create_notes(self.user, 1)[0]
+        note.title = 'Renamed'
+        note.save()
+        self.assertEqual(AuthorNoteStats.objects.get(author=self.user).note_count, 1)
+
+    def test_dashboard_reads_rollups(self):
+        self.create_notes(self.user, 3)
+        self.create_notes(self.admin, 1)
+        stats = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(stats.data['total_notes'], 4)
+        per_user = self.client.get(reverse('notes-per-user'))
+        self.assertEqual(
+            [(row['username'], row['count']) for row in per_user.data],
+            [('testuser', 3), ('admin', 1)],
+        )
+        per_day = self.client.get(reverse('notes-per-day'))
+        self.assertEqual(per_day.data[0]['count'], 4)
+
+    def test_rebuild_command_matches_incremental_rollups(self):
+        self.create_notes(self.user, 2)
+        Note.objects.bulk_create([Note(title='Bulk', content='Content', author=self.admin)])
+        self.assertEqual(AuthorNoteStats.objects.get(author=self.admin).note_count, 0)
+
+        call_command('rebuild_note_rollups', stdout=StringIO())
+        self.assertEqual(AuthorNoteStats.objects.get(author=self.user).note_count, 2)
+        self.assertEqual(AuthorNoteStats.objects.get(author=self.admin).note_count, 1)
+        self.assertEqual(sum(DailyNoteCount.objects.values_list('count', flat=True)), 3)
+
+class DashboardCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='testpass123',
+            is_staff=True
+        )
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.stats_url = reverse('dashboard-stats')
+
+    def test_second_request_is_served_from_cache(self):
+        self.assertEqual(self.client.get(self.stats_url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):  # the user comes from the auth cache too
+            response = self.client.get(self.stats_url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_note_write_invalidates_entries(self):
+        self.assertEqual(self.client.get(self.stats_url).data['total_notes'], 0)
+        Note.objects.create(title='Note', content='Content', author=self.admin)
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['total_notes'], 1)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.client.get(reverse('notes-per-day'), {'days': 7})
+        response = self.client.get(reverse('notes-per-day'), {'days': 30})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_stale_entry_served_while_another_request_recomputes(self):
+        self.client.get(self.stats_url)
+        dashboard_cache.bump_generation()
+        key = dashboard_cache.make_key('dashboard-stats', QueryDict())
+        cache.add(f'{key}:lock', 1)
+        response = self.client.get(self.stats_url)
+        self.assertEqual(response['X-Cache'], 'STALE')
+        cache.delete(f'{key}:lock')
+        self.assertEqual(self.client.get(self.stats_url)['X-Cache'], 'MISS')
+
+    def test_cache_stats_endpoint(self):
+        self.client.get(self.stats_url)
+        self.client.get(self.stats_url)
+        response = self.client.get(reverse('dashboard-cache-stats'))
+        self.assertEqual(response.data, {'hit': 1, 'stale': 0, 'miss': 1})
+
+    def test_non_admin_never_sees_cached_data(self):
+        self.client.get(self.stats_url)
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.assertEqual(self.client.get(self.stats_url).status_code, status.HTTP_403_FORBIDDEN)
+
+class NoteExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.export_url = reverse('note-export')
+        self.old_note = Note.objects.create(title='Old', content='First, "quoted"\nline', author=self.user)
+        Note.objects.filter(pk=self.old_note.pk).update(created_at=timezone.now() - timedelta(days=10))
+        self.new_note = Note.objects.create(title='New', content='Second', author=self.user)
+        Note.objects.create(title='Other', content='Not mine', author=self.other_user)
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_export_streams_own_notes(self):
+        response = self.client.get(self.export_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.old_note.id, self.new_note.id])
+        self.assertEqual(rows[0]['content'], 'First, "quoted"\nline')
+
+    def test_csv_export(self):
+        response = self.client.get(self.export_url, {'output': 'csv'})
+        rows = list(csv.reader(StringIO(self.read(response).decode())))
+        self.assertEqual(rows[0], ['id', 'title', 'content', 'created_at', 'author'])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][2], 'First, "quoted"\nline')
+
+    def test_gzip_export(self):
+        response = self.client.get(self.export_url, {'gzip': 'true'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('notes.ndjson.gz', response['Content-Disposition'])
+        lines = gzip.decompress(self.read(response)).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+
+    def test_created_range_filters(self):
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = self.client.get(self.export_url, {'created_after': since})
+        rows = [json.loads(line) for line in self.read(response).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.new_note.id])
+
+        response = self.client.get(self.export_url, {'created_before': since})
+        rows = [json.loads(line) for line in self.read(response).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.old_note.id])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.export_url, {'output': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.export_url, {'created_after': 'soon'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_notes_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'notes.csv.gz')
+            call_command('export_notes', output=path, fmt='csv', gzip=True, chunk_size=1, stdout=StringIO())
+            with gzip.open(path, 'rt', newline='') as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(len(rows), 4)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'notes.ndjson')
+            call_command('export_notes', output=path, author='otheruser', stdout=StringIO())
+            with open(path) as f:
+                self.assertEqual(json.loads(f.read())['title'], 'Other')
+
+class NoteBatchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.batch_url = reverse('note-batch')
+        self.note = Note.objects.create(title='Keep', content='Content', author=self.user)
+        self.doomed = Note.objects.create(title='Delete me', content='Content', author=self.user)
+
+    def post(self, operations):
+        return self.client.post(self.batch_url, {'operations': operations}, format='json')
+
+    def test_mixed_batch_is_applied(self):
+        response = self.post([
+            {'op': 'create', 'data': {'title': 'One', 'content': 'First'}},
+            {'op': 'create', 'data': {'title': 'Two', 'content': 'Second'}},
+            {'op': 'update', 'id': self.note.id, 'data': {'title': 'Kept'}},
+            {'op': 'delete', 'id': self.doomed.id},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([r['status'] for r in results], [201, 201, 200, 204])
+        self.assertEqual(results[0]['data']['author'], self.user.id)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, 'Kept')
+        self.assertEqual(self.note.content, 'Content')
+        self.assertFalse(Note.objects.filter(pk=self.doomed.pk).exists())
+        self.assertEqual(Note.objects.filter(author=self.user).count(), 3)
+        self.assertEqual(AuthorNoteStats.objects.get(author=self.user).note_count, 3)
+
+    def test_empty_update_reports_stored_note(self):
+        stored = self.note.updated_at
+        response = self.post([
+            {'op': 'update', 'id': self.note.id, 'data': {}},
+            {'op': 'update', 'id': self.doomed.id, 'data': {'title': 'Renamed'}},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        unchanged, renamed = response.data['results']
+        self.assertEqual(unchanged['status'], 200)
+        self.assertEqual(parse_datetime(unchanged['data']['updated_at']), stored)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.updated_at, stored)
+        self.assertNotEqual(parse_datetime(renamed['data']['updated_at']), stored)
+
+    def test_batch_uses_bulk_queries(self):
+        operations = [{'op': 'create', 'data': {'title': f'N{i}', 'content': 'C'}} for i in range(20)]
+        with CaptureQueriesContext(connection) as ctx:
+            self.post(operations)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "api_note"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_invalid_item_rolls_back_whole_batch(self):
+        response = self.post([
+            {'op': 'create', 'data': {'title': 'One', 'content': 'First'}},
+            {'op': 'create', 'data': {'content': 'No title'}},
+            {'op': 'delete', 'id': self.doomed.id},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([r['status'] for r in response.data['results']], [424, 400, 424])
+        self.assertIn('title', response.data['results'][1]['errors'])
+        self.assertEqual(Note.objects.filter(author=self.user).count(), 2)
+
+    def test_other_users_notes_are_not_found(self):
+        other_note = Note.objects.create(title='Other', content='Content', author=self.other_user)
+        response = self.post([
+            {'op': 'update', 'id': other_note.id, 'data': {'title': 'Mine now'}},
+            {'op': 'delete', 'id': other_note.id},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([r['status'] for r in response.data['results']], [404, 404])
+        other_note.refresh_from_db()
+        self.assertEqual(other_note.title, 'Other')
+
+    def test_duplicate_and_malformed_operations(self):
+        response = self.post([
+            {'op': 'update', 'id': self.note.id, 'data': {'title': 'A'}},
+            {'op': 'delete', 'id': self.note.id},
+            {'op': 'explode'},
+        ])
+        self.assertEqual([r['status'] for r in response.data['results']], [424, 400, 400])
+
+    def test_batch_requires_operation_list(self):
+        self.assertEqual(self.post([]).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.batch_url, {'operations': 'nope'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class NoteConditionalRequestTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.note = Note.objects.create(title='Test Note', content='Test Content', author=self.user)
+        self.notes_url = reverse('note-list')
+        self.detail_url = reverse('note-detail', args=[self.note.id])
+
+    def test_list_and_detail_carry_validators(self):
+        for url in (self.notes_url, self.detail_url):
+            response = self.client.get(url)
+            self.assertTrue(response['ETag'].startswith('"'))
+            self.assertIn('Last-Modified', response)
+        self.assertNotEqual(self.client.get(self.notes_url)['ETag'], self.client.get(self.detail_url)['ETag'])
+
+    def test_if_none_match_returns_304_without_serializing(self):
+        etag = self.client.get(self.notes_url)['ETag']
+        with mock.patch.object(NoteSerializer, 'to_representation') as to_representation:
+            response = self.client.get(self.notes_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+
+    def test_if_modified_since_returns_304(self):
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_etag_depends_on_query(self):
+        self.assertNotEqual(
+            self.client.get(self.notes_url)['ETag'],
+            self.client.get(self.notes_url, {'page_size': 1})['ETag'],
+        )
+
+    def test_writes_change_etags(self):
+        list_etag = self.client.get(self.notes_url)['ETag']
+        detail_etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(self.detail_url, {'title': 'Changed'})
+        self.assertEqual(self.client.get(self.notes_url, HTTP_IF_NONE_MATCH=list_etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, status.HTTP_200_OK)
+
+    def test_if_match_allows_current_and_rejects_stale_writes(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.patch(self.detail_url, {'title': 'First'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_etag = response['ETag']
+        self.assertNotEqual(new_etag, etag)
+
+        response = self.client.patch(self.detail_url, {'title': 'Second'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, 'First')
+
+        response = self.client.delete(self.detail_url, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.delete(self.detail_url, HTTP_IF_MATCH=new_etag)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_conditional_get_only_looks_up_the_note(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with CaptureQueriesContext(connection) as ctx, \
+                mock.patch.object(NoteSerializer, 'to_representation') as to_representation:
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        to_representation.assert_not_called()
+
+    def test_missing_and_foreign_notes_are_404(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        foreign = Note.objects.create(title='Private', content='Secret', author=other)
+        for url in (reverse('note-detail', args=[99999]), reverse('note-detail', args=[foreign.pk])):
+            for headers in ({'HTTP_IF_NONE_MATCH': '*'}, {'HTTP_IF_MODIFIED_SINCE': 'Fri, 01 Jan 2100 00:00:00 GMT'}):
+                with self.subTest(url=url, headers=headers):
+                    self.assertEqual(self.client.get(url, **headers).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes_to_sibling_notes_keep_the_etag(self):
+        sibling = Note.objects.create(title='Sibling', content='Other', author=self.user)
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(reverse('note-detail', args=[sibling.pk]), {'title': 'Changed'})
+        self.client.post(self.notes_url, {'title': 'New', 'content': 'Body'})
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        response = self.client.patch(self.detail_url, {'title': 'Mine'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class NoteSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.note = Note.objects.create(title='Long note', content='x' * 1000, author=self.user)
+        self.notes_url = reverse('note-list')
+        self.detail_url = reverse('note-detail', args=[self.note.id])
+
+    def test_list_returns_summaries(self):
+        response = self.client.get(self.notes_url)
+        result = response.data['results'][0]
+        self.assertEqual(set(result), {'id', 'title', 'preview', 'created_at'})
+        self.assertEqual(result['preview'], 'x' * PREVIEW_LENGTH)
+
+    def test_list_never_reads_content_column(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.notes_url)
+        note_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "api_note"' in q['sql']]
+        self.assertEqual(len(note_queries), 1)
+        select_list = re.sub(r'(SUBSTR(ING)?|text_prefix)\("api_note"\."content"', '', note_queries[0])
+        self.assertNotIn('"api_note"."content"', select_list)
+
+    def test_full_view_opt_in(self):
+        response = self.client.get(self.notes_url, {'view': 'full'})
+        self.assertEqual(response.data['results'][0]['content'], 'x' * 1000)
+
+    def test_detail_returns_full_body(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['content'], 'x' * 1000)
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(self.notes_url, {'fields': 'id,title'})
+        self.assertEqual(response.data['results'], [{'id': self.note.id, 'title': 'Long note'}])
+        response = self.client.get(self.detail_url, {'fields': 'content'})
+        self.assertEqual(response.data, {'content': 'x' * 1000})
+
+    def test_sparse_fieldsets_restrict_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.notes_url, {'fields': 'title'})
+        sql = [q['sql'] for q in ctx.captured_queries if 'FROM "api_note"' in q['sql']][0]
+        self.assertNotIn('content', sql)
+        self.assertNotIn('author_id" FROM', sql.split('WHERE')[0])
+
+    def test_unknown_fields_rejected(self):
+        response = self.client.get(self.notes_url, {'fields': 'title,content'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
+class FastReadSerializerTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.idle_user = User.objects.create_user(
+            username='idleuser',
+            password='testpass123'
+        )
+        Note.objects.create(title='First', content='Content', author=self.user)
+        Note.objects.create(title='Ünïcode "quoted"', content='Line\nbreak', author=self.user)
+        self.renderer = JSONRenderer()
+
+    def assertSameJSON(self, serializer_class, queryset):
+        expected = self.renderer.render(serializer_class(queryset, many=True).data)
+        actual = self.renderer.render(FastReadSerializer(serializer_class).data(queryset))
+        self.assertEqual(actual, expected)
+
+    def test_note_serializer_output_is_identical(self):
+        self.assertSameJSON(NoteSerializer, Note.objects.order_by('id'))
+
+    def test_user_stats_output_is_identical(self):
+        users = User.objects.annotate(
+            total_notes=Count('notes'),
+            last_note_date=Max('notes__created_at')
+        ).order_by('id')
+        self.assertSameJSON(UserStatsSerializer, users)
+
+    def test_output_is_identical_in_other_timezones(self):
+        with timezone.override('Asia/Kolkata'):
+            self.assertSameJSON(NoteSerializer, Note.objects.order_by('id'))
+
+    def test_sparse_fieldsets_are_respected(self):
+        serializer = NoteSerializer(context={'fields': ['id', 'title']})
+        rows = FastReadSerializer(serializer).data(Note.objects.order_by('id'))
+        self.assertEqual(rows[0], {'id': Note.objects.order_by('id')[0].id, 'title': 'First'})
+
+    def test_list_endpoint_uses_values_rows(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        with mock.patch.object(NoteSummarySerializer, 'to_representation') as to_representation:
+            response = self.client.get(reverse('note-list'))
+        to_representation.assert_not_called()
+        self.assertEqual([n['title'] for n in response.data['results']], ['Ünïcode "quoted"', 'First'])
+
+class UserStatsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='testpass123',
+            is_staff=True
+        )
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.url = reverse('user-stats')
+        now = timezone.now()
+        self.users = []
+        for i, count in enumerate([3, 1, 2, 1]):
+            user = User.objects.create_user(
+                username=f'user{i}',
+                password='testpass123',
+                date_joined=now - timedelta(days=10 - i)
+            )
+            for _ in range(count):
+                Note.objects.create(title='Note', content='Content', author=user)
+            self.users.append(user)
+
+    def names(self, response):
+        return [row['username'] for row in response.data['results']]
+
+    def test_default_sort_is_most_notes_first(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.names(response), ['user0', 'user2', 'user3', 'user1', 'admin'])
+        self.assertEqual(response.data['results'][0]['total_notes'], 3)
+        self.assertIsNone(response.data['results'][-1]['last_note_date'])
+
+    def test_matches_aggregate_output(self):
+        expected = UserStatsSerializer(User.objects.annotate(
+            total_notes=Count('notes'),
+            last_note_date=Max('notes__created_at')
+        ).order_by('-total_notes', '-id'), many=True).data
+        response = self.client.get(self.url)
+        self.assertEqual(JSONRenderer().render(response.data['results']), JSONRenderer().render(expected))
+
+    def test_keyset_pages_keep_microsecond_boundaries(self):
+        base = timezone.now().replace(microsecond=0)
+        for i, user in enumerate(self.users + [self.admin]):
+            # Distinct microseconds within one millisecond.
+            AuthorNoteStats.objects.filter(author=user).update(
+                joined_at=base + timedelta(microseconds=i), last_note_at=base + timedelta(microseconds=i),
+            )
+        expected = sorted(user.username for user in self.users + [self.admin])
+        for url in (self.url, reverse('async-user-stats')):
+            for sort in ('joined', '-joined', 'last_active', '-last_active'):
+                with self.subTest(url=url, sort=sort):
+                    seen = []
+                    page = f'{url}?sort={sort}&page_size=2'
+                    while page:
+                        data = self.client.get(page).json()
+                        seen.extend(row['username'] for row in data['results'])
+                        page = data['next']
+                    self.assertEqual(sorted(seen), expected)
+                    self.assertEqual(len(seen), len(expected))
+
+    def test_keyset_pages_walk_through_ties(self):
+        seen = []
+        url = f'{self.url}?page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(self.names(response))
+            url = response.data['next']
+        self.assertEqual(seen, ['user0', 'user2', 'user3', 'user1', 'admin'])
+
+        first = self.client.get(self.url, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(self.names(back), ['user0', 'user2'])
+        self.assertIsNone(back.data['previous'])
+
+    def test_sort_options(self):
+        self.assertEqual(self.names(self.client.get(self.url, {'sort': 'joined'}))[:2], ['user0', 'user1'])
+        self.assertEqual(self.names(self.client.get(self.url, {'sort': '-joined'}))[0], 'admin')
+        last_active = self.names(self.client.get(self.url, {'sort': '-last_active'}))
+        self.assertEqual(last_active, ['user3', 'user2', 'user1', 'user0'])
+        self.assertEqual(self.client.get(self.url, {'sort': 'password'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_top_n(self):
+        response = self.client.get(self.url, {'limit': 2})
+        self.assertEqual([row['username'] for row in response.data], ['user0', 'user2'])
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_username_prefix(self):
+        User.objects.create_user(username='userless', password='testpass123')
+        response = self.client.get(self.url, {'username': 'user', 'sort': 'joined'})
+        self.assertEqual(len(response.data['results']), 5)
+        response = self.client.get(self.url, {'username': 'user2'})
+        self.assertEqual(self.names(response), ['user2'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class DashboardSnapshotTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+        self.url = reverse('dashboard-snapshot')
+        for i, count in enumerate([3, 1, 2]):
+            user = User.objects.create_user(username=f'user{i}', password='testpass123')
+            for _ in range(count):
+                Note.objects.create(title='Note', content='Content', author=user)
+        old = Note.objects.create(title='Old', content='Content', author=user)
+        Note.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=40))
+        rollups.rebuild()
+
+    def test_matches_the_separate_endpoints(self):
+        response = self.client.get(self.url, {'days': 60, 'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(set(data), {'stats', 'users', 'notes_per_day', 'notes_per_user'})
+        self.assertEqual(data['stats'], self.client.get(reverse('dashboard-stats')).json())
+        self.assertEqual(data['users'], self.client.get(reverse('user-stats'), {'limit': 3}).json())
+        self.assertEqual(data['notes_per_day'], self.client.get(reverse('notes-per-day'), {'days': 60}).json())
+        self.assertEqual(data['notes_per_user'], self.client.get(reverse('notes-per-user')).json())
+        self.assertEqual(data['stats'], {'total_users': 4, 'total_notes': 7})
+        self.assertEqual(len(data['notes_per_day']), 2)
+
+    def test_days_window(self):
+        days = self.client.get(self.url, {'panels': 'notes_per_day'}).json()['notes_per_day']
+        self.assertEqual([day['count'] for day in days], [6])
+
+    def test_panel_selection(self):
+        self.client.get(self.url)
+        for panels, queries in (('stats', 1), ('users', 1), ('notes_per_user', 1), ('stats,users', 2), ('notes_per_day', 1)):
+            dashboard_cache.bump_generation()
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(self.url, {'panels': panels})
+            self.assertEqual(set(response.json()), set(panels.split(',')))
+            self.assertEqual(len(captured), queries, panels)
+        stats = self.client.get(self.url, {'panels': 'stats'}).json()['stats']
+        self.assertEqual(stats, {'total_users': 4, 'total_notes': 7})
+
+    def test_invalid_parameters(self):
+        for params in ({'panels': 'stats,secrets'}, {'panels': ','}, {'days': 0}, {'days': 'week'}, {'limit': 5000}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('error', response.json())
+
+    def test_admin_only(self):
+        user = User.objects.get(username='user0')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class NotesSeriesTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+        self.url = reverse('notes-series')
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.now = timezone.now()
+
+    def note(self, ago, author=None):
+        note = Note.objects.create(title='Note', content='Content', author=author or self.author)
+        Note.objects.filter(pk=note.pk).update(created_at=self.now - ago)
+
+    def series(self, **params):
+        rollups.rebuild()
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        return response.json()
+
+    def test_daily_series_is_dense(self):
+        self.note(timedelta(0))
+        self.note(timedelta(0))
+        self.note(timedelta(days=3))
+        self.note(timedelta(days=40))
+        data = self.series()
+        counts = [row['count'] for row in data['results']]
+        self.assertEqual(len(counts), 30)
+        self.assertEqual(counts[-1], 2)
+        self.assertEqual(counts[-4], 1)
+        self.assertEqual(sum(counts), 3)
+        self.assertEqual(data['results'][-1]['bucket'], timezone.localdate().isoformat())
+        self.assertEqual(data['granularity'], 'day')
+        self.assertEqual(data['timezone'], 'UTC')
+
+    def test_hourly_series(self):
+        self.note(timedelta(0))
+        self.note(timedelta(hours=2))
+        results = self.series(granularity='hour', periods=6)['results']
+        self.assertEqual([row['count'] for row in results][-3:], [1, 0, 1])
+        last = parse_datetime(results[-1]['bucket'])
+        self.assertEqual(last, self.now.replace(minute=0, second=0, microsecond=0))
+
+    def test_weeks_and_months(self):
+        self.note(timedelta(0))
+        self.note(timedelta(days=7))
+        self.note(timedelta(days=62))
+        weeks = self.series(granularity='week', periods=4)['results']
+        self.assertEqual(date.fromisoformat(weeks[-1]['bucket']).weekday(), 0)
+        self.assertEqual([row['count'] for row in weeks][-2:], [1, 1])
+        months = self.series(granularity='month', periods=3)['results']
+        self.assertEqual(months[-1]['bucket'], timezone.localdate().replace(day=1).isoformat())
+        self.assertEqual(sum(row['count'] for row in months), 3)
+
+    def test_timezone_bucketing(self):
+        # 23:30 UTC is 08:30 the next day in Tokyo (UTC+9).
+        midnight = timezone.localtime(self.now).replace(hour=0, minute=0, second=0, microsecond=0)
+        created = midnight - timedelta(minutes=30)
+        self.note(self.now - created)
+        utc = self.series(periods=3)['results']
+        tokyo = self.series(periods=3, tz='Asia/Tokyo')['results']
+        self.assertEqual([row['bucket'] for row in utc if row['count']], [created.date().isoformat()])
+        self.assertEqual([row['bucket'] for row in tokyo if row['count']], [midnight.date().isoformat()])
+        hours = self.series(periods=48, tz='Asia/Tokyo', granularity='hour')
+        self.assertEqual(hours['timezone'], 'Asia/Tokyo')
+        self.assertEqual([row['bucket'] for row in hours['results'] if row['count']], [
+            created.astimezone(zoneinfo.ZoneInfo('Asia/Tokyo')).replace(minute=0).isoformat()
+        ])
+
+    def test_author_filter(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.note(timedelta(0))
+        self.note(timedelta(0), author=other)
+        for granularity in ('day', 'hour'):
+            results = self.series(granularity=granularity, author=other.pk)['results']
+            self.assertEqual(sum(row['count'] for row in results), 1)
+
+    def test_vectorised_fill_matches_ordinals(self):
+        rows = {
+            'hour': [(datetime(2026, 3, 29, 1), 4), (datetime(2026, 3, 29, 5), 1)],
+            'day': [(date(2024, 2, 29), 2), (date(2024, 3, 2), 7)],
+            'week': [(date(2026, 1, 5), 3), (date(2026, 1, 19), 2), (date(2025, 1, 6), 9)],
+            'month': [(date(2025, 12, 1), 5), (date(2026, 2, 1), 6)],
+        }
+        for granularity, buckets in rows.items():
+            first = timeseries._ordinal(granularity, buckets[0][0])
+            expected = [0] * 8
+            for bucket, count in buckets:
+                position = timeseries._ordinal(granularity, bucket) - first
+                if 0 <= position < 8:
+                    expected[position] = count
+            self.assertEqual(timeseries.fill(granularity, first, 8, buckets), expected, granularity)
+        first = timeseries._ordinal('week', date(2026, 1, 5))
+        self.assertEqual(timeseries.fill('week', first, 4, rows['week']), [3, 0, 2, 0])
+        self.assertEqual(timeseries.fill('day', 0, 3, []), [0, 0, 0])
+
+    def test_range_is_capped(self):
+        self.assertEqual(self.client.get(self.url, {'granularity': 'hour', 'periods': 745}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'granularity': 'month', 'periods': 240}).status_code, 200)
+        for params in ({'granularity': 'year'}, {'periods': 'all'}, {'tz': 'Mars/Olympus'}, {'author': 'me'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('error', response.json())
+        for url in (reverse('notes-per-day'), reverse('async-notes-per-day')):
+            self.assertEqual(self.client.get(url, {'days': 100000}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        now = timezone.now()
+        self.notes = [
+            Note.objects.create(title=f'Note {i}', content='x' * 500, author=self.user)
+            for i in range(5)
+        ]
+        for i, note in enumerate(self.notes):
+            Note.objects.filter(pk=note.pk).update(created_at=now - timedelta(minutes=i))
+        self.list_url = reverse('async-note-list')
+
+    def as_admin(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.admin).access_token}')
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer garbage')
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_matches_sync_endpoint(self):
+        sync_results = self.client.get(reverse('note-list')).json()['results']
+        async_results = self.client.get(self.list_url).json()['results']
+        self.assertEqual(async_results, sync_results)
+
+    def test_list_pages(self):
+        first = self.client.get(self.list_url, {'page_size': 2}).json()
+        self.assertEqual([n['title'] for n in first['results']], ['Note 0', 'Note 1'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([n['title'] for n in second['results']], ['Note 2', 'Note 3'])
+        self.assertEqual(self.client.get(self.list_url, {'cursor': 'garbage'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_pages_through_one_batch(self):
+        # A batch lands within one millisecond; cursors must tell its notes apart.
+        batch = Note.objects.bulk_create(
+            Note(title=f'Batch {i}', content='Body', author=self.user) for i in range(7)
+        )
+        now = (timezone.now() + timedelta(seconds=1)).replace(microsecond=500)
+        for i, note in enumerate(batch):
+            note.created_at = now + timedelta(microseconds=i)
+        Note.objects.bulk_update(batch, ['created_at'])
+        expected = [note.pk for note in reversed(batch)] + [note.pk for note in self.notes]
+        seen, pages = [], []
+        url = f'{self.list_url}?page_size=2'
+        while url:
+            response = self.client.get(url).json()
+            pages.append([note['id'] for note in response['results']])
+            seen.extend(pages[-1])
+            url = response['next']
+        self.assertEqual(seen, expected)
+        back = self.client.get(self.client.get(self.list_url, {'page_size': 2}).json()['next']).json()
+        self.assertEqual([note['id'] for note in self.client.get(back['previous']).json()['results']], pages[0])
+
+    def test_create_update_delete(self):
+        response = self.client.post(self.list_url, {'title': 'New', 'content': 'Body'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        note_id = response.json()['id']
+        self.assertEqual(AuthorNoteStats.objects.get(author=self.user).note_count, 6)
+
+        detail_url = reverse('async-note-detail', args=[note_id])
+        response = self.client.patch(detail_url, {'title': 'Renamed'}, format='json')
+        self.assertEqual(response.json()['title'], 'Renamed')
+        self.assertEqual(self.client.get(detail_url).json()['content'], 'Body')
+
+        self.assertEqual(self.client.delete(detail_url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Note.objects.filter(pk=note_id).exists())
+        self.assertEqual(AuthorNoteStats.objects.get(author=self.user).note_count, 5)
+
+    def test_create_validates(self):
+        response = self.client.post(self.list_url, {'content': 'No title'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', response.json())
+
+    def test_other_users_notes_are_hidden(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        note = Note.objects.create(title='Private', content='Secret', author=other)
+        response = self.client.get(reverse('async-note-detail', args=[note.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_dashboard_requires_staff(self):
+        self.assertEqual(self.client.get(reverse('async-dashboard-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_dashboard_matches_sync_endpoints(self):
+        self.as_admin()
+        for name, params in [
+            ('dashboard-stats', {}),
+            ('user-stats', {}),
+            ('user-stats', {'limit': 1}),
+            ('notes-per-day', {'days': 7}),
+            ('notes-per-user', {}),
+        ]:
+            with self.subTest(name=name, params=params):
+                sync_response = self.client.get(reverse(name), params)
+                async_response = self.client.get(reverse(f'async-{name}'), params)
+                self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+                self.assertEqual(async_response.json(), sync_response.json())
+        response = self.client.get(reverse('async-user-stats'), {'sort': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_conditional_requests_match_sync_endpoints(self):
+        note = self.notes[0]
+        for sync_url, async_url in [
+            (reverse('note-list'), self.list_url),
+            (reverse('note-detail', args=[note.pk]), reverse('async-note-detail', args=[note.pk])),
+        ]:
+            with self.subTest(url=async_url):
+                response = self.client.get(async_url)
+                etag = response['ETag']
+                self.assertEqual(etag, self.client.get(sync_url)['ETag'])
+                self.assertEqual(response['Last-Modified'], self.client.get(sync_url)['Last-Modified'])
+                response = self.client.get(async_url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response.content, b'')
+
+    def test_missing_and_foreign_notes_are_404(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        foreign = Note.objects.create(title='Private', content='Secret', author=other)
+        for pk in (99999, foreign.pk):
+            with self.subTest(pk=pk):
+                response = self.client.get(reverse('async-note-detail', args=[pk]), HTTP_IF_NONE_MATCH='*')
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes_to_sibling_notes_keep_the_etag(self):
+        detail_url = reverse('async-note-detail', args=[self.notes[0].pk])
+        etag = self.client.get(detail_url)['ETag']
+        self.client.patch(reverse('async-note-detail', args=[self.notes[1].pk]), {'title': 'Changed'}, format='json')
+        response = self.client.patch(detail_url, {'title': 'Mine'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_writes_check_if_match(self):
+        detail_url = reverse('async-note-detail', args=[self.notes[0].pk])
+        etag = self.client.get(detail_url)['ETag']
+        response = self.client.patch(detail_url, {'title': 'First'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        # The ETag the write was based on is now outdated.
+        response = self.client.patch(detail_url, {'title': 'Second'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertIn('error', response.json())
+        self.assertEqual(self.client.delete(detail_url, HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertEqual(Note.objects.get(pk=self.notes[0].pk).title, 'First')
+
+    def test_dashboard_responses_are_cached(self):
+        self.as_admin()
+        cache.clear()
+        url = reverse('async-dashboard-stats')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(captured), 0)
+        self.assertEqual(response.json(), self.client.get(reverse('dashboard-stats')).json())
+        Note.objects.create(title='New', content='Body', author=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['total_notes'], 6)
+
+class UserCacheTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.notes_url = reverse('note-list')
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q for q in ctx.captured_queries if 'FROM "auth_user"' in q['sql']]
+
+    def test_repeat_requests_skip_user_lookup(self):
+        response, queries = self.auth_queries(self.notes_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        response, queries = self.auth_queries(self.notes_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+        self.assertEqual(response.data['results'], [])
+
+    def test_deactivation_takes_effect_immediately(self):
+        self.client.get(self.notes_url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.notes_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_reloads_user(self):
+        self.client.get(self.notes_url)
+        self.user.set_password('newpass456')
+        self.user.save()
+        _, queries = self.auth_queries(self.notes_url)
+        self.assertEqual(len(queries), 1)
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get(self.notes_url)
+        self.user.delete()
+        self.assertEqual(self.client.get(self.notes_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_entries_expire(self):
+        self.client.get(self.notes_url)
+        with mock.patch('api.user_cache.time.monotonic', return_value=time.monotonic() + 3600):
+            _, queries = self.auth_queries(self.notes_url)
+        self.assertEqual(len(queries), 1)
+
+    def test_size_is_bounded(self):
+        others = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(3)]
+        with self.settings(USER_CACHE={'MAX_SIZE': 2}):
+            for other in others:
+                user_cache.get_user(other.id)
+            stats = user_cache.get_stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['eviction'], 1)
+
+    def test_shared_cache(self):
+        self.addCleanup(cache.clear)
+        with self.settings(USER_CACHE={'SHARED_ALIAS': 'default'}):
+            user_cache.get_user(self.user.id)
+            user_cache.clear()  # a fresh process
+            with self.assertNumQueries(0):
+                user = user_cache.get_user(self.user.id)
+            self.assertEqual(user.username, 'testuser')
+            self.assertEqual(user_cache.get_stats()['shared_hit'], 1)
+
+    def test_stats_endpoint_counts_saved_queries(self):
+        admin = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+        self.client.get(self.notes_url)
+        response = self.client.get(reverse('auth-cache-stats'))
+        self.assertEqual(response.data['miss'], 1)
+        self.assertEqual(response.data['hit'], 1)
+        self.assertEqual(response.data['queries_saved'], 1)
+
+class TokenBlacklistTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        self.refresh_url = reverse('refresh')
+        blacklist.rebuild()
+
+    def refresh_token(self, token):
+        return self.client.post(self.refresh_url, {'refresh': str(token)})
+
+    def blacklist_queries(self, token):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.refresh_token(token)
+        return response, [q for q in ctx.captured_queries if 'token_blacklist_blacklistedtoken' in q['sql']]
+
+    def test_refresh_skips_blacklist_table(self):
+        response, queries = self.blacklist_queries(self.refresh)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+    def test_logout_blacklists_refresh_token(self):
+        self.client.post(reverse('user-logout'), {'refresh_token': str(self.refresh)})
+        response, queries = self.blacklist_queries(self.refresh)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(queries, [])
+
+    def test_picks_up_other_processes_after_generation_bump(self):
+        outstanding = OutstandingToken.objects.get(jti=self.refresh['jti'])
+        # bulk_create skips signals, like a write made by another process.
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=outstanding)])
+        self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_200_OK)
+        blacklist.bump_generation()
+        self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rows_committed_out_of_order_are_found(self):
+        tokens = [RefreshToken.for_user(self.user) for _ in range(3)]
+        outstanding = {t.jti: t for t in OutstandingToken.objects.filter(jti__in=[t['jti'] for t in tokens])}
+        base = (BlacklistedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 10
+        BlacklistedToken.objects.bulk_create([
+            BlacklistedToken(id=base, token=outstanding[tokens[0]['jti']]),
+            BlacklistedToken(id=base + 2, token=outstanding[tokens[2]['jti']]),
+        ])
+        blacklist.bump_generation()
+        self.assertTrue(blacklist.is_blacklisted(tokens[2]['jti']))
+        # id base + 1 was allocated earlier but committed later.
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(id=base + 1, token=outstanding[tokens[1]['jti']])])
+        blacklist.bump_generation()
+        self.assertTrue(blacklist.is_blacklisted(tokens[1]['jti']))
+
+    def test_prune_tokens_command(self):
+        expired = timezone.now() - timedelta(days=1)
+        tokens = OutstandingToken.objects.bulk_create([
+            OutstandingToken(user=self.user, jti=f'expired-{i}', token='x', expires_at=expired)
+            for i in range(5)
+        ])
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens[:3]])
+        out = StringIO()
+        call_command('prune_tokens', batch_size=2, stdout=out)
+        self.assertIn('Deleted 5 expired outstanding and 3 blacklisted tokens', out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [self.refresh['jti']])
+        self.assertEqual(self.refresh_token(self.refresh).status_code, status.HTTP_200_OK)
+
+class PopulateDbTests(TestCase):
+    def populate(self, **options):
+        out = StringIO()
+        call_command('populate_db', users=5, notes_min=1, notes_max=3, seed=7, batch_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_loads_users_notes_and_rollups(self):
+        output = self.populate(workers=1)
+        self.assertIn('rows/s', output)
+        users = User.objects.filter(username__contains='.7-')
+        self.assertEqual(users.count(), 5)
+        self.assertTrue(users.first().check_password('password123'))
+        self.assertEqual(Note.objects.filter(author__in=users).count(), sum(
+            AuthorNoteStats.objects.filter(author__in=users).values_list('note_count', flat=True)
+        ))
+        for user in users.annotate(count=Count('notes')):
+            self.assertTrue(1 <= user.count <= 3)
+
+    def test_same_seed_resumes_and_is_reproducible(self):
+        self.populate(workers=1)
+        notes = list(Note.objects.values_list('author__username', 'title', 'content'))
+        User.objects.filter(username__endswith='.7-4').delete()  # an interrupted last chunk
+        output = self.populate(workers=1)
+        self.assertIn('loading 1 of 3 chunks', output)
+        self.assertEqual(User.objects.filter(username__contains='.7-').count(), 5)
+        self.assertEqual(sorted(Note.objects.values_list('author__username', 'title', 'content')), sorted(notes))
+
+    def test_worker_pool_matches_in_process_generation(self):
+        self.populate(workers=2)
+        pooled = sorted(Note.objects.values_list('author__username', 'title', 'content'))
+        call_command('populate_db', fresh=True, stdout=StringIO(), users=0)
+        self.populate(workers=1)
+        self.assertEqual(sorted(Note.objects.values_list('author__username', 'title', 'content')), pooled)
+
+class BenchmarkTests(TestCase):
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(benchmarks.uncovered_routes(), [])
+
+    def test_query_budgets_do_not_grow_with_data(self):
+        for notes in (200, 600):
+            context = benchmarks.BenchmarkContext(notes, stdout=StringIO())
+            for scenario in benchmarks.SCENARIOS:
+                throttling.reset()
+                context.request(scenario)()  # warm the auth and blacklist caches
+                send = context.request(scenario)
+                dashboard_cache.bump_generation()
+                with self.subTest(notes=notes, scenario=scenario.name), self.assertNumQueries(scenario.budget):
+                    response = send()
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    self.assertEqual(response.status_code, scenario.expected_status)
+
+    def test_command_writes_comparable_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            options = dict(sizes='100', iterations=2, warmup=0, in_place=True,
+                           scenario=['note-list', 'dashboard-stats'], stdout=StringIO())
+            call_command('benchmark_api', output=path, **options)
+            with open(path) as f:
+                results = json.load(f)
+            self.assertEqual(set(results['sizes']['100']), {'note-list', 'dashboard-stats'})
+            self.assertEqual(
+                set(results['sizes']['100']['note-list']),
+                {'p50_ms', 'p95_ms', 'p99_ms', 'queries', 'rows_read', 'status'},
+            )
+            out = StringIO()
+            call_command('benchmark_api', compare=path, **{**options, 'stdout': out})
+            self.assertIn('note-list', out.getvalue())
+
+
+class NoteSyncTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.notes = [
+            Note.objects.create(title=f'Note {i}', content='Body', author=self.user)
+            for i in range(3)
+        ]
+        Note.objects.create(title='Not mine', content='Body', author=self.other)
+        self.url = reverse('note-changes')
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def sync_all(self, since=None):
+        """Follow ``next`` links; return (note ids, deleted ids, final token, pages)."""
+        ids, deleted, pages = [], [], 0
+        data = self.sync(since, page_size=2)
+        while True:
+            pages += 1
+            ids += [note['id'] for note in data['results']]
+            deleted += data['deleted']
+            if data['next'] is None:
+                return ids, deleted, data['sync_token'], pages
+            data = self.client.get(data['next']).json()
+
+    def test_full_sync_returns_every_note_once(self):
+        ids, deleted, _, pages = self.sync_all()
+        self.assertEqual(sorted(ids), sorted(note.pk for note in self.notes))
+        self.assertEqual(deleted, [])
+        self.assertEqual(pages, 2)
+        note = self.sync()['results'][0]
+        self.assertEqual(set(note), {'id', 'title', 'content', 'created_at', 'updated_at', 'author'})
+
+    def test_returns_only_changes_since_token(self):
+        token = self.sync()['sync_token']
+        self.assertEqual(self.sync(token)['results'], [])
+
+        self.notes[0].title = 'Edited'
+        self.notes[0].save()
+        created = Note.objects.create(title='New', content='Body', author=self.user)
+        deleted_id = self.notes[1].pk
+        self.notes[1].delete()
+        Note.objects.create(title='Still not mine', content='Body', author=self.other)
+
+        data = self.sync(token)
+        self.assertEqual([note['id'] for note in data['results']], [self.notes[0].pk, created.pk])
+        self.assertEqual(data['results'][0]['title'], 'Edited')
+        self.assertEqual(data['deleted'], [deleted_id])
+        self.assertIsNone(data['next'])
+        self.assertEqual(self.sync(data['sync_token']), {
+            'results': [], 'deleted': [], 'sync_token': data['sync_token'], 'next': None,
+        })
+
+    def test_pages_through_changes(self):
+        token = self.sync()['sync_token']
+        deleted_ids = [note.pk for note in self.notes]
+        for note in self.notes:
+            note.delete()
+        changed = [Note.objects.create(title=f'New {i}', content='Body', author=self.user).pk for i in range(3)]
+        ids, deleted, final, pages = self.sync_all(token)
+        self.assertEqual(ids, changed)
+        self.assertEqual(deleted, deleted_ids)
+        self.assertEqual(pages, 3)
+        self.assertEqual(self.sync(final)['results'], [])
+
+    def test_updated_at_follows_edits(self):
+        note = self.notes[0]
+        Note.objects.filter(pk=note.pk).update(updated_at=note.created_at - timedelta(days=1))
+        response = self.client.patch(reverse('note-detail', args=[note.pk]), {'title': 'Edited'}, format='json')
+        self.assertGreater(parse_datetime(response.json()['updated_at']), note.created_at - timedelta(days=1))
+
+    def test_batch_writes_are_synced(self):
+        token = self.sync()['sync_token']
+        response = self.client.post(reverse('note-batch'), {'operations': [
+            {'op': 'create', 'data': {'title': 'Batch', 'content': 'Body'}},
+            {'op': 'update', 'id': self.notes[0].pk, 'data': {'title': 'Batch update'}},
+            {'op': 'delete', 'id': self.notes[1].pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = self.sync(token)
+        self.assertEqual(
+            {note['title'] for note in data['results']}, {'Batch', 'Batch update'}
+        )
+        self.assertEqual(data['deleted'], [self.notes[1].pk])
+
+    def test_deleting_a_user_leaves_no_tombstones(self):
+        self.other.delete()
+        self.assertFalse(NoteTombstone.objects.exists())
+
+    def test_invalid_and_expired_tokens(self):
+        response = self.client.get(self.url, {'since': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        expired = sync.encode_token(1, None, int(time.time()) - 31 * 24 * 3600)
+        response = self.client.get(self.url, {'since': expired})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_prune_tombstones(self):
+        self.notes[0].delete()
+        NoteTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=40))
+        kept = self.notes[1].pk
+        self.notes[1].delete()
+        self.assertEqual(sync.prune_tombstones(), 1)
+        self.assertEqual(list(NoteTombstone.objects.values_list('note_id', flat=True)), [kept])
+
+
+class NoteCompressionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        paragraph = 'Quarterly planning meeting notes — ünïcödé included. ' * 20
+        self.body = '\n'.join(f'{i}: {paragraph}' for i in range(100)) + ' zebracorn'
+        self.note = Note.objects.create(title='Big', content=self.body, author=self.user)
+
+    def stored(self, note):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT content FROM api_note WHERE id = %s', [note.pk])
+            return cursor.fetchone()[0]
+
+    def test_large_bodies_are_stored_compressed(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Postgres relies on TOAST compression')
+        stored = self.stored(self.note)
+        self.assertIsInstance(stored, bytes)
+        self.assertEqual(stored[0], fields.ZLIB)
+        self.assertLess(len(stored), len(self.body.encode()) / 5)
+        small = Note.objects.create(title='Small', content='Short body', author=self.user)
+        self.assertEqual(self.stored(small), 'Short body')
+
+    def test_values_that_dont_shrink_stay_plain(self):
+        with override_settings(NOTE_COMPRESSION={'THRESHOLD': 1}):
+            self.assertEqual(fields.compress_text('xq'), 'xq')
+            self.assertIsInstance(fields.compress_text('xq' * 100), bytes)
+        self.assertEqual(fields.compress_text('xq' * 100), 'xq' * 100)
+
+    def test_reads_return_text(self):
+        self.assertEqual(Note.objects.get(pk=self.note.pk).content, self.body)
+        self.assertEqual(Note.objects.values_list('content', flat=True).get(pk=self.note.pk), self.body)
+        response = self.client.get(reverse('note-detail', args=[self.note.pk]))
+        self.assertEqual(response.json()['content'], self.body)
+        response = self.client.get(reverse('note-list'), {'view': 'full'})
+        self.assertEqual(response.json()['results'][0]['content'], self.body)
+        rows = list(csv.reader(StringIO(b''.join(
+            self.client.get(reverse('note-export'), {'output': 'csv'}).streaming_content
+        ).decode())))
+        self.assertEqual(rows[1][2], self.body)
+
+    def test_previews_are_cut_from_the_text(self):
+        for url in (reverse('note-list'), reverse('async-note-list')):
+            preview = self.client.get(url).json()['results'][0]['preview']
+            self.assertEqual(preview, self.body[:PREVIEW_LENGTH])
+
+    def test_search_indexes_compressed_text(self):
+        results = self.client.get(reverse('note-search'), {'q': 'zebracorn'}).json()['results']
+        self.assertEqual([r['id'] for r in results], [self.note.pk])
+        self.assertIn('zebracorn', results[0]['snippet'])
+
+        self.note.content = self.body.replace('zebracorn', 'unicornfish')
+        self.note.save()
+        self.assertEqual(self.client.get(reverse('note-search'), {'q': 'zebracorn'}).json()['results'], [])
+        self.assertEqual(len(self.client.get(reverse('note-search'), {'q': 'unicornfish'}).json()['results']), 1)
+        self.note.delete()
+        self.assertEqual(self.client.get(reverse('note-search'), {'q': 'unicornfish'}).json()['results'], [])
+
+    def test_prefix_reads_only_what_it_needs(self):
+        packed = fields.compress_text(self.body)
+        self.assertEqual(fields.text_prefix(packed, 10), self.body[:10])
+        self.assertEqual(fields.text_prefix('plain', 3), 'pla')
+        self.assertIsNone(fields.text_prefix(None, 3))
+        self.assertEqual(fields.decompress_text(memoryview(packed)), self.body)
+
+    def test_zstd(self):
+        if fields.zstandard is None:
+            self.skipTest('zstandard is not installed')
+        with override_settings(NOTE_COMPRESSION={'ALGORITHM': 'zstd', 'THRESHOLD': 1024}):
+            packed = fields.compress_text(self.body)
+        self.assertEqual(packed[0], fields.ZSTD)
+        self.assertEqual(fields.decompress_text(packed), self.body)
+        self.assertEqual(fields.text_prefix(packed, 5), self.body[:5])
+
+
+class ResponseCompressionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        Note.objects.bulk_create([
+            Note(title=f'Note {i}', content='Compressible content. ' * 20, author=self.user)
+            for i in range(20)
+        ])
+
+    def test_negotiation(self):
+        encodings = ['zstd', 'br', 'gzip']
+        self.assertEqual(compression.negotiate('gzip, deflate, br, zstd', encodings), 'zstd')
+        self.assertEqual(compression.negotiate('gzip;q=1.0, br;q=0.8', encodings), 'gzip')
+        self.assertEqual(compression.negotiate('x-gzip', encodings), 'gzip')
+        self.assertEqual(compression.negotiate('*;q=0.5, zstd;q=0', encodings), 'br')
+        self.assertIsNone(compression.negotiate('gzip;q=0, identity', encodings))
+        self.assertIsNone(compression.negotiate('', encodings))
+        self.assertIsNone(compression.negotiate('deflate', encodings))
+        with mock.patch.object(compression, 'brotli', None), mock.patch.object(compression, 'zstandard', None):
+            self.assertEqual(compression.negotiate('br, zstd, gzip;q=0.1'), 'gzip')
+
+    def test_large_json_is_compressed(self):
+        plain = self.client.get(reverse('note-list'), {'view': 'full'})
+        response = self.client.get(reverse('note-list'), {'view': 'full'}, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertLess(len(response.content), len(plain.content) / 4)
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertNotIn('Content-Encoding', plain)
+
+    def test_small_and_excluded_responses_stay_plain(self):
+        response = self.client.get(reverse('health'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        response = self.client.get(reverse('note-export'), {'gzip': 'true'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+
+    def test_streaming_responses(self):
+        plain = b''.join(self.client.get(reverse('note-export')).streaming_content)
+        response = self.client.get(reverse('note-export'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+    async def test_async_streaming_responses(self):
+        async def chunks():
+            for i in range(100):
+                yield f'{{"line": {i}}}\n'.encode()
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = compression.compress_response(
+            request, StreamingHttpResponse(chunks(), content_type='application/x-ndjson')
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = b''.join([chunk async for chunk in response])
+        self.assertEqual(gzip.decompress(body).count(b'\n'), 100)
+
+    def test_weak_etags_still_validate(self):
+        note = Note.objects.filter(author=self.user).first()
+        url = reverse('note-detail', args=[note.pk])
+        with override_settings(RESPONSE_COMPRESSION={'MIN_SIZE': 0}):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.patch(url, {'title': 'Patched'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(url, {'title': 'Again'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_cached_dashboard_responses_are_compressed_once(self):
+        User.objects.bulk_create([User(username=f'user{i}', email=f'user{i}@example.com') for i in range(50)])
+        rollups.rebuild()
+        url = reverse('user-stats')
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            first = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(compress.call_count, 1)
+            self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+            self.assertEqual(second['Content-Encoding'], 'gzip')
+            self.assertEqual(second.content, first.content)
+            self.assertEqual(json.loads(gzip.decompress(second.content)), self.client.get(url).json())
+
+            User.objects.create_user(username='newcomer', password='testpass123')
+            self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(compress.call_count, 2)
+
+    def test_optional_codecs(self):
+        if compression.brotli is None and compression.zstandard is None:
+            self.skipTest('Neither brotli nor zstandard is installed')
+        body = b'{"content": "' + b'abc' * 1000 + b'"}'
+        for encoding, module, decompress in (
+            ('br', compression.brotli, lambda data: compression.brotli.decompress(data)),
+            ('zstd', compression.zstandard,
+             lambda data: compression.zstandard.ZstdDecompressor().decompressobj().decompress(data)),
+        ):
+            if module is None:
+                continue
+            self.assertEqual(decompress(compression.compress(body, encoding)), body)
+
+
+@override_settings(THROTTLE={
+    'USER': {'RATE': 1, 'BURST': 20},
+    'ROUTE': {'RATE': 1, 'BURST': 10},
+    'COSTS': {'dashboard-stats': 5, 'async-dashboard-stats': 5, 'get_token': 10},
+})
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        throttling.reset()
+        self.addCleanup(throttling.reset)
+        self.now = 1000.0
+        patcher = mock.patch.object(throttling._memory, 'clock', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='testuser', password='testpass123', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.note = Note.objects.create(title='Note', content='Content', author=self.user)
+
+    def statuses(self, url, count, **kwargs):
+        return [self.client.get(url, **kwargs).status_code for _ in range(count)]
+
+    def test_route_bucket_limits_one_endpoint(self):
+        url = reverse('note-list')
+        self.assertEqual(self.statuses(url, 10), [200] * 10)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertIn('throttled', response.json()['detail'])
+        # The same client can still use other endpoints.
+        self.assertEqual(self.client.get(reverse('note-detail', args=[self.note.pk])).status_code, 200)
+        self.now += 1
+        self.assertEqual(self.statuses(url, 2), [200, 429])
+
+    def test_user_bucket_spans_routes(self):
+        self.statuses(reverse('note-list'), 10)
+        self.statuses(reverse('note-detail', args=[self.note.pk]), 10)
+        self.assertEqual(self.client.get(reverse('note-search'), {'q': 'x'}).status_code, 429)
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(other).access_token}')
+        self.assertEqual(self.client.get(reverse('note-list')).status_code, 200)
+
+    def test_expensive_routes_cost_more(self):
+        self.assertEqual(self.statuses(reverse('dashboard-stats'), 3), [200, 200, 429])
+        response = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(response['Retry-After'], '5')
+        self.now += 5
+        self.assertEqual(self.statuses(reverse('dashboard-stats'), 2), [200, 429])
+
+    def test_login_is_limited_per_address(self):
+        self.client.credentials()
+        url = reverse('get_token')
+        body = {'username': 'testuser', 'password': 'wrong'}
+        codes = [self.client.post(url, body, REMOTE_ADDR='10.0.0.1').status_code for _ in range(2)]
+        self.assertEqual(codes, [401, 429])
+        self.assertEqual(self.client.post(url, body, REMOTE_ADDR='10.0.0.2').status_code, 401)
+
+    def test_forwarded_addresses_get_separate_buckets(self):
+        self.client.credentials()
+        url = reverse('get_token')
+        body = {'username': 'testuser', 'password': 'wrong'}
+        rest_framework = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+
+        def login(forwarded_for):
+            # REMOTE_ADDR is the proxy, which appends the address it saw.
+            return self.client.post(
+                url, body, REMOTE_ADDR='172.18.0.2', HTTP_X_FORWARDED_FOR=forwarded_for,
+            ).status_code
+
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            self.assertEqual([login('203.0.113.1'), login('203.0.113.1')], [401, 429])
+            self.assertEqual(login('203.0.113.2'), 401)
+            # A forged first hop doesn't move the client to another bucket.
+            self.assertEqual(login('198.51.100.7, 203.0.113.2'), 429)
+
+    def test_async_views(self):
+        codes = self.statuses(reverse('async-dashboard-stats'), 3)
+        self.assertEqual(codes, [200, 200, 429])
+        response = self.client.get(reverse('async-dashboard-stats'))
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertIn('throttled', response.json()['detail'])
+
+    def test_health_and_disabled_throttling(self):
+        self.assertEqual(self.statuses(reverse('health'), 30), [200] * 30)
+        with override_settings(THROTTLE={'ENABLED': False}):
+            self.assertEqual(self.statuses(reverse('dashboard-stats'), 5), [200] * 5)
+
+    def test_rejected_requests_spend_nothing(self):
+        store = throttling.MemoryStore()
+        buckets = [('a', 1, 10), ('b', 1, 2)]
+        self.assertEqual(throttling.take(store, buckets, 2, now=0), 0)
+        self.assertEqual(throttling.take(store, buckets, 1, now=0), 1)
+        self.assertEqual(store.buckets, {'a': 2, 'b': 2})
+        self.assertEqual(throttling.take(store, buckets, 1, now=1), 0)
+
+    def test_shared_cache_store(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with override_settings(THROTTLE={'CACHE_ALIAS': 'default', 'ROUTE': {'RATE': 1, 'BURST': 2}}):
+            self.assertEqual(self.statuses(reverse('note-list'), 3), [200, 200, 429])
+            throttling.reset()  # only clears this process's buckets
+            self.assertEqual(self.client.get(reverse('note-list')).status_code, 429)
+        self.assertEqual(throttling._memory.buckets, {})
+
+
+class PasswordHashingTests(APITestCase):
+    def setUp(self):
+        self.login_url = reverse('get_token')
+        self.register_url = reverse('user-list')
+        self.registration = {
+            'username': 'newuser', 'email': 'New@EXAMPLE.com', 'password': 'testpass123',
+            'confirm_password': 'testpass123',
+        }
+        throttling.reset()
+        self.addCleanup(throttling.reset)
+
+    def fill_pool(self):
+        _, slots = hashing._get_pool()
+        slots.acquire()
+        self.addCleanup(slots.release)
+
+    def test_registration_and_login_hash_in_pool(self):
+        with mock.patch.object(hashing, '_run', wraps=hashing._run) as run:
+            response = self.client.post(self.register_url, self.registration)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            response = self.client.post(self.login_url, {'username': 'newuser', 'password': 'testpass123'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([call.args[0] for call in run.call_args_list], [
+            hashing.hashers.make_password, hashing._verify,
+        ])
+        user = User.objects.get(username='newuser')
+        self.assertEqual(user.email, 'New@example.com')
+        self.assertTrue(user.check_password('testpass123'))
+
+    def test_wrong_password_and_unknown_user(self):
+        User.objects.create_user(username='testuser', password='testpass123')
+        for username, password in (('testuser', 'wrong'), ('nobody', 'testpass123')):
+            response = self.client.post(self.login_url, {'username': username, 'password': password})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(PASSWORD_HASHING={'WORKERS': 1, 'QUEUE': 0})
+    def test_full_pool_sheds_load(self):
+        User.objects.create_user(username='testuser', password='testpass123')
+        self.fill_pool()
+        response = self.client.post(self.login_url, {'username': 'testuser', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        response = self.client.post(self.register_url, self.registration)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(User.objects.filter(username='newuser').exists())
+
+    def test_admin_login(self):
+        User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        url = reverse('admin:login')
+        client = Client()
+        response = client.post(url, {'username': 'admin', 'password': 'testpass123', 'next': '/admin/'})
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        with override_settings(PASSWORD_HASHING={'WORKERS': 1, 'QUEUE': 0}):
+            self.fill_pool()
+            response = Client().post(url, {'username': 'admin', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertIn('detail', response.json())
+
+    def test_outdated_hash_is_upgraded(self):
+        from django.contrib.auth.hashers import PBKDF2PasswordHasher
+        old = PBKDF2PasswordHasher().encode('testpass123', 'somesalt', iterations=1000)
+        user = User.objects.create(username='testuser', password=old)
+        response = self.client.post(self.login_url, {'username': 'testuser', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertNotEqual(user.password, old)
+        self.assertTrue(user.check_password('testpass123'))
+        self.assertEqual(hashing.verify_password('testpass123', user.password), (True, False))
+
+    @override_settings(PASSWORD_HASHING={'WORKERS': 0})
+    def test_inline_hashing(self):
+        with mock.patch.object(hashing, '_get_pool') as get_pool:
+            response = self.client.post(self.register_url, self.registration)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            response = self.client.post(self.login_url, {'username': 'newuser', 'password': 'testpass123'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        get_pool.assert_not_called()
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        for i in range(3):
+            Note.objects.create(title=f'Note {i}', content='Body', author=self.user)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def sample(self, text, name, **labels):
+        label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+        match = re.search(rf'^{re.escape(name)}\{{{re.escape(label_text)}\}} (\S+)$', text, re.M)
+        self.assertIsNotNone(match, f'{name}{{{label_text}}} not exported')
+        return float(match.group(1))
+
+    def test_records_requests_per_route(self):
+        queries = 0
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse('note-list'))
+            queries += len(captured)
+        self.client.get('/api/no-such-route/')
+        text = self.scrape()
+
+        labels = {'view': 'note-list', 'method': 'GET'}
+        self.assertEqual(self.sample(text, 'http_requests_total', **labels, status=200), 2)
+        self.assertEqual(self.sample(text, 'http_request_duration_seconds_count', **labels), 2)
+        self.assertEqual(self.sample(text, 'http_request_duration_seconds_bucket', **labels, le='+Inf'), 2)
+        self.assertEqual(self.sample(text, 'http_request_db_queries_sum', **labels), queries)
+        self.assertEqual(self.sample(text, 'http_response_size_bytes_sum', **labels), 2 * len(response.content))
+        self.assertEqual(self.sample(text, 'http_requests_total', view='unmatched', method='GET', status=404), 1)
+
+    def test_unknown_methods_share_one_series(self):
+        for i in range(5):
+            self.client.generic(f'FOO{i}', reverse('note-list'))
+        text = self.scrape()
+        self.assertEqual(self.sample(text, 'http_requests_total', view='note-list', method='other', status=405), 5)
+        self.assertNotIn('FOO', text)
+
+    def test_counts_queries_of_async_views(self):
+        self.client.get(reverse('async-note-list'))  # caches the user
+        metrics.reset()
+        self.client.get(reverse('async-note-list'))
+        text = self.scrape()
+        # The note version for the ETag, then the page.
+        self.assertEqual(self.sample(text, 'http_request_db_queries_sum', view='async-note-list', method='GET'), 2)
+
+    def test_queries_outside_requests_are_not_recorded(self):
+        User.objects.count()
+        self.assertNotIn('http_request_db_queries_sum', self.scrape())
+
+    @override_settings(METRICS={'TOKEN': 's3cret'})
+    def test_token_is_required_when_configured(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+
+    def test_health(self):
+        self.client.credentials()
+        response = self.client.get(reverse('health'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_health_reports_database_failure(self):
+        with mock.patch('api.views.connection.cursor', side_effect=OperationalError('database is down')):
+            response = self.client.get(reverse('health'))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json()['status'], 'unavailable')
+
+
+class DatabaseSettingsTests(TestCase):
+    def test_sqlite_pragmas_are_applied_to_new_connections(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with tempfile.TemporaryDirectory() as tmp:
+            wrapper = connection.copy()
+            wrapper.settings_dict = {**wrapper.settings_dict, 'NAME': os.path.join(tmp, 'pragmas.sqlite3')}
+            try:
+                with override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'synchronous': 'NORMAL'}):
+                    with wrapper.cursor() as cursor:
+                        cursor.execute('PRAGMA journal_mode')
+                        self.assertEqual(cursor.fetchone()[0], 'wal')
+                        cursor.execute('PRAGMA synchronous')
+                        self.assertEqual(cursor.fetchone()[0], 1)
+            finally:
+                wrapper.close()
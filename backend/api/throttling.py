@@ -0,0 +1,167 @@
+"""
+Token bucket request throttling.
+
+Every request spends tokens from two buckets: one per client (the user, or
+the IP address for anonymous requests) and one per client and route (URL
+name). Behind a reverse proxy, the address comes from X-Forwarded-For as
+DRF's ``NUM_PROXIES`` setting says; otherwise every anonymous client would
+share the proxy's buckets. Each bucket refills at ``RATE`` tokens per second and holds at most
+``BURST`` tokens. Requests to expensive routes cost more, per ``COSTS``, so
+a client polling the dashboard aggregates or ``/api/token/`` runs dry long
+before one reading notes. A request needs enough tokens in both buckets.
+Otherwise the client gets a 429 with ``Retry-After`` set to the time until
+it would have them.
+
+A bucket is stored as one number: the time at which it will be full again
+(the "theoretical arrival time" of GCRA, which is equivalent to a token
+bucket). Checking a request is two reads and, when it is allowed, two
+writes, without locks. Two concurrent requests from the same client can
+both read the old value, so a client can occasionally get one request more
+than its limit.
+
+Buckets live in this process unless ``CACHE_ALIAS`` names a Django cache.
+A shared cache such as Redis makes the limits hold across workers, at the
+cost of a round trip per request.
+
+``TokenBucketThrottle`` plugs this into DRF through
+``DEFAULT_THROTTLE_CLASSES``. ``api.async_views`` calls ``acheck``.
+"""
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+# An idle in-process bucket is dropped once there are more than this many.
+MAX_BUCKETS = 100_000
+
+
+def _setting(name, default):
+    return getattr(settings, "THROTTLE", {}).get(name, default)
+
+
+class MemoryStore:
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self.buckets = {}
+
+    def get_many(self, keys):
+        buckets = self.buckets
+        return [buckets.get(key) for key in keys]
+
+    def set_many(self, values, timeout):
+        self.buckets.update(values)
+        if len(self.buckets) > MAX_BUCKETS:
+            self.prune()
+
+    def prune(self):
+        # Full buckets (refilled before now) behave exactly like missing ones.
+        now = self.clock()
+        for key, full_at in list(self.buckets.items()):
+            if full_at <= now:
+                self.buckets.pop(key, None)
+
+    def clear(self):
+        self.buckets.clear()
+
+
+class CacheStore:
+    # Shared between processes, so wall-clock rather than monotonic time.
+    clock = staticmethod(time.time)
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def get_many(self, keys):
+        found = self.cache.get_many(keys)
+        return [found.get(key) for key in keys]
+
+    def set_many(self, values, timeout):
+        self.cache.set_many(values, timeout=timeout)
+
+    def clear(self):
+        pass  # entries expire once their bucket is full again
+
+
+_memory = MemoryStore()
+
+
+def get_store(alias=None):
+    return _memory if alias is None else CacheStore(alias)
+
+
+def reset():
+    """Refill every in-process bucket."""
+    _memory.clear()
+
+
+def client_key(request, user):
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{BaseThrottle().get_ident(request)}"
+
+
+def route_name(request):
+    match = request.resolver_match
+    return match.url_name if match is not None else ""
+
+
+def take(store, keys_and_limits, cost, now):
+    """
+    Spend ``cost`` from every ``(key, rate, burst)`` bucket if all have it.
+
+    Returns 0 when the request is allowed, otherwise the seconds until it
+    would be (and spends nothing).
+    """
+    keys = [key for key, _, _ in keys_and_limits]
+    full_at = store.get_many(keys)
+    updates = {}
+    wait = 0.0
+    longest = 0.0
+    for (key, rate, burst), current in zip(keys_and_limits, full_at):
+        interval = 1.0 / rate
+        after = max(current or now, now) + cost * interval
+        # Allowed while the bucket still holds ``cost`` tokens, i.e. while
+        # it would be full again within ``burst`` tokens' worth of time.
+        wait = max(wait, after - burst * interval - now)
+        updates[key] = after
+        longest = max(longest, after - now)
+    if wait > 0:
+        return wait
+    store.set_many(updates, timeout=math.ceil(longest) + 1)
+    return 0.0
+
+
+def check(request, user):
+    """0 if ``request`` from ``user`` may proceed, else the seconds to wait."""
+    # Read once: this runs on every request.
+    config = getattr(settings, "THROTTLE", {})
+    if not config.get("ENABLED", True):
+        return 0.0
+    route = route_name(request)
+    client = client_key(request, user)
+    user_limit = config.get("USER", {})
+    route_limit = config.get("ROUTE", {})
+    store = get_store(config.get("CACHE_ALIAS"))
+    return take(store, [
+        (f"throttle:{client}", user_limit.get("RATE", 20), user_limit.get("BURST", 200)),
+        (f"throttle:{client}:{route}", route_limit.get("RATE", 10), route_limit.get("BURST", 100)),
+    ], config.get("COSTS", {}).get(route, 1), store.clock())
+
+
+async def acheck(request, user):
+    if _setting("CACHE_ALIAS", None) is None:
+        return check(request, user)  # in-process: nothing to wait for
+    return await sync_to_async(check)(request, user)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        self.delay = check(request, request.user)
+        return self.delay == 0
+
+    def wait(self):
+        return self.delay
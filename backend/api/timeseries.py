@@ -0,0 +1,156 @@
+"""
+Dense, time-bucketed note activity for the admin dashboard.
+
+Notes are counted per hour, day, week (starting Monday) or month in a
+requested timezone, over the last ``periods`` buckets up to the current
+one. SQL returns counts only for buckets that have notes. ``fill`` turns
+them into one count per bucket, with zeros for the gaps, in one vectorised NumPy
+pass.
+
+Day, week and month series in the default timezone are read from the
+``DailyNoteCount`` rollup, whose days are in that timezone. Hourly series
+and other timezones count ``Note`` rows over the ``created_at`` index.
+Either way the scanned range is bounded by ``MAX_PERIODS`` for the
+granularity.
+"""
+import zoneinfo
+from datetime import date, datetime, timedelta
+
+import numpy
+from django.db.models import Count, DateField, DateTimeField, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import DailyNoteCount, Note
+
+DEFAULT_PERIODS = {"hour": 24, "day": 30, "week": 12, "month": 12}
+MAX_PERIODS = {"hour": 24 * 31, "day": 366 * 2, "week": 52 * 10, "month": 12 * 20}
+GRANULARITIES = tuple(DEFAULT_PERIODS)
+
+
+def parse_params(params):
+    """
+    Validate series query parameters.
+
+    Returns ``(granularity, periods, tz, author_id)``; ``author_id`` is
+    ``None`` for all authors. Raises ``ValueError`` with a client-facing
+    message on bad input.
+    """
+    granularity = params.get("granularity", "day")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    periods = DEFAULT_PERIODS[granularity]
+    if "periods" in params:
+        try:
+            periods = int(params["periods"])
+        except ValueError:
+            periods = 0
+        if not 0 < periods <= MAX_PERIODS[granularity]:
+            raise ValueError(f"periods must be between 1 and {MAX_PERIODS[granularity]} for {granularity}")
+    try:
+        tz = zoneinfo.ZoneInfo(params.get("tz", timezone.get_default_timezone_name()))
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValueError("tz must be an IANA timezone name")
+    author_id = None
+    if "author" in params:
+        try:
+            author_id = int(params["author"])
+        except ValueError:
+            raise ValueError("author must be a user id")
+    return granularity, periods, tz, author_id
+
+
+EPOCH = date(1970, 1, 1)
+# 1970-01-01 is a Thursday; shifting by three days starts weeks on Monday
+# like TruncWeek.
+WEEK_SHIFT = 3
+
+
+def _ordinal(granularity, bucket):
+    """A bucket's position on a line of consecutive buckets counted from 1970."""
+    if granularity == "hour":
+        return (bucket - datetime(1970, 1, 1)) // timedelta(hours=1)
+    if granularity == "month":
+        return (bucket.year - 1970) * 12 + bucket.month - 1
+    days = (bucket - EPOCH).days
+    return (days + WEEK_SHIFT) // 7 if granularity == "week" else days
+
+
+def _ordinals(granularity, buckets):
+    """``_ordinal`` for a sequence of buckets, as a NumPy array."""
+    if granularity == "hour":
+        return numpy.array(buckets, dtype="datetime64[h]").astype(numpy.int64)
+    days = numpy.array(buckets, dtype="datetime64[D]")
+    if granularity == "month":
+        return days.astype("datetime64[M]").astype(numpy.int64)
+    days = days.astype(numpy.int64)
+    return (days + WEEK_SHIFT) // 7 if granularity == "week" else days
+
+
+def _bucket(granularity, ordinal):
+    if granularity == "hour":
+        return datetime(1970, 1, 1) + timedelta(hours=ordinal)
+    if granularity == "month":
+        return date(1970 + ordinal // 12, ordinal % 12 + 1, 1)
+    return EPOCH + timedelta(days=ordinal * 7 - WEEK_SHIFT if granularity == "week" else ordinal)
+
+
+def current_ordinal(granularity, tz, now=None):
+    local = timezone.localtime(now or timezone.now(), tz).replace(tzinfo=None)
+    return _ordinal(granularity, local if granularity == "hour" else local.date())
+
+
+def counts(granularity, tz, first, author_id=None):
+    """
+    ``(bucket, count)`` rows for buckets from ordinal ``first`` on that have notes.
+
+    Buckets are naive local datetimes for hours and dates otherwise.
+    """
+    start = _bucket(granularity, first)
+    if granularity != "hour" and tz.key == timezone.get_default_timezone_name():
+        rows = DailyNoteCount.objects.filter(date__gte=start)
+        if author_id is not None:
+            rows = rows.filter(author_id=author_id)
+        rows = rows.values(bucket=Trunc("date", granularity, output_field=DateField())).annotate(
+            count=Sum("count")
+        )
+        return [(row["bucket"], row["count"]) for row in rows.order_by()]
+
+    if granularity == "hour":
+        since = timezone.make_aware(start, tz)
+        bucket = Trunc("created_at", "hour", output_field=DateTimeField(), tzinfo=tz)
+    else:
+        since = timezone.make_aware(datetime.combine(start, datetime.min.time()), tz)
+        bucket = Trunc("created_at", granularity, output_field=DateField(), tzinfo=tz)
+    rows = Note.objects.filter(created_at__gte=since)
+    if author_id is not None:
+        rows = rows.filter(author_id=author_id)
+    rows = rows.values(bucket=bucket).annotate(count=Count("id")).order_by()
+    if granularity == "hour":
+        return [(row["bucket"].astimezone(tz).replace(tzinfo=None), row["count"]) for row in rows]
+    return [(row["bucket"], row["count"]) for row in rows]
+
+
+def fill(granularity, first, periods, rows):
+    """One count per bucket from ordinal ``first``, zero where ``rows`` has none."""
+    dense = numpy.zeros(periods, dtype=numpy.int64)
+    if rows:
+        buckets, values = zip(*rows)
+        positions = _ordinals(granularity, buckets) - first
+        values = numpy.array(values, dtype=numpy.int64)
+        inside = (positions >= 0) & (positions < periods)
+        dense[positions[inside]] = values[inside]
+    return dense.tolist()
+
+
+def series(granularity, periods, tz, author_id=None, now=None):
+    """The dense series as ``[{"bucket": ..., "count": ...}]``, oldest bucket first."""
+    first = current_ordinal(granularity, tz, now) - periods + 1
+    dense = fill(granularity, first, periods, counts(granularity, tz, first, author_id))
+    results = []
+    for offset, count in enumerate(dense):
+        bucket = _bucket(granularity, first + offset)
+        if granularity == "hour":
+            bucket = timezone.make_aware(bucket, tz)
+        results.append({"bucket": bucket.isoformat(), "count": count})
+    return results
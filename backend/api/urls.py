@@ -1,6 +1,6 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'notes', views.NoteViewSet, basename='note')
@@ -9,5 +9,17 @@ urlpatterns = router.urls + [
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
     path('dashboard/users/', views.user_stats, name='user-stats'),
     path('dashboard/notes-per-day/', views.notes_per_day, name='notes-per-day'),
+    path('dashboard/notes-series/', views.notes_series, name='notes-series'),
     path('dashboard/notes-per-user/', views.notes_per_user, name='notes-per-user'),
-]
\ No newline at end of file
+    path('dashboard/snapshot/', views.dashboard_snapshot, name='dashboard-snapshot'),
+    path('dashboard/cache-stats/', views.dashboard_cache_stats, name='dashboard-cache-stats'),
+    path('dashboard/auth-cache-stats/', views.auth_cache_stats, name='auth-cache-stats'),
+    path('health/', views.health, name='health'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('async/notes/', async_views.note_list, name='async-note-list'),
+    path('async/notes/<int:pk>/', async_views.note_detail, name='async-note-detail'),
+    path('async/dashboard/stats/', async_views.dashboard_stats, name='async-dashboard-stats'),
+    path('async/dashboard/users/', async_views.user_stats, name='async-user-stats'),
+    path('async/dashboard/notes-per-day/', async_views.notes_per_day, name='async-notes-per-day'),
+    path('async/dashboard/notes-per-user/', async_views.notes_per_user, name='async-notes-per-user'),
+]
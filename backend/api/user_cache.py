@@ -0,0 +1,161 @@
+"""
+Cache of authenticated users, keyed by the JWT user id claim.
+
+JWT access tokens are validated without touching the database, but turning
+the token's user id into a ``User`` costs a ``SELECT`` on ``auth_user`` per
+request. This module keeps recently seen users in a bounded in-process LRU
+with a short TTL and, optionally, in a Django cache shared between workers.
+
+Every ``User`` save or delete (which covers deactivation and password
+changes) invalidates the entry through ``api.signals``. Other processes'
+in-process entries, and writes that bypass signals such as
+``QuerySet.update()``, are bounded by the TTL.
+
+Counters are per process so that a hit never costs a network round trip.
+"""
+import copy
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+KEY_PREFIX = "auth:user:"
+OUTCOMES = ("hit", "shared_hit", "miss", "invalidation", "eviction")
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_counts = Counter()
+
+
+def _setting(name, default):
+    return getattr(settings, "USER_CACHE", {}).get(name, default)
+
+
+def _shared_cache():
+    alias = _setting("SHARED_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def _key(user_id):
+    return f"{KEY_PREFIX}{user_id}"
+
+
+def _normalize(user_id):
+    # simplejwt stores the claim as a string; saves see the model's value.
+    return str(user_id)
+
+
+def _local_get(user_id):
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is None:
+            return None
+        user, expires = entry
+        if expires <= time.monotonic():
+            del _entries[user_id]
+            return None
+        _entries.move_to_end(user_id)
+        _counts["hit"] += 1
+    # Callers may mutate request.user; never hand out the cached instance.
+    return copy.copy(user)
+
+
+def _local_set(user_id, user):
+    max_size = _setting("MAX_SIZE", 1024)
+    with _lock:
+        _entries[user_id] = (user, time.monotonic() + _setting("TIMEOUT", 30))
+        _entries.move_to_end(user_id)
+        while len(_entries) > max_size:
+            _entries.popitem(last=False)
+            _counts["eviction"] += 1
+
+
+def _remember(user_id, user, outcome):
+    with _lock:
+        _counts[outcome] += 1
+    _local_set(user_id, user)
+    return copy.copy(user)
+
+
+def get_user(user_id):
+    """
+    Return the user whose ``USER_ID_FIELD`` is ``user_id``.
+
+    Raises ``User.DoesNotExist`` like a plain lookup; missing users are not
+    cached.
+    """
+    if not _setting("ENABLED", True):
+        return get_user_model().objects.get(**{jwt_settings.USER_ID_FIELD: user_id})
+    user_id = _normalize(user_id)
+    user = _local_get(user_id)
+    if user is not None:
+        return user
+    shared = _shared_cache()
+    if shared is not None:
+        user = shared.get(_key(user_id))
+        if user is not None:
+            return _remember(user_id, user, "shared_hit")
+    user = get_user_model().objects.get(**{jwt_settings.USER_ID_FIELD: user_id})
+    if shared is not None:
+        shared.set(_key(user_id), user, timeout=_setting("TIMEOUT", 30))
+    return _remember(user_id, user, "miss")
+
+
+async def aget_user(user_id):
+    """Async variant of ``get_user`` for native async views."""
+    if not _setting("ENABLED", True):
+        return await get_user_model().objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    user_id = _normalize(user_id)
+    user = _local_get(user_id)
+    if user is not None:
+        return user
+    shared = _shared_cache()
+    if shared is not None:
+        user = await shared.aget(_key(user_id))
+        if user is not None:
+            return _remember(user_id, user, "shared_hit")
+    user = await get_user_model().objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    if shared is not None:
+        await shared.aset(_key(user_id), user, timeout=_setting("TIMEOUT", 30))
+    return _remember(user_id, user, "miss")
+
+
+def _forget(user_id):
+    with _lock:
+        _entries.pop(user_id, None)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_key(user_id))
+
+
+def invalidate(user):
+    """Drop ``user`` from the cache after it was saved or deleted."""
+    user_id = _normalize(getattr(user, jwt_settings.USER_ID_FIELD))
+    with _lock:
+        _counts["invalidation"] += 1
+    # Drop now, and again after commit in case a concurrent request cached
+    # the pre-commit row in between.
+    _forget(user_id)
+    transaction.on_commit(lambda: _forget(user_id))
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _counts.clear()
+
+
+def get_stats():
+    with _lock:
+        stats = {outcome: _counts[outcome] for outcome in OUTCOMES}
+        stats["size"] = len(_entries)
+    lookups = stats["hit"] + stats["shared_hit"] + stats["miss"]
+    # Every hit is an auth_user SELECT that was not issued.
+    stats["queries_saved"] = stats["hit"] + stats["shared_hit"]
+    stats["hit_rate"] = round(stats["queries_saved"] / lookups, 4) if lookups else None
+    return stats
@@ -1,26 +1,161 @@
 from rest_framework import viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes, throttle_classes
 from django.contrib.auth.models import User
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
-from .serializers import UserSerializer, NoteSerializer, UserStatsSerializer, DailyNotesSerializer, NotesPerUserSerializer
+from .tokens import FilteredRefreshToken
+from .serializers import UserSerializer, NoteSerializer, NoteSummarySerializer, NoteSearchResultSerializer, PREVIEW_LENGTH, UserStatsSerializer, DailyNotesSerializer, NotesPerUserSerializer
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from .models import Note
-from django.db.models import Count, Max, F
-from django.db.models.functions import TruncDate
-from django.utils import timezone
-from datetime import timedelta
+from .models import Note, AuthorNoteStats
+from .pagination import KeysetPagination, NoteCursorPagination, SearchPagination, SyncPagination
+from .search import search_notes
+from .conditional import ConditionalNoteMixin
+from .fast_serializers import FastListMixin, FastReadSerializer
+from .fields import TextPrefix
+from .batch import MAX_OPERATIONS, run_batch
+from .export import FORMATS as EXPORT_FORMATS, export_notes, filter_created, parse_bound
+from .dashboard_cache import cached_response, get_stats as get_cache_stats
+from . import user_cache
+from django.db import DatabaseError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from . import dashboard, metrics, sync, timeseries
 
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(ConditionalNoteMixin, FastListMixin, viewsets.ModelViewSet):
     serializer_class = NoteSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NoteCursorPagination
+
+    # Columns each serializer field needs; ``preview`` is computed in SQL.
+    field_columns = {
+        "id": ["id"],
+        "title": ["title"],
+        "content": ["content"],
+        "preview": [],
+        "created_at": ["created_at"],
+        "updated_at": ["updated_at"],
+        "author": ["author"],
+    }
+
+    def get_serializer_class(self):
+        # Listings send previews; the full body is only loaded on detail
+        # fetches unless the client asks for ?view=full.
+        if self.action == 'list' and self.request.query_params.get('view') != 'full':
+            return NoteSummarySerializer
+        return super().get_serializer_class()
+
+    def get_requested_fields(self):
+        """Return the ``fields=`` sparse fieldset, or ``None`` for all fields."""
+        if self.action not in ('list', 'retrieve'):
+            return None
+        requested = self.request.query_params.get('fields')
+        if not requested:
+            return None
+        fields = [name.strip() for name in requested.split(',') if name.strip()]
+        available = self.get_serializer_class().Meta.fields
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(unknown)}"})
+        return fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_requested_fields()
+        return context
 
     def get_queryset(self):
-        return Note.objects.filter(author=self.request.user)
+        queryset = Note.objects.filter(author=self.request.user)
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+
+        fields = self.get_requested_fields() or self.get_serializer_class().Meta.fields
+        # id and created_at are always loaded: the cursor paginator reads them.
+        columns = {"id", "created_at"}
+        if self.action == 'retrieve':
+            # The note's validators (see api.conditional).
+            columns.update(("sync_version", "updated_at"))
+        for name in fields:
+            columns.update(self.field_columns[name])
+        queryset = queryset.only(*columns)
+        if "preview" in fields:
+            queryset = queryset.annotate(preview=TextPrefix('content', PREVIEW_LENGTH))
+        return queryset
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        # Keep the note and its rollup rows in one transaction.
+        with transaction.atomic():
+            serializer.save(author=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = SearchPagination()
+        limit, offset = paginator.get_window(request)
+        results = search_notes(request.user, query, limit=limit, offset=offset)
+        page = paginator.paginate_results(results)
+        serializer = NoteSearchResultSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({"error": "'operations' must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > MAX_OPERATIONS:
+            return Response({"error": f"At most {MAX_OPERATIONS} operations per batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+        applied, results = run_batch(self.get_queryset(), request.user, operations)
+        return Response({"results": results}, status=status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Notes created, updated or deleted since ``?since=<sync_token>``.
+
+        Without ``since`` every note is returned. Follow ``next`` until it
+        is null, then keep that response's ``sync_token`` for the next sync.
+        """
+        paginator = SyncPagination()
+        page_size = paginator.get_page_size(request)
+        fast = FastReadSerializer(NoteSerializer)
+        try:
+            notes, deleted, token, has_more = sync.changes(
+                request.user, paginator.get_token(request), limit=page_size, values=fast.sources,
+            )
+        except sync.ExpiredToken as e:
+            return Response({"error": str(e)}, status=status.HTTP_410_GONE)
+        except sync.InvalidToken as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "results": fast.serialize(notes),
+            "deleted": deleted,
+            "sync_token": token,
+            "next": paginator.get_next_link(token) if has_more else None,
+        })
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        fmt = request.query_params.get('output', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return Response({"error": f"Unsupported output format: {fmt}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            created_after = parse_bound(request.query_params.get('created_after'))
+            created_before = parse_bound(request.query_params.get('created_before'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get('gzip') == 'true'
+
+        queryset = filter_created(self.get_queryset(), created_after, created_before)
+        filename = f"notes.{fmt}.gz" if compress else f"notes.{fmt}"
+        response = StreamingHttpResponse(
+            export_notes(queryset, fmt, compress=compress),
+            content_type='application/gzip' if compress else EXPORT_FORMATS[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -32,7 +167,7 @@ class UserViewSet(viewsets.ModelViewSet):
     def logout(self, request):
         try:
             refresh_token = request.data["refresh_token"]
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
             return Response({"message": "Successfully logged out"}, status=status.HTTP_200_OK)
         except Exception as e:
@@ -40,10 +175,11 @@ class UserViewSet(viewsets.ModelViewSet):
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cached_response('dashboard-stats')
 def dashboard_stats(request):
     # Get total counts
     total_users = User.objects.count()
-    total_notes = Note.objects.count()
+    total_notes = AuthorNoteStats.objects.aggregate(**dashboard.total_notes_aggregate())['total'] or 0
     
     return Response({
         'total_users': total_users,
@@ -52,40 +188,101 @@ def dashboard_stats(request):
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cached_response('user-stats')
 def user_stats(request):
-    users = User.objects.annotate(
-        total_notes=Count('notes'),
-        last_note_date=Max('notes__created_at')
-    ).order_by('-total_notes')
-    
-    serializer = UserStatsSerializer(users, many=True)
-    return Response(serializer.data)
+    try:
+        field, descending, prefix, limit = dashboard.parse_user_stats_params(request.GET)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    fast = FastReadSerializer(UserStatsSerializer)
+
+    if limit is not None:
+        return Response(fast.serialize(dashboard.top_user_stats_rows(field, descending, prefix, limit)))
+
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(dashboard.user_stats_rows(field, prefix), request, field, descending=descending)
+    return paginator.get_paginated_response(fast.serialize(page))
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cached_response('notes-per-day')
 def notes_per_day(request):
-    days = int(request.GET.get('days', 30))  # Get days from query params, default to 30
-    start_date = timezone.now() - timedelta(days=days)
-    
-    daily_notes = Note.objects.filter(
-        created_at__gte=start_date
-    ).annotate(
-        date=TruncDate('created_at')
-    ).values('date').annotate(
-        count=Count('id')
-    ).order_by('date')
-    
-    serializer = DailyNotesSerializer(daily_notes, many=True)
+    try:
+        days = dashboard.parse_days(request.GET)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = DailyNotesSerializer(dashboard.daily_notes(days), many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@cached_response('notes-series')
+def notes_series(request):
+    try:
+        granularity, periods, tz, author_id = timeseries.parse_params(request.GET)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'granularity': granularity,
+        'timezone': tz.key,
+        'author': author_id,
+        'results': timeseries.series(granularity, periods, tz, author_id),
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@cached_response('notes-per-user')
 def notes_per_user(request):
-    notes_distribution = Note.objects.values(
-        username=F('author__username')
-    ).annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    serializer = NotesPerUserSerializer(notes_distribution, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    serializer = NotesPerUserSerializer(dashboard.notes_distribution(), many=True)
+    return Response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@cached_response('dashboard-snapshot')
+def dashboard_snapshot(request):
+    # Every dashboard panel in one response, so the page loads with one request.
+    try:
+        panels, days, limit = dashboard.parse_snapshot_params(request.GET)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    data = dashboard.snapshot(panels, days, limit)
+    if 'users' in data:
+        data['users'] = FastReadSerializer(UserStatsSerializer).serialize(data['users'])
+    if 'notes_per_day' in data:
+        data['notes_per_day'] = DailyNotesSerializer(data['notes_per_day'], many=True).data
+    if 'notes_per_user' in data:
+        data['notes_per_user'] = NotesPerUserSerializer(data['notes_per_user'], many=True).data
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def dashboard_cache_stats(request):
+    return Response(get_cache_stats())
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def auth_cache_stats(request):
+    return Response(user_cache.get_stats())
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([])
+def health(request):
+    # Deliberately cheap: one round trip proves the database is reachable.
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError as e:
+        return Response({"status": "unavailable", "error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response({"status": "ok"})
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([])
+def metrics_view(request):
+    if not metrics.authorized(request):
+        return Response({"error": "Invalid metrics token"}, status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
@@ -12,7 +12,9 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
+import django
 import os
 
 load_dotenv()
@@ -34,16 +36,25 @@ ALLOWED_HOSTS = ["*"]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.throttling.TokenBucketThrottle",
+    ],
+    # Reverse proxies in front of the app that append to X-Forwarded-For.
+    # Anonymous clients are throttled by the address the outermost of them
+    # saw; 0 uses REMOTE_ADDR. Set it only when the app can't be reached
+    # without the proxies, since a direct client could forge the header.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 0)),
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_REFRESH_SERIALIZER": "api.tokens.FilteredTokenRefreshSerializer",
 }
 
 # Application definition
@@ -62,6 +73,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "api.compression.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -70,6 +83,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # 503 for a full hashing pool in non-DRF views such as the admin login.
+    "api.hashing.OverloadedMiddleware",
 ]
 
 ROOT_URLCONF = "backend.urls"
@@ -96,13 +111,179 @@ WSGI_APPLICATION = "backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# Postgres is used when DATABASE_ENGINE=postgresql or DATABASE_HOST is set
+# (as docker-compose does); otherwise a local SQLite file.
+DATABASE_ENGINE = os.getenv("DATABASE_ENGINE") or ("postgresql" if os.getenv("DATABASE_HOST") else "sqlite")
+
+if DATABASE_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("DATABASE_NAME", "noteapp"),
+            "USER": os.getenv("DATABASE_USER", "postgres"),
+            "PASSWORD": os.getenv("DATABASE_PASSWORD", ""),
+            "HOST": os.getenv("DATABASE_HOST", "localhost"),
+            "PORT": os.getenv("DATABASE_PORT", "5432"),
+            # Keep connections open across requests, and check them before
+            # reuse so a restarted server costs one reconnect, not an error.
+            "CONN_MAX_AGE": int(os.getenv("DATABASE_CONN_MAX_AGE", 600)),
+            "CONN_HEALTH_CHECKS": True,
+            # QuerySet.iterator() (used by the note export) streams through a
+            # server-side cursor. Transaction-mode PgBouncer can't hold those
+            # open between statements, so allow turning them off.
+            "DISABLE_SERVER_SIDE_CURSORS": os.getenv("DATABASE_DISABLE_SERVER_SIDE_CURSORS", "false").lower() == "true",
+            "OPTIONS": {
+                "connect_timeout": int(os.getenv("DATABASE_CONNECT_TIMEOUT", 5)),
+            },
+        }
+    }
+elif DATABASE_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("DATABASE_NAME") or BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                # Seconds a writer waits for the lock instead of failing
+                # with "database is locked".
+                "timeout": int(os.getenv("SQLITE_TIMEOUT", 20)),
+            },
+        }
+    }
+    if django.VERSION >= (5, 1):
+        # Take the write lock when a transaction starts. Upgrading a read
+        # lock mid-transaction can't wait on the timeout and fails at once.
+        DATABASES["default"]["OPTIONS"]["transaction_mode"] = "IMMEDIATE"
+else:
+    raise ImproperlyConfigured(f"Unsupported DATABASE_ENGINE: {DATABASE_ENGINE!r}")
+
+# Applied to every new SQLite connection (see api.database). WAL lets
+# readers run alongside the single writer; synchronous=NORMAL is still
+# crash-safe in WAL mode and only syncs at checkpoints. Set
+# SQLITE_TUNING=false to keep SQLite's defaults.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": -int(os.getenv("SQLITE_CACHE_KIB", 64 * 1024)),
+    "temp_store": "MEMORY",
+} if os.getenv("SQLITE_TUNING", "true").lower() == "true" else {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# LocMemCache is private to each process. With more than one worker, set
+# CACHE_BACKEND to a shared backend (e.g. Redis or Memcached): logouts in
+# one worker otherwise reach the others' token blacklist filter only after
+# TOKEN_BLACKLIST_FILTER["SYNC_INTERVAL"], and dashboard cache entries are
+# only invalidated in the worker that handled the write.
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-            "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "noteapp"),
     }
 }
 
+DASHBOARD_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": int(os.getenv("DASHBOARD_CACHE_TIMEOUT", 60)),
+    "STALE_TIMEOUT": int(os.getenv("DASHBOARD_CACHE_STALE_TIMEOUT", 300)),
+    "LOCK_TIMEOUT": 30,
+}
+
+# Users resolved from JWTs are kept in an in-process LRU for TIMEOUT
+# seconds; set SHARED_ALIAS to also share them through that cache.
+USER_CACHE = {
+    "ENABLED": os.getenv("USER_CACHE_ENABLED", "true").lower() == "true",
+    "MAX_SIZE": int(os.getenv("USER_CACHE_MAX_SIZE", 1024)),
+    "TIMEOUT": int(os.getenv("USER_CACHE_TIMEOUT", 30)),
+    "SHARED_ALIAS": os.getenv("USER_CACHE_SHARED_ALIAS") or None,
+}
+
+# Blacklisted refresh-token JTIs are checked in memory, in a set each
+# process builds on its first check. Other processes' logouts arrive
+# through the generation key in ALIAS, which must be a shared cache when
+# running more than one worker; otherwise a revoked token stays usable in
+# other workers for up to SYNC_INTERVAL seconds.
+TOKEN_BLACKLIST_FILTER = {
+    "ALIAS": "default",
+    "SYNC_INTERVAL": int(os.getenv("TOKEN_BLACKLIST_SYNC_INTERVAL", 5)),
+    "REBUILD_INTERVAL": 3600,
+    "GAP_TIMEOUT": 60,
+}
+
+# Delta sync (/api/notes/changes/). Tombstones must outlive tokens, or a
+# client could miss deletions; prune them with prune_tombstones.
+NOTE_SYNC = {
+    "TOKEN_LIFETIME": timedelta(days=int(os.getenv("NOTE_SYNC_TOKEN_DAYS", 30))),
+    "TOMBSTONE_RETENTION": timedelta(days=int(os.getenv("NOTE_SYNC_TOKEN_DAYS", 30)) + 1),
+}
+
+# Note bodies of at least THRESHOLD UTF-8 bytes are stored compressed on
+# SQLite (see api.fields). "zstd" needs the zstandard package; rows written
+# with either algorithm stay readable after switching.
+NOTE_COMPRESSION = {
+    "ALGORITHM": os.getenv("NOTE_COMPRESSION_ALGORITHM", "zlib"),
+    "LEVEL": int(os.getenv("NOTE_COMPRESSION_LEVEL", 6)),
+    "THRESHOLD": int(os.getenv("NOTE_COMPRESSION_THRESHOLD", 4096)),
+}
+
+# Per-endpoint request metrics are served at /api/metrics/. Without a
+# TOKEN anyone who can reach the endpoint may scrape it; with one, scrapers
+# must send "Authorization: Bearer <TOKEN>".
+METRICS = {
+    "TOKEN": os.getenv("METRICS_TOKEN") or None,
+}
+
+# Request throttling, see api.throttling.
+_DASHBOARD_ROUTES = (
+    "dashboard-stats", "user-stats", "notes-per-day", "notes-series", "notes-per-user",
+    "dashboard-snapshot", "async-dashboard-stats", "async-user-stats", "async-notes-per-day",
+    "async-notes-per-user",
+)
+
+THROTTLE = {
+    "ENABLED": os.getenv("THROTTLE_ENABLED", "true").lower() != "false",
+    # A cache alias shares the buckets between processes; unset keeps them per process.
+    "CACHE_ALIAS": os.getenv("THROTTLE_CACHE_ALIAS") or None,
+    # Tokens per second and bucket size, per client and per client and route.
+    "USER": {
+        "RATE": float(os.getenv("THROTTLE_USER_RATE", 20)),
+        "BURST": int(os.getenv("THROTTLE_USER_BURST", 200)),
+    },
+    "ROUTE": {
+        "RATE": float(os.getenv("THROTTLE_ROUTE_RATE", 10)),
+        "BURST": int(os.getenv("THROTTLE_ROUTE_BURST", 100)),
+    },
+    # Tokens per request by URL name; anything else costs 1.
+    "COSTS": {
+        **{route: 5 for route in _DASHBOARD_ROUTES},
+        "get_token": 10,
+        "user-list": 10,
+        "note-batch": 5,
+        "note-export": 5,
+    },
+}
+
+RESPONSE_COMPRESSION = {
+    # Most preferred first; br and zstd are skipped unless brotli/zstandard are installed.
+    "ENCODINGS": tuple(os.getenv("RESPONSE_COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",")),
+    "MIN_SIZE": int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", 1024)),
+    "LEVELS": {"gzip": 6, "br": 4, "zstd": 3},
+}
+
+PASSWORD_HASHING = {
+    # Processes hashing passwords for logins and registrations; 0 hashes in the
+    # request thread, without a limit.
+    "WORKERS": int(os.getenv("PASSWORD_HASHING_WORKERS", max(1, (os.cpu_count() or 2) // 2))),
+    # Hashes that may wait for a free process before requests get a 503.
+    "QUEUE": int(os.getenv("PASSWORD_HASHING_QUEUE", 8)),
+    # Seconds a request waits for its hash before giving up with a 503.
+    "TIMEOUT": 30,
+}
+
+AUTHENTICATION_BACKENDS = ["api.hashing.PooledModelBackend"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
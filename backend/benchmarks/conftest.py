@@ -0,0 +1,12 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def benchmark_context(django_db_setup, django_db_blocker):
+    """Seed ``BENCHMARK_NOTES`` notes (default 10k) once per session."""
+    from api.benchmarks import BenchmarkContext
+
+    with django_db_blocker.unblock():
+        yield BenchmarkContext(int(os.getenv("BENCHMARK_NOTES", 10_000)))
@@ -0,0 +1,35 @@
+"""
+pytest-benchmark timings for every scenario in ``api.benchmarks``.
+
+Run from ``backend/`` with ``pytest`` (see ``pytest.ini``); set
+``BENCHMARK_NOTES`` to change the data size and use pytest-benchmark's
+``--benchmark-json``/``--benchmark-compare`` to diff runs.
+"""
+import pytest
+
+pytest.importorskip("pytest_django")
+pytest.importorskip("pytest_benchmark")
+
+from api.benchmarks import SCENARIOS, uncovered_routes  # noqa: E402
+
+
+def test_every_route_is_benchmarked():
+    assert uncovered_routes() == []
+
+
+# Each test runs in a rolled-back transaction, so the session's seeded data
+# is shared and write scenarios leave no trace.
+@pytest.mark.django_db
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=lambda scenario: scenario.name)
+def test_endpoint(benchmark, benchmark_context, scenario):
+    def setup():
+        return (benchmark_context.request(scenario),), {}
+
+    def send(request):
+        response = request()
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    response = benchmark.pedantic(send, setup=setup, rounds=20, warmup_rounds=1)
+    assert response.status_code == scenario.expected_status
@@ -6,6 +6,7 @@ import { notesAPI } from '../../api';
 jest.mock('../../api', () => ({
     notesAPI: {
         getAll: jest.fn(),
+        getPage: jest.fn(),
         create: jest.fn(),
         delete: jest.fn(),
     },
@@ -13,7 +14,7 @@ jest.mock('../../api', () => ({
 
 describe('Home Component', () => {
     beforeEach(() => {
-        notesAPI.getAll.mockResolvedValue({ data: [] });
+        notesAPI.getAll.mockResolvedValue({ data: { results: [] } });
     });
 
     test('renders create note form', async () => {
@@ -27,6 +28,24 @@ describe('Home Component', () => {
         expect(screen.getByPlaceholderText(/content/i)).toBeInTheDocument();
     });
 
+    test('loads every page of notes', async () => {
+        notesAPI.getAll.mockResolvedValueOnce({
+            data: { results: [{ id: 1, title: 'First page', preview: '' }], next: 'http://api/notes/?cursor=a' },
+        });
+        notesAPI.getPage.mockResolvedValueOnce({
+            data: { results: [{ id: 2, title: 'Second page', preview: '' }], next: null },
+        });
+        render(
+            <BrowserRouter>
+                <Home />
+            </BrowserRouter>
+        );
+
+        expect(await screen.findByText('Second page')).toBeInTheDocument();
+        expect(screen.getByText('First page')).toBeInTheDocument();
+        expect(notesAPI.getPage).toHaveBeenCalledWith('http://api/notes/?cursor=a');
+    });
+
     test('creates new note', async () => {
         notesAPI.create.mockResolvedValueOnce({});
         render(
@@ -30,10 +30,15 @@ export const authAPI = {
 };
 
 export const notesAPI = {
-  getAll: () => api.get("/api/notes/"),
+  getAll: (params) => api.get("/api/notes/", { params }),
+  // Follows a page's `next`/`previous` link; the cursor is in the URL.
+  getPage: (url) => api.get(url),
+  search: (q, params) => api.get("/api/notes/search/", { params: { q, ...params } }),
+  export: (params) => api.get("/api/notes/export/", { params, responseType: "blob" }),
   create: (noteData) => api.post("/api/notes/", noteData),
   delete: (id) => api.delete(`/api/notes/${id}/`),
   update: (id, noteData) => api.put(`/api/notes/${id}/`, noteData),
+  batch: (operations) => api.post("/api/notes/batch/", { operations }),
 };
 
 export const userAPI = {
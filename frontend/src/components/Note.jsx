@@ -4,7 +4,7 @@ function Note({ note, onDelete }) {
     return (
         <div className="note">
             <h3>{note.title}</h3>
-            <p>{note.content}</p>
+            <p>{note.content ?? note.preview}</p>
             <button onClick={onDelete}>Delete</button>
         </div>
     );
@@ -33,34 +33,18 @@ const Dashboard = () => {
     const [dateRange, setDateRange] = useState(30);
     const [sidebarOpen, setSidebarOpen] = useState(true);
 
-    const fetchDailyNotes = async (days) => {
-        try {
-            const token = localStorage.getItem(ACCESS_TOKEN);
-            const headers = {
-                'Authorization': `Bearer ${token}`,
-                'Content-Type': 'application/json'
-            };
-
-            const response = await fetch(
-                `${API_BASE_URL}/dashboard/notes-per-day/?days=${days}`,
-                { headers }
-            );
-            const data = await response.json();
-            
-            // Fill in missing dates with zero counts
-            const filledData = [];
-            for (let i = days - 1; i >= 0; i--) {
-                const date = format(subDays(new Date(), i), 'yyyy-MM-dd');
-                const existingData = data.find(d => d.date === date);
-                filledData.push({
-                    date,
-                    count: existingData ? existingData.count : 0
-                });
-            }
-            setDailyNotes(filledData);
-        } catch (error) {
-            console.error('Error fetching daily notes:', error);
+    // Fill in missing dates with zero counts
+    const fillDailyNotes = (data, days) => {
+        const filledData = [];
+        for (let i = days - 1; i >= 0; i--) {
+            const date = format(subDays(new Date(), i), 'yyyy-MM-dd');
+            const existingData = data.find(d => d.date === date);
+            filledData.push({
+                date,
+                count: existingData ? existingData.count : 0
+            });
         }
+        return filledData;
     };
 
     useEffect(() => {
@@ -72,28 +56,23 @@ const Dashboard = () => {
                     'Content-Type': 'application/json'
                 };
 
-                const [statsRes, usersRes, distRes] = await Promise.all([
-                    fetch(`${API_BASE_URL}/dashboard/stats/`, { headers }),
-                    fetch(`${API_BASE_URL}/dashboard/users/`, { headers }),
-                    fetch(`${API_BASE_URL}/dashboard/notes-per-user/`, { headers })
-                ]);
-
-                const [statsData, usersData, distData] = await Promise.all([
-                    statsRes.json(),
-                    usersRes.json(),
-                    distRes.json()
-                ]);
-
-                setStats(statsData);
-                setUsers(usersData);
-                setNotesPerUser(distData);
+                // Every panel comes from one snapshot request.
+                const response = await fetch(
+                    `${API_BASE_URL}/dashboard/snapshot/?days=${dateRange}&limit=100`,
+                    { headers }
+                );
+                const data = await response.json();
+
+                setStats(data.stats);
+                setUsers(data.users);
+                setNotesPerUser(data.notes_per_user);
+                setDailyNotes(fillDailyNotes(data.notes_per_day, dateRange));
             } catch (error) {
                 console.error('Error fetching dashboard data:', error);
             }
         };
 
         fetchDashboardData();
-        fetchDailyNotes(dateRange);
     }, [dateRange]);
 
     const handleRangeChange = (event) => {
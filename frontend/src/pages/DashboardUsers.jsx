@@ -24,9 +24,20 @@ const DashboardUsers = () => {
                     'Content-Type': 'application/json'
                 };
 
-                const response = await fetch(`${API_BASE_URL}/dashboard/users/`, { headers });
-                const data = await response.json();
-                setUsers(data);
+                // Search and paging below run over every user, so follow
+                // `next` until all pages are loaded.
+                const allUsers = [];
+                let url = `${API_BASE_URL}/dashboard/users/?page_size=500`;
+                while (url) {
+                    const response = await fetch(url, { headers });
+                    if (!response.ok) {
+                        throw new Error(`HTTP ${response.status}`);
+                    }
+                    const data = await response.json();
+                    allUsers.push(...data.results);
+                    url = data.next;
+                }
+                setUsers(allUsers);
             } catch (error) {
                 console.error('Error fetching users:', error);
             }
@@ -15,8 +15,14 @@ function Home() {
 
     const getNotes = async () => {
         try {
-            const res = await notesAPI.getAll();
-            setNotes(res.data);
+            // The list is paginated; follow `next` until every note is loaded.
+            let res = await notesAPI.getAll();
+            const all = [...res.data.results];
+            while (res.data.next) {
+                res = await notesAPI.getPage(res.data.next);
+                all.push(...res.data.results);
+            }
+            setNotes(all);
         } catch (error) {
             alert(error.response?.data?.detail || "Failed to fetch notes");
         }